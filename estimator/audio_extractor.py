@@ -2,19 +2,36 @@
 Audio Extractor Module
 Extracts audio from video files using ffmpeg and chunks for Whisper's 25MB limit.
 
+Optional VAD trimming (webrtcvad) drops footsteps/silence/HVAC stretches
+before upload and returns an OffsetMap so transcript timestamps can be
+mapped back onto the original video timeline.
+
 Usage:
     from audio_extractor import extract_audio, chunk_audio, cleanup_temp_audio
 
     audio_path = extract_audio("walkthrough.mp4")
+    audio_path, offset_map = trim_silence(audio_path)   # optional
     chunks = chunk_audio(audio_path, max_size_mb=24)
     # ... send chunks to Whisper ...
     cleanup_temp_audio(chunks)
+
+    # Or skip the disk entirely: ffmpeg decodes to a pipe and chunks are
+    # cut and encoded in memory as the video is read (chunk.data = bytes)
+    result = transcribe_audio(stream_audio_chunks("walkthrough.mp4"))
 """
 
+import bisect
+import collections
+import csv
+import io
+import re
 import subprocess
 import shutil
+import threading
+import wave
 from pathlib import Path
-from dataclasses import dataclass
+from typing import Iterator
+from dataclasses import dataclass, field
 
 
 @dataclass
@@ -24,6 +41,50 @@ class AudioChunk:
     start_seconds: float
     duration_seconds: float
     index: int
+    data: bytes | None = None  # encoded audio when streamed in memory (path is then just a name)
+
+
+@dataclass
+class SpeechRegion:
+    """A kept stretch of audio: where it sits in the original and trimmed files."""
+    original_start: float
+    original_end: float
+    trimmed_start: float
+
+    @property
+    def duration(self) -> float:
+        return self.original_end - self.original_start
+
+
+@dataclass
+class OffsetMap:
+    """Maps timestamps in VAD-trimmed audio back to the original video.
+
+    regions are fixed at construction (their trimmed starts are indexed once).
+    """
+    regions: list[SpeechRegion] = field(default_factory=list)
+    original_duration: float = 0.0
+    _starts: list[float] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self._starts = [r.trimmed_start for r in self.regions]
+
+    @property
+    def trimmed_duration(self) -> float:
+        return sum(r.duration for r in self.regions)
+
+    def to_original(self, t: float, is_end: bool = False) -> float:
+        """Convert a trimmed-audio timestamp to original-video seconds.
+
+        A time exactly on a cut belongs to the following region when it's a
+        start and to the preceding region when it's an end (is_end=True).
+        """
+        if not self.regions:
+            return t
+        starts = self._starts
+        idx = (bisect.bisect_left(starts, t) if is_end else bisect.bisect_right(starts, t)) - 1
+        region = self.regions[max(idx, 0)]
+        return region.original_start + min(max(t - region.trimmed_start, 0.0), region.duration)
 
 
 def _find_ffmpeg() -> str:
@@ -84,8 +145,31 @@ def _find_ffprobe() -> str:
     raise FileNotFoundError("ffprobe not found. It should be installed alongside ffmpeg.")
 
 
+# Durations keyed by (resolved path, size, mtime) so a rewritten file is re-probed
+_duration_cache: dict[tuple, float] = {}
+_duration_lock = threading.Lock()
+
+
+def _cache_key(file_path: Path) -> tuple:
+    st = file_path.stat()
+    return (str(file_path.resolve()), st.st_size, st.st_mtime_ns)
+
+
+def _remember_duration(file_path: str | Path, duration: float):
+    """Record a duration we already know (e.g. from ffmpeg output) to skip ffprobe."""
+    key = _cache_key(Path(file_path))
+    with _duration_lock:
+        _duration_cache[key] = duration
+
+
 def get_duration(file_path: str | Path) -> float:
-    """Get duration of audio/video file in seconds."""
+    """Get duration of audio/video file in seconds (ffprobe, cached per file)."""
+    file_path = Path(file_path)
+    key = _cache_key(file_path)
+    with _duration_lock:
+        if key in _duration_cache:
+            return _duration_cache[key]
+
     ffprobe = _find_ffprobe()
     result = subprocess.run(
         [ffprobe, "-v", "quiet", "-show_entries", "format=duration",
@@ -94,7 +178,22 @@ def get_duration(file_path: str | Path) -> float:
     )
     if result.returncode != 0:
         raise RuntimeError(f"ffprobe failed: {result.stderr}")
-    return float(result.stdout.strip())
+    duration = float(result.stdout.strip())
+    with _duration_lock:
+        _duration_cache[key] = duration
+    return duration
+
+
+_FFMPEG_TIME_RE = re.compile(r"time=(\d+):(\d+):(\d+(?:\.\d+)?)")
+
+
+def _parse_ffmpeg_time(stderr: str) -> float | None:
+    """Return the final output timestamp from ffmpeg's progress lines."""
+    matches = _FFMPEG_TIME_RE.findall(stderr or "")
+    if not matches:
+        return None
+    h, m, sec = matches[-1]
+    return int(h) * 3600 + int(m) * 60 + float(sec)
 
 
 def extract_audio(video_path: str | Path, output_dir: Path = None) -> Path:
@@ -137,7 +236,12 @@ def extract_audio(video_path: str | Path, output_dir: Path = None) -> Path:
         raise RuntimeError(f"ffmpeg audio extraction failed:\n{result.stderr[-500:]}")
 
     size_mb = audio_path.stat().st_size / (1024 * 1024)
-    duration = get_duration(audio_path)
+    # ffmpeg already reports the output length; only probe if we can't parse it
+    duration = _parse_ffmpeg_time(result.stderr)
+    if duration is not None:
+        _remember_duration(audio_path, duration)
+    else:
+        duration = get_duration(audio_path)
     print(f"  Audio extracted: {size_mb:.1f} MB, {duration:.0f}s ({duration/60:.1f} min)")
 
     return audio_path
@@ -175,42 +279,298 @@ def chunk_audio(audio_path: str | Path, max_size_mb: float = 24) -> list[AudioCh
     # Calculate chunk duration based on proportional size
     chunk_duration = total_duration * (max_size_mb / file_size_mb) * 0.95  # 5% safety margin
 
-    chunks = []
+    # One ffmpeg pass (stream copy, no re-encode) writes every segment and a
+    # CSV list of their actual boundaries, so no per-chunk ffprobe is needed.
     ffmpeg = _find_ffmpeg()
-    start = 0.0
-    idx = 0
-
-    while start < total_duration:
-        dur = min(chunk_duration, total_duration - start)
-        chunk_path = audio_path.parent / f"{audio_path.stem}_chunk{idx:03d}.mp3"
-
-        cmd = [
-            ffmpeg, "-ss", str(start),
-            "-t", str(dur),
-            "-i", str(audio_path),
-            "-c", "copy",  # Stream copy, no re-encoding
-            "-y",
-            str(chunk_path)
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
-        if result.returncode != 0:
-            raise RuntimeError(f"ffmpeg chunk split failed:\n{result.stderr[-500:]}")
-
-        actual_dur = get_duration(chunk_path)
-        chunks.append(AudioChunk(
-            path=chunk_path,
-            start_seconds=start,
-            duration_seconds=actual_dur,
-            index=idx,
-        ))
-
-        start += dur
-        idx += 1
+    segment_list = audio_path.parent / f"{audio_path.stem}_segments.csv"
+    pattern = audio_path.parent / f"{audio_path.stem}_chunk%03d.mp3"
+    cmd = [
+        ffmpeg, "-i", str(audio_path),
+        "-f", "segment",
+        "-segment_time", f"{chunk_duration:.3f}",
+        "-segment_list", str(segment_list),
+        "-segment_list_type", "csv",
+        "-reset_timestamps", "1",
+        "-c", "copy",  # Stream copy, no re-encoding
+        "-y",
+        str(pattern)
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg chunk split failed:\n{result.stderr[-500:]}")
+
+    chunks = []
+    try:
+        with open(segment_list, newline="") as f:
+            for idx, row in enumerate(csv.reader(f)):
+                if len(row) < 3:
+                    continue
+                seg_start, seg_end = float(row[1]), float(row[2])
+                chunk_path = audio_path.parent / row[0]
+                _remember_duration(chunk_path, seg_end - seg_start)
+                chunks.append(AudioChunk(
+                    path=chunk_path,
+                    start_seconds=seg_start,
+                    duration_seconds=seg_end - seg_start,
+                    index=idx,
+                ))
+    finally:
+        segment_list.unlink(missing_ok=True)
 
     print(f"  Audio split into {len(chunks)} chunks ({file_size_mb:.1f} MB total)")
     return chunks
 
 
+# In-memory streaming
+STREAM_SAMPLE_RATE = 16000
+STREAM_BYTES_PER_SECOND = STREAM_SAMPLE_RATE * 2  # 16-bit mono PCM
+STREAM_CHUNK_SECONDS = 600  # 10 min -- MP3 q5 mono is well under 24MB
+
+
+def _encode_pcm(pcm: bytes, encode: str) -> bytes:
+    """Encode raw 16kHz mono PCM as WAV (stdlib) or MP3 (ffmpeg pipe, no temp file)."""
+    if encode == "wav":
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(STREAM_SAMPLE_RATE)
+            w.writeframes(pcm)
+        return buf.getvalue()
+
+    ffmpeg = _find_ffmpeg()
+    cmd = [
+        ffmpeg, "-f", "s16le", "-ar", str(STREAM_SAMPLE_RATE), "-ac", "1", "-i", "pipe:0",
+        "-acodec", "libmp3lame", "-q:a", "5", "-f", "mp3",
+        "-loglevel", "error", "pipe:1",
+    ]
+    result = subprocess.run(cmd, input=pcm, capture_output=True, timeout=300)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg MP3 encode failed:\n{result.stderr.decode(errors='replace')[-500:]}")
+    return result.stdout
+
+
+def stream_audio_chunks(
+    video_path: str | Path,
+    chunk_seconds: float = STREAM_CHUNK_SECONDS,
+    max_size_mb: float = 24,
+    encode: str = "mp3",
+    keep_dir: Path = None,
+) -> Iterator[AudioChunk]:
+    """
+    Decode a video's audio through an ffmpeg pipe and yield chunks from memory.
+
+    Replaces extract_audio -> chunk_audio -> cleanup_temp_audio when the audio
+    is only needed once. Chunks are cut on the fly by duration (and by size
+    for WAV) and yielded as soon as they fill, so transcription can start
+    while the rest of the video is still decoding.
+
+    Args:
+        video_path: Path to input video file
+        chunk_seconds: Max chunk length in seconds (None/inf = one chunk)
+        max_size_mb: Upload size limit per chunk (enforced for WAV; MP3 at
+                     the default chunk length stays far below it)
+        encode: "mp3" (small uploads, Whisper API) or "wav" (no encode step,
+                good for the local backend)
+        keep_dir: If set, also write each chunk here (intermediates)
+
+    Yields:
+        AudioChunk objects with .data set; .path is a real file only if keep_dir
+    """
+    video_path = Path(video_path)
+    if not video_path.exists():
+        raise FileNotFoundError(f"Video not found: {video_path}")
+    if encode not in ("mp3", "wav"):
+        raise ValueError(f"Unsupported stream encoding: {encode}")
+
+    chunk_bytes = float("inf") if not chunk_seconds else chunk_seconds * STREAM_BYTES_PER_SECOND
+    if encode == "wav":
+        chunk_bytes = min(chunk_bytes, max_size_mb * 1024 * 1024 - 1024)  # header margin
+    chunk_bytes = chunk_bytes if chunk_bytes == float("inf") else int(chunk_bytes) // 2 * 2
+    if keep_dir is not None:
+        keep_dir = Path(keep_dir)
+        keep_dir.mkdir(parents=True, exist_ok=True)
+
+    ffmpeg = _find_ffmpeg()
+    proc = subprocess.Popen(
+        [ffmpeg, "-i", str(video_path), "-vn", "-f", "s16le", "-acodec", "pcm_s16le",
+         "-ar", str(STREAM_SAMPLE_RATE), "-ac", "1", "-loglevel", "error", "pipe:1"],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+    print(f"  Streaming audio: {video_path.name} ({encode}, in memory)")
+
+    def make_chunk(pcm: bytes, index: int, start: float) -> AudioChunk:
+        data = _encode_pcm(pcm, encode)
+        path = Path(f"{video_path.stem}_chunk{index:03d}.{encode}")
+        if keep_dir is not None:
+            path = keep_dir / path.name
+            path.write_bytes(data)
+        duration = len(pcm) / STREAM_BYTES_PER_SECOND
+        print(f"  Audio chunk {index}: {start:.0f}s-{start + duration:.0f}s "
+              f"({len(data) / (1024 * 1024):.1f} MB)")
+        return AudioChunk(path=path, start_seconds=start, duration_seconds=duration,
+                          index=index, data=data)
+
+    buf = bytearray()
+    index = 0
+    start = 0.0
+    try:
+        while True:
+            data = proc.stdout.read(1024 * 1024)
+            if not data:
+                break
+            buf += data
+            while len(buf) >= chunk_bytes:
+                pcm = bytes(buf[:chunk_bytes])
+                del buf[:chunk_bytes]
+                chunk = make_chunk(pcm, index, start)
+                start += chunk.duration_seconds
+                index += 1
+                yield chunk
+        proc.wait()
+        if proc.returncode != 0:
+            raise RuntimeError(f"ffmpeg audio decode failed:\n"
+                               f"{proc.stderr.read().decode(errors='replace')[-500:]}")
+        if buf:
+            buf = buf[:len(buf) // 2 * 2]
+            yield make_chunk(bytes(buf), index, start)
+            index += 1
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+    print(f"  Audio streamed: {start + len(buf) / STREAM_BYTES_PER_SECOND:.0f}s in {index} chunk(s)")
+
+
+# VAD settings — same webrtcvad configuration as fire-scanner/scanner.py
+VAD_SAMPLE_RATE = 16000
+VAD_FRAME_MS = 30
+VAD_FRAME_BYTES = int(VAD_SAMPLE_RATE * VAD_FRAME_MS / 1000) * 2  # 16-bit mono
+VAD_AGGRESSIVENESS = 2     # 0-3, higher = more aggressive filtering
+VAD_RING_FRAMES = 15       # ~450ms window for start/stop decisions
+VAD_SPEECH_RATIO = 0.6     # ratio of voiced frames to trigger speech start
+VAD_SILENCE_RATIO = 0.8    # ratio of unvoiced frames to trigger speech end
+VAD_PADDING_SECONDS = 0.5  # context kept on each side of speech
+VAD_MIN_GAP_SECONDS = 1.0  # shorter gaps between speech are kept
+
+
+def _detect_speech(audio_path: Path, aggressiveness: int) -> tuple[list[tuple[float, float]], float]:
+    """Stream audio through webrtcvad. Returns (speech spans in seconds, total seconds).
+
+    ffmpeg decodes to 16kHz mono PCM on a pipe; frames are classified as they
+    arrive so the whole file is never held in memory.
+    """
+    import webrtcvad
+
+    vad = webrtcvad.Vad(aggressiveness)
+    ffmpeg = _find_ffmpeg()
+    proc = subprocess.Popen(
+        [ffmpeg, "-i", str(audio_path), "-f", "s16le", "-acodec", "pcm_s16le",
+         "-ar", str(VAD_SAMPLE_RATE), "-ac", "1", "-loglevel", "error", "pipe:1"],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+
+    frame_sec = VAD_FRAME_MS / 1000.0
+    ring = collections.deque(maxlen=VAD_RING_FRAMES)
+    spans = []
+    triggered = False
+    span_start = 0
+    n = 0
+    buf = b""
+    while True:
+        data = proc.stdout.read(VAD_FRAME_BYTES * 100)
+        if not data:
+            break
+        buf = buf + data if buf else data  # carry-over is less than one frame
+        view = memoryview(buf)
+        offset = 0
+        while offset + VAD_FRAME_BYTES <= len(buf):
+            frame = view[offset:offset + VAD_FRAME_BYTES]  # no copy
+            offset += VAD_FRAME_BYTES
+            is_speech = vad.is_speech(frame, VAD_SAMPLE_RATE)
+            ring.append((n, is_speech))
+            if not triggered:
+                if sum(1 for _, v in ring if v) > VAD_SPEECH_RATIO * ring.maxlen:
+                    triggered = True
+                    span_start = ring[0][0]
+                    ring.clear()
+            elif sum(1 for _, v in ring if not v) > VAD_SILENCE_RATIO * ring.maxlen:
+                spans.append((span_start * frame_sec, (n + 1) * frame_sec))
+                triggered = False
+                ring.clear()
+            n += 1
+        buf = bytes(view[offset:])
+        view.release()
+    proc.wait()
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg PCM decode failed:\n{proc.stderr.read().decode(errors='replace')[-500:]}")
+    if triggered:
+        spans.append((span_start * frame_sec, n * frame_sec))
+    return spans, n * frame_sec
+
+
+def trim_silence(
+    audio_path: str | Path,
+    aggressiveness: int = VAD_AGGRESSIVENESS,
+    padding_seconds: float = VAD_PADDING_SECONDS,
+    min_gap_seconds: float = VAD_MIN_GAP_SECONDS,
+) -> tuple[Path, OffsetMap | None]:
+    """
+    Keep only speech regions (plus padding) of an audio file.
+
+    Returns (trimmed_path, offset_map). If webrtcvad isn't installed or no
+    speech is found, returns (audio_path, None) and the caller should use
+    the untrimmed audio as before.
+    """
+    audio_path = Path(audio_path)
+    try:
+        spans, total = _detect_speech(audio_path, aggressiveness)
+    except ImportError:
+        print("  VAD trim skipped: webrtcvad not installed (pip install webrtcvad)")
+        return audio_path, None
+
+    if not spans:
+        print("  VAD trim: no speech detected -- keeping full audio")
+        return audio_path, None
+
+    # Pad each span, then merge overlaps and short gaps
+    merged = []
+    for start, end in spans:
+        start = max(0.0, start - padding_seconds)
+        end = min(total, end + padding_seconds)
+        if merged and start - merged[-1][1] < min_gap_seconds:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+
+    regions = []
+    cursor = 0.0
+    for start, end in merged:
+        regions.append(SpeechRegion(start, end, cursor))
+        cursor += end - start
+    offset_map = OffsetMap(regions=regions, original_duration=total)
+
+    # Re-encode only the selected regions in one ffmpeg pass
+    select = "+".join(f"between(t,{s:.3f},{e:.3f})" for s, e in merged)
+    trimmed_path = audio_path.parent / f"{audio_path.stem}_speech.mp3"
+    ffmpeg = _find_ffmpeg()
+    cmd = [
+        ffmpeg, "-i", str(audio_path),
+        "-af", f"aselect='{select}',asetpts=N/SR/TB",
+        "-acodec", "libmp3lame", "-ar", "16000", "-ac", "1", "-q:a", "5",
+        "-y", str(trimmed_path),
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg VAD trim failed:\n{result.stderr[-500:]}")
+
+    _remember_duration(trimmed_path, offset_map.trimmed_duration)
+    kept = offset_map.trimmed_duration
+    print(f"  VAD trim: kept {kept:.0f}s of {total:.0f}s "
+          f"({kept / max(total, 1):.0%}) in {len(merged)} speech region(s)")
+    return trimmed_path, offset_map
+
+
 def cleanup_temp_audio(chunks: list[AudioChunk], also_remove_source: bool = False):
     """Remove temporary audio chunk files."""
     for chunk in chunks:
@@ -0,0 +1,352 @@
+"""
+Call Guard — deadlines, hedged requests and circuit breakers for provider calls
+
+Every Gemini / Claude / Whisper request goes through guarded_call(), which:
+
+  Deadline:  gives up after a per-provider deadline instead of waiting out
+             the SDK's own timeouts (the abandoned request finishes in the
+             background; its result is discarded).
+  Hedging:   if a call is still running past the p95 latency seen for that
+             kind of call (HEDGE_PERCENTILE), one duplicate is sent and the
+             first answer wins. Only cheap, idempotent calls named in
+             HEDGE_CALLS are hedged (default: the text-only Claude merge);
+             photo, video and audio uploads would duplicate megabytes.
+  Breaker:   after CIRCUIT_FAILURES consecutive failures/timeouts a provider
+             is "open" for CIRCUIT_COOLDOWN_SECONDS: calls fail immediately
+             with CircuitOpenError so callers drop to their existing
+             fallbacks (gemini_fallback for the merge, the lookup floor for
+             photo rooms, no-transcript for Whisper). One trial call is let
+             through after the cooldown; success closes the circuit.
+
+Guard errors subclass ProviderUnavailable, so callers that already catch
+Exception and fall back need no changes.
+
+With a slot (providers.call passes the provider's concurrency limit), every
+request actually sent holds it until the request finishes: hedges take their
+own slot (no hedge when none is free) and a request abandoned at the deadline
+keeps its slot until it completes in the background.
+
+Abandoned requests also keep a thread of the shared call pool
+(CALL_GUARD_THREADS) until the SDK gives up on them. Once
+CALL_GUARD_MAX_ABANDONED of one provider's requests are still running
+that way, new calls to it fail fast with AbandonedCallsError instead of
+queueing behind them, so a hung provider can't take the whole pool.
+
+Usage:
+    from call_guard import guarded_call, ProviderUnavailable
+
+    response = guarded_call("gemini", "photo", client.models.generate_content,
+                            model=model, contents=contents, config=config)
+
+Settings (environment):
+    GEMINI_CALL_DEADLINE=600  CLAUDE_CALL_DEADLINE=300  OPENAI_CALL_DEADLINE=300
+    CALL_HEDGE=1  HEDGE_CALLS=merge  HEDGE_PERCENTILE=95  HEDGE_MIN_SAMPLES=8
+    CIRCUIT_FAILURES=5  CIRCUIT_COOLDOWN_SECONDS=60
+    CALL_GUARD_THREADS=64  CALL_GUARD_MAX_ABANDONED=16
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+CALL_DEADLINES = {
+    "gemini": float(os.environ.get("GEMINI_CALL_DEADLINE", 600)),
+    "claude": float(os.environ.get("CLAUDE_CALL_DEADLINE", 300)),
+    "openai": float(os.environ.get("OPENAI_CALL_DEADLINE", 300)),
+}
+DEFAULT_DEADLINE = 300.0
+
+HEDGE_ENABLED = os.environ.get("CALL_HEDGE", "1") != "0"
+# Call names (guarded_call's name) that may be hedged: small text requests only
+HEDGE_CALLS = {n.strip() for n in os.environ.get("HEDGE_CALLS", "merge").split(",") if n.strip()}
+HEDGE_PERCENTILE = float(os.environ.get("HEDGE_PERCENTILE", 95))
+HEDGE_MIN_SAMPLES = int(os.environ.get("HEDGE_MIN_SAMPLES", 8))  # no hedging until we know the distribution
+HEDGE_MIN_SECONDS = 1.0  # never hedge faster than this
+
+CIRCUIT_FAILURES = int(os.environ.get("CIRCUIT_FAILURES", 5))
+CIRCUIT_COOLDOWN_SECONDS = float(os.environ.get("CIRCUIT_COOLDOWN_SECONDS", 60))
+
+LATENCY_WINDOW = 200  # recent successful calls kept per (provider, call name)
+
+# Calls run here so the caller can stop waiting at the deadline; sized for
+# pipeline concurrency plus hedges and a few abandoned (timed-out) calls
+_pool = ThreadPoolExecutor(max_workers=int(os.environ.get("CALL_GUARD_THREADS", 64)),
+                           thread_name_prefix="provider-call")
+# Per provider: abandoned requests still running before new calls fail fast
+MAX_ABANDONED = int(os.environ.get("CALL_GUARD_MAX_ABANDONED", 16))
+_lock = threading.Lock()
+_latencies = {}   # (provider, name) -> deque of seconds
+_breakers = {}    # provider -> CircuitBreaker
+_stats = {}       # provider -> counters
+_abandoned = {}   # provider -> requests abandoned at the deadline, still running
+
+
+class ProviderUnavailable(Exception):
+    """A provider call was not answered (deadline or open circuit)."""
+    def __init__(self, provider: str, message: str):
+        self.provider = provider
+        super().__init__(f"{provider}: {message}")
+
+
+class DeadlineExceeded(ProviderUnavailable, TimeoutError):
+    """No response within the call deadline."""
+
+
+class CircuitOpenError(ProviderUnavailable):
+    """Provider is marked degraded; the call was not sent."""
+
+
+class AbandonedCallsError(ProviderUnavailable):
+    """Too many of the provider's timed-out requests are still running; the call was not sent."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open (cooldown) -> half-open trial."""
+
+    def __init__(self, provider: str, failures: int = CIRCUIT_FAILURES,
+                 cooldown: float = CIRCUIT_COOLDOWN_SECONDS):
+        self.provider = provider
+        self.failures = failures
+        self.cooldown = cooldown
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.cooldown:
+            return "open"
+        return "half-open"
+
+    def allow(self) -> bool:
+        """Whether a call may be sent now (claims the single half-open trial)."""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.opened_at is not None:
+                print(f"  Circuit closed: {self.provider} is responding again")
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.trial_in_flight or (self.opened_at is None
+                                        and self.consecutive_failures >= self.failures):
+                self.opened_at = time.monotonic()
+                _count(self.provider, "circuit_opens")
+                print(f"  Circuit OPEN: {self.provider} failed {self.consecutive_failures}x "
+                      f"in a row -- failing fast for {self.cooldown:.0f}s")
+            self.trial_in_flight = False
+
+
+def breaker(provider: str) -> CircuitBreaker:
+    with _lock:
+        if provider not in _breakers:
+            _breakers[provider] = CircuitBreaker(provider)
+        return _breakers[provider]
+
+
+def _count(provider: str, key: str, n: int = 1):
+    with _lock:
+        s = _stats.setdefault(provider, {
+            'calls': 0, 'hedges': 0, 'hedge_wins': 0, 'deadlines': 0,
+            'failures': 0, 'fast_fails': 0, 'circuit_opens': 0,
+        })
+        s[key] += n
+
+
+def _hedge_after(provider: str, name: str) -> float | None:
+    """Seconds after which to send a duplicate, or None if not enough history."""
+    with _lock:
+        samples = sorted(_latencies.get((provider, name), ()))
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return None
+    k = min(len(samples) - 1, int(len(samples) * HEDGE_PERCENTILE / 100))
+    return max(HEDGE_MIN_SECONDS, samples[k])
+
+
+def _record_latency(provider: str, name: str, seconds: float):
+    with _lock:
+        _latencies.setdefault((provider, name), deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+
+def _abandon(provider: str, future):
+    """Count a request left running past its deadline until it finishes."""
+    def finished(_):
+        with _lock:
+            _abandoned[provider] -= 1
+
+    with _lock:
+        _abandoned[provider] = _abandoned.get(provider, 0) + 1
+    future.add_done_callback(finished)
+
+
+def _submit(slot, fn, *args, **kwargs):
+    """Run fn on the pool; the slot (already acquired) is released when it finishes."""
+    future = _pool.submit(fn, *args, **kwargs)
+    if slot is not None:
+        future.add_done_callback(lambda _: slot.release())
+    return future
+
+
+def guarded_call(provider: str, name: str, fn, *args,
+                 deadline: float = None, hedge: bool = True, slot=None,
+                 transient=None, **kwargs):
+    """
+    Call fn(*args, **kwargs) with a deadline, optional hedge and the
+    provider's circuit breaker.
+
+    Args:
+        provider: "gemini", "claude", "openai" (one breaker per provider)
+        name: Kind of call ("photo", "video", "merge", ...); hedge thresholds
+              are learned per (provider, name) since latencies differ widely
+        fn: The SDK call
+        deadline: Seconds to wait (default CALL_DEADLINES[provider])
+        hedge: Allow a duplicate request past the latency percentile (only
+               for names in HEDGE_CALLS). Pass False for calls with side
+               effects (uploads, streaming callbacks)
+        slot: Concurrency limit held by each request while it runs, with
+              acquire(blocking=True) -> bool and release(). The caller has
+              already acquired it for the first request; it is released
+              when that request finishes (or here if nothing is sent).
+              Hedges acquire their own
+        transient: fn(error) -> bool; only transient errors count toward the
+                   circuit breaker (default: every error does). A rejected
+                   request (4xx) still shows the provider is answering
+
+    Raises:
+        CircuitOpenError: provider is degraded, nothing was sent
+        AbandonedCallsError: MAX_ABANDONED timed-out requests still running, nothing was sent
+        DeadlineExceeded: no answer within the deadline
+        Exception: whatever fn raised (last error if the hedge also failed)
+    """
+    with _lock:
+        abandoned = _abandoned.get(provider, 0)
+    if abandoned >= MAX_ABANDONED:
+        if slot is not None:
+            slot.release()
+        _count(provider, "fast_fails")
+        raise AbandonedCallsError(provider, f"{abandoned} timed-out calls still running ({name} call not sent)")
+
+    cb = breaker(provider)
+    if not cb.allow():
+        if slot is not None:
+            slot.release()
+        _count(provider, "fast_fails")
+        raise CircuitOpenError(provider, f"circuit open after repeated failures ({name} call not sent)")
+
+    _count(provider, "calls")
+    deadline = deadline or CALL_DEADLINES.get(provider, DEFAULT_DEADLINE)
+    start = time.monotonic()
+    end = start + deadline
+    hedge_at = _hedge_after(provider, name) if hedge and HEDGE_ENABLED and name in HEDGE_CALLS else None
+
+    started = {_submit(slot, fn, *args, **kwargs): start}
+    pending = set(started)
+    hedge_future = None
+    last_error = None
+
+    while pending:
+        now = time.monotonic()
+        wake = end
+        if hedge_at is not None and hedge_future is None:
+            wake = min(wake, start + hedge_at)
+        done, pending = wait(pending, timeout=max(0.0, wake - now), return_when=FIRST_COMPLETED)
+
+        for future in done:
+            try:
+                result = future.result()
+            except Exception as e:
+                last_error = e
+                continue
+            for other in pending:
+                other.cancel()  # drops a hedge that hasn't started; a running one is ignored
+            if future is hedge_future:
+                _count(provider, "hedge_wins")
+            _record_latency(provider, name, time.monotonic() - started[future])
+            cb.record_success()
+            return result
+
+        if done:
+            continue  # a failure; wait for the other request if one is in flight
+        if time.monotonic() >= end:
+            break
+        if hedge_at is not None and hedge_future is None and cb.state == "closed":
+            if slot is not None and not slot.acquire(blocking=False):
+                hedge_at = None  # at the provider's limit: don't add load
+                continue
+            hedge_future = _submit(slot, fn, *args, **kwargs)
+            started[hedge_future] = time.monotonic()
+            pending.add(hedge_future)
+            _count(provider, "hedges")
+            print(f"    Hedging slow {provider} {name} call (>{hedge_at:.1f}s)")
+
+    if pending:
+        for future in pending:
+            if not future.cancel():
+                _abandon(provider, future)
+        _count(provider, "deadlines")
+        cb.record_failure()
+        raise DeadlineExceeded(provider, f"{name} call exceeded {deadline:g}s deadline")
+
+    _count(provider, "failures")
+    if transient is None or transient(last_error):
+        cb.record_failure()
+    else:
+        cb.record_success()  # the provider answered; the request itself was rejected
+    raise last_error
+
+
+# ── Stats ────────────────────────────────────────────────────
+
+def call_stats() -> dict:
+    """{provider: {calls, hedges, hedge_wins, deadlines, failures, fast_fails, circuit_opens,
+    abandoned, state}}; abandoned counts timed-out requests still running"""
+    with _lock:
+        out = {p: dict(s) for p, s in _stats.items()}
+        breakers = dict(_breakers)
+        abandoned = dict(_abandoned)
+    for provider, n in abandoned.items():
+        out.setdefault(provider, {})['abandoned'] = n
+    for provider, cb in breakers.items():
+        out.setdefault(provider, {})['state'] = cb.state
+    return out
+
+
+def print_call_stats():
+    """One line per provider; silent if nothing notable (no hedges/timeouts/failures)."""
+    stats = call_stats()
+    notable = {p: s for p, s in stats.items()
+               if any(s.get(k) for k in ('hedges', 'deadlines', 'failures', 'fast_fails'))}
+    if not notable:
+        return
+    print("  Provider calls (guarded):")
+    for provider, s in sorted(notable.items()):
+        print(f"    {provider:<8} {s.get('calls', 0)} calls, {s.get('hedges', 0)} hedged "
+              f"({s.get('hedge_wins', 0)} won), {s.get('deadlines', 0)} timed out, "
+              f"{s.get('failures', 0)} failed, {s.get('fast_fails', 0)} failed fast, "
+              f"{s.get('abandoned', 0)} abandoned still running, circuit {s.get('state', 'closed')}")
+
+
+def reset():
+    """Clear latency history, breakers and stats (tests / load test runs).
+    Abandoned requests still running stay counted."""
+    with _lock:
+        _latencies.clear()
+        _breakers.clear()
+        _stats.clear()
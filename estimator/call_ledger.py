@@ -0,0 +1,287 @@
+"""
+Call Ledger — per-call cost and latency records for every external call
+
+Each Gemini / Claude / Whisper request (via providers.call), Gemini video
+upload and Encircle API request appends one JSON line to the ledger:
+
+    {"ts": ..., "claim": "Smith_Huttie", "stage": "photo", "provider": "gemini",
+     "model": "gemini-2.5-flash", "input_tokens": 5210, "output_tokens": 184,
+     "cached_tokens": 4890, "bytes": 412345, "latency_s": 3.21,
+     "cache_hit": true, "outcome": "ok", "cost_usd": 0.0012}
+
+The claim is taken from the caller's context (set_claim, inherited by
+worker threads started with submit()); the stage is the call name
+("photo", "photo_batch", "video", "merge", "transcribe", ...).
+
+Costs are estimates from MODEL_PRICES (USD per 1M tokens, per audio
+minute for Whisper); unknown models are recorded with cost_usd 0.
+
+Report:
+    python call_ledger.py                       # by claim
+    python call_ledger.py --by stage --since 2026-10-01
+    python call_ledger.py --by model --claim Smith_Huttie
+
+Settings (environment):
+    CALL_LEDGER=output/call_ledger.jsonl   # "0" disables; fake-provider
+                                           # calls are only recorded when set
+"""
+
+import argparse
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+DEFAULT_LEDGER_PATH = Path(__file__).parent / 'output' / 'call_ledger.jsonl'
+
+# USD per 1M tokens: (input, output, cached input). Whisper is per audio minute.
+MODEL_PRICES = {
+    "gemini-2.5-pro": (1.25, 10.00, 0.31),
+    "gemini-2.5-flash": (0.30, 2.50, 0.075),
+    "gemini-2.0-flash": (0.10, 0.40, 0.025),
+    "claude-sonnet-4-5-20250929": (3.00, 15.00, 0.30),
+    "gpt-4o": (2.50, 10.00, 1.25),
+}
+CLAUDE_CACHE_WRITE_MULTIPLIER = 1.25
+WHISPER_PRICE_PER_MINUTE = {"whisper-1": 0.006}
+
+_claim = contextvars.ContextVar("ledger_claim", default="")
+_lock = threading.Lock()
+
+
+# ── Claim context ────────────────────────────────────────────
+
+def set_claim(label: str):
+    """Label subsequent calls in this context (and threads started via submit())."""
+    _claim.set(label or "")
+
+
+def current_claim() -> str:
+    return _claim.get()
+
+
+def scoped(fn):
+    """Run fn in a copy of the caller's context so set_claim() inside it
+    doesn't outlive the call."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return contextvars.copy_context().run(fn, *args, **kwargs)
+    return wrapper
+
+
+def submit(pool, fn, *args, **kwargs):
+    """pool.submit carrying the claim label into the worker thread."""
+    return pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+# ── Recording ────────────────────────────────────────────────
+
+def ledger_path() -> Path | None:
+    """Where records go, or None if the ledger is off.
+
+    Fake-provider runs (load tests, benchmarks) are only recorded when
+    CALL_LEDGER is set explicitly, so they never mix with real spend.
+    """
+    value = os.environ.get("CALL_LEDGER")
+    if value == "0":
+        return None
+    if value:
+        return Path(value)
+    from fake_providers import is_enabled
+    return None if is_enabled() else DEFAULT_LEDGER_PATH
+
+
+def estimate_cost(model: str, input_tokens: int = 0, output_tokens: int = 0,
+                  cached_tokens: int = 0, cache_write_tokens: int = 0,
+                  audio_seconds: float = 0.0) -> float:
+    """Estimated USD for one call (input_tokens includes cached/written tokens)."""
+    if model in WHISPER_PRICE_PER_MINUTE:
+        return WHISPER_PRICE_PER_MINUTE[model] * audio_seconds / 60
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        return 0.0
+    price_in, price_out, price_cached = prices
+    uncached = max(0, input_tokens - cached_tokens - cache_write_tokens)
+    return (uncached * price_in
+            + cached_tokens * price_cached
+            + cache_write_tokens * price_in * CLAUDE_CACHE_WRITE_MULTIPLIER
+            + output_tokens * price_out) / 1_000_000
+
+
+def usage_from(response) -> dict:
+    """Token counts from a Gemini, Anthropic or OpenAI response (zeros if absent)."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:  # Gemini
+        return {
+            'input_tokens': getattr(usage, "prompt_token_count", 0) or 0,
+            'output_tokens': getattr(usage, "candidates_token_count", 0) or 0,
+            'cached_tokens': getattr(usage, "cached_content_token_count", 0) or 0,
+            'cache_write_tokens': 0,
+        }
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return {'input_tokens': 0, 'output_tokens': 0, 'cached_tokens': 0, 'cache_write_tokens': 0}
+    if hasattr(usage, "prompt_tokens"):  # OpenAI chat
+        return {
+            'input_tokens': usage.prompt_tokens or 0,
+            'output_tokens': getattr(usage, "completion_tokens", 0) or 0,
+            'cached_tokens': 0,
+            'cache_write_tokens': 0,
+        }
+    cached = getattr(usage, "cache_read_input_tokens", 0) or 0  # Anthropic
+    written = getattr(usage, "cache_creation_input_tokens", 0) or 0
+    return {
+        'input_tokens': (getattr(usage, "input_tokens", 0) or 0) + cached + written,
+        'output_tokens': getattr(usage, "output_tokens", 0) or 0,
+        'cached_tokens': cached,
+        'cache_write_tokens': written,
+    }
+
+
+def payload_bytes(value) -> int:
+    """Approximate request payload size: inline images/audio plus text."""
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode("utf-8", "ignore"))
+    if isinstance(value, dict):
+        return sum(payload_bytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(payload_bytes(v) for v in value)
+    inline = getattr(value, "inline_data", None)  # google.genai types.Part
+    if inline is not None:
+        return len(getattr(inline, "data", b"") or b"")
+    return 0
+
+
+def record(stage: str, provider: str, model: str = "", latency_s: float = 0.0,
+           outcome: str = "ok", response=None, bytes_sent: int = 0,
+           audio_seconds: float = 0.0, claim: str = None):
+    """Append one call to the ledger (no-op when the ledger is off).
+
+    Never raises: a full disk or bad path must not fail an estimate.
+    """
+    path = ledger_path()
+    if path is None:
+        return
+    usage = usage_from(response) if response is not None else usage_from(None)
+    entry = {
+        'ts': round(time.time(), 3),
+        'claim': claim if claim is not None else current_claim(),
+        'stage': stage,
+        'provider': provider,
+        'model': model or "",
+        'input_tokens': usage['input_tokens'],
+        'output_tokens': usage['output_tokens'],
+        'cached_tokens': usage['cached_tokens'],
+        'bytes': int(bytes_sent),
+        'latency_s': round(latency_s, 3),
+        'cache_hit': usage['cached_tokens'] > 0,
+        'outcome': outcome,
+        'cost_usd': round(estimate_cost(model, audio_seconds=audio_seconds, **usage), 6),
+    }
+    if audio_seconds:
+        entry['audio_seconds'] = round(audio_seconds, 1)
+    try:
+        with _lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+    except OSError as e:
+        print(f"  WARNING: call ledger write failed ({path}): {e}")
+
+
+# ── Report ───────────────────────────────────────────────────
+
+def load(path: Path = None, since: str = None, claim: str = None) -> list[dict]:
+    """Ledger records, optionally from a date (YYYY-MM-DD) and for one claim (substring)."""
+    path = Path(path or ledger_path() or DEFAULT_LEDGER_PATH)
+    if not path.exists():
+        return []
+    cutoff = datetime.fromisoformat(since).timestamp() if since else 0
+    records = []
+    with open(path) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a torn last line from a crash
+            if entry.get('ts', 0) < cutoff:
+                continue
+            if claim and claim.lower() not in entry.get('claim', '').lower():
+                continue
+            records.append(entry)
+    return records
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def aggregate(records: list[dict], by: str = "claim") -> list[dict]:
+    """Group records by "claim", "stage", "model" or "provider"; costliest first."""
+    groups = {}
+    for r in records:
+        groups.setdefault(r.get(by) or "(none)", []).append(r)
+    rows = []
+    for key, items in groups.items():
+        latencies = [r['latency_s'] for r in items]
+        token_calls = [r for r in items if r['input_tokens']]
+        rows.append({
+            by: key,
+            'calls': len(items),
+            'errors': sum(1 for r in items if r['outcome'] != "ok"),
+            'input_tokens': sum(r['input_tokens'] for r in items),
+            'output_tokens': sum(r['output_tokens'] for r in items),
+            'cache_hit_rate': (sum(1 for r in token_calls if r['cache_hit']) / len(token_calls)
+                               if token_calls else 0.0),
+            'mb': sum(r['bytes'] for r in items) / (1024 * 1024),
+            'p50_s': _percentile(latencies, 50),
+            'p95_s': _percentile(latencies, 95),
+            'total_s': sum(latencies),
+            'cost_usd': sum(r['cost_usd'] for r in items),
+        })
+    return sorted(rows, key=lambda row: (-row['cost_usd'], -row['total_s']))
+
+
+def print_report(rows: list[dict], by: str):
+    if not rows:
+        print("No ledger records.")
+        return
+    print(f"{by.title():<32} {'Calls':>6} {'Err':>4} {'In tok':>10} {'Out tok':>9} "
+          f"{'Cache':>6} {'MB':>8} {'p50 s':>7} {'p95 s':>7} {'Total s':>8} {'Cost':>9}")
+    print("-" * 108)
+    for row in rows:
+        print(f"{str(row[by])[:32]:<32} {row['calls']:>6} {row['errors']:>4} "
+              f"{row['input_tokens']:>10,} {row['output_tokens']:>9,} "
+              f"{row['cache_hit_rate']:>6.0%} {row['mb']:>8.1f} {row['p50_s']:>7.1f} "
+              f"{row['p95_s']:>7.1f} {row['total_s']:>8.0f} ${row['cost_usd']:>8.2f}")
+    print("-" * 108)
+    print(f"{'TOTAL':<32} {sum(r['calls'] for r in rows):>6} {sum(r['errors'] for r in rows):>4} "
+          f"{sum(r['input_tokens'] for r in rows):>10,} {sum(r['output_tokens'] for r in rows):>9,} "
+          f"{'':>6} {sum(r['mb'] for r in rows):>8.1f} {'':>7} {'':>7} "
+          f"{sum(r['total_s'] for r in rows):>8.0f} ${sum(r['cost_usd'] for r in rows):>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cost/latency report from the call ledger")
+    parser.add_argument("--by", choices=["claim", "stage", "model", "provider"], default="claim")
+    parser.add_argument("--since", type=str, default=None, help="Only calls on/after YYYY-MM-DD")
+    parser.add_argument("--claim", type=str, default=None, help="Only claims matching this text")
+    parser.add_argument("--ledger", type=str, default=None,
+                        help=f"Ledger file (default CALL_LEDGER or {DEFAULT_LEDGER_PATH.name})")
+    args = parser.parse_args()
+
+    records = load(args.ledger, since=args.since, claim=args.claim)
+    print_report(aggregate(records, args.by), args.by)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Contact sheet vs separate photos: latency, payload size and TAG accuracy
+on the labeled Prokell-Austin rooms (Diana's actuals, see model_comparison.py).
+
+Each room's sampled photos are analyzed twice per provider -- once as
+separate images, once tiled into a single contact sheet -- through the
+same code paths the pipelines use (estimate.analyze_photos_for_room for
+Claude, encircle_pipeline._analyze_room_photos for Gemini).
+
+Usage:
+    python contact_sheet_benchmark.py
+    python contact_sheet_benchmark.py --provider gemini --gemini-model gemini-2.5-flash
+    python contact_sheet_benchmark.py --fake --photo-dir output/photos   # offline smoke run
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+load_dotenv(Path(__file__).parent / '.env')
+
+sys.path.insert(0, str(Path(__file__).parent))
+import model_comparison
+from model_comparison import DIANA_ACTUALS, get_room_photos
+from image_prep import prepare_image, make_contact_sheet
+
+MODES = ('separate', 'sheet')
+
+
+def _payload_bytes(photo_paths, mode):
+    if mode == 'sheet' and len(photo_paths) > 1:
+        return len(make_contact_sheet(photo_paths).data)
+    return sum(len(prepare_image(p).data) for p in photo_paths)
+
+
+def run_claude(room_name, actuals, photos, mode):
+    from estimate import analyze_photos_for_room
+    from providers import get_client
+
+    result = analyze_photos_for_room(
+        photos, room_name, get_client("claude"),
+        room_category=actuals['category'], density=actuals['density'],
+        contact_sheet=(mode == 'sheet'),
+    )
+    return result['tag_count'] if result else None
+
+
+def run_gemini(room_name, actuals, photos, mode, model="gemini-2.5-pro"):
+    from encircle_pipeline import _analyze_room_photos
+
+    result = _analyze_room_photos([str(p) for p in photos], room_name, model,
+                                  contact_sheet=(mode == 'sheet'))
+    return result.get('estimated_tags', 0) if result else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Contact sheet vs separate photo benchmark')
+    parser.add_argument('--provider', choices=['claude', 'gemini', 'both'], default='both')
+    parser.add_argument('--gemini-model', default='gemini-2.5-pro')
+    parser.add_argument('--photo-dir', default=None, help='Override photo directory (one subdir per room)')
+    parser.add_argument('--fake', action='store_true', help='Use fake providers (offline, no cost)')
+    args = parser.parse_args()
+
+    if args.fake:
+        import fake_providers
+        fake_providers.enable()
+    if args.photo_dir:
+        model_comparison.PHOTO_DIR = Path(args.photo_dir)
+
+    runners = {}
+    if args.provider in ('claude', 'both'):
+        runners['Claude'] = run_claude
+    if args.provider in ('gemini', 'both'):
+        runners['Gemini'] = lambda *a: run_gemini(*a, model=args.gemini_model)
+
+    # rows[(provider, mode)] = list of (room, actual, tags, seconds, bytes)
+    rows = {(p, m): [] for p in runners for m in MODES}
+
+    for room_name, actuals in DIANA_ACTUALS.items():
+        photos = get_room_photos(room_name)
+        if not photos:
+            print(f"\n{room_name}: NO PHOTOS FOUND, skipping")
+            continue
+        print(f"\n{room_name} ({len(photos)} photos, Diana: {actuals['tags']} TAGs)")
+
+        for provider, runner in runners.items():
+            for mode in MODES:
+                payload = _payload_bytes(photos, mode)
+                t0 = time.time()
+                try:
+                    tags = runner(room_name, actuals, photos, mode)
+                except Exception as e:
+                    print(f"  {provider} {mode}: FAILED - {e}")
+                    tags = None
+                elapsed = time.time() - t0
+                rows[(provider, mode)].append((room_name, actuals['tags'], tags, elapsed, payload))
+                shown = 'FAIL' if tags is None else tags
+                print(f"  {provider:<7} {mode:<9} {shown:>5} TAGs  {elapsed:5.1f}s  "
+                      f"{payload / 1024:7.0f} KB")
+
+    print(f"\n{'='*72}")
+    print("SUMMARY")
+    print(f"{'='*72}")
+    print(f"{'Provider':<8} {'Mode':<9} {'Rooms':>5} {'TAGs':>6} {'Diana':>6} "
+          f"{'MAPE':>7} {'Avg s':>7} {'Avg KB':>8}")
+    print("-" * 72)
+    for (provider, mode), entries in rows.items():
+        ok = [e for e in entries if e[2] is not None]
+        if not entries:
+            continue
+        total = sum(e[2] for e in ok)
+        diana = sum(e[1] for e in ok)
+        errors = [abs(e[2] - e[1]) / e[1] for e in ok if e[1] > 0]
+        mape = sum(errors) / len(errors) * 100 if errors else 0
+        avg_s = sum(e[3] for e in entries) / len(entries)
+        avg_kb = sum(e[4] for e in entries) / len(entries) / 1024
+        print(f"{provider:<8} {mode:<9} {len(ok):>5} {total:>6} {diana:>6} "
+              f"{mape:>6.1f}% {avg_s:>7.1f} {avg_kb:>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -63,12 +63,19 @@ class EncircleClient:
             if query:
                 url = f"{url}?{query}"
 
+        import call_ledger
+
         for attempt in range(MAX_RETRIES + 1):
             req = urllib.request.Request(url, headers=self._headers)
+            t0 = time.time()
             try:
                 with urllib.request.urlopen(req, timeout=30) as resp:
-                    return json.loads(resp.read().decode())
+                    body = resp.read()
+                call_ledger.record("api", "encircle", latency_s=time.time() - t0, bytes_sent=len(body))
+                return json.loads(body.decode())
             except urllib.error.HTTPError as e:
+                call_ledger.record("api", "encircle", latency_s=time.time() - t0,
+                                   outcome=f"error:HTTP {e.code}")
                 if e.code == 401:
                     raise EncircleAPIError(401, "Invalid or expired API token")
                 if e.code == 404:
@@ -81,6 +88,8 @@ class EncircleClient:
                 body = e.read().decode() if e.fp else str(e)
                 raise EncircleAPIError(e.code, body)
             except urllib.error.URLError as e:
+                call_ledger.record("api", "encircle", latency_s=time.time() - t0,
+                                   outcome=f"error:{type(e).__name__}")
                 if attempt < MAX_RETRIES:
                     wait = RETRY_BACKOFF * (2 ** attempt)
                     print(f"  Connection error, retrying in {wait:.0f}s: {e}")
@@ -260,13 +269,20 @@ class EncircleClient:
             return output_path
 
         print(f"  Downloading: {filename}...")
+        import call_ledger
+
         for attempt in range(MAX_RETRIES + 1):
+            t0 = time.time()
             try:
                 urllib.request.urlretrieve(download_url, str(output_path))
+                call_ledger.record("download", "encircle", latency_s=time.time() - t0,
+                                   bytes_sent=output_path.stat().st_size)
                 size_mb = output_path.stat().st_size / (1024 * 1024)
                 print(f"  Saved: {filename} ({size_mb:.1f} MB)")
                 return output_path
             except Exception as e:
+                call_ledger.record("download", "encircle", latency_s=time.time() - t0,
+                                   outcome=f"error:{type(e).__name__}")
                 if attempt < MAX_RETRIES:
                     wait = RETRY_BACKOFF * (2 ** attempt)
                     print(f"  Download error, retrying in {wait:.0f}s: {e}")
@@ -21,6 +21,7 @@ import json
 import os
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from dataclasses import dataclass, field
 from dotenv import load_dotenv
@@ -32,6 +33,13 @@ sys.path.insert(0, str(Path(__file__).parent))
 load_dotenv(Path(__file__).parent / '.env')
 
 from encircle_client import EncircleClient, EncircleAPIError
+from prompt_cache import PROMPT_CACHE_ENABLED, gemini_generate, print_cache_stats
+from call_guard import print_call_stats
+import call_ledger
+import reference_data
+from profiling import run_profiled, stage
+from providers import ProviderNotConfigured, get_client, parse_json, response_text
+from model_router import ModelRouter, AUTO_MODEL
 
 
 @dataclass
@@ -58,6 +66,9 @@ class PipelineResult:
     estimate_result: dict = field(default_factory=dict)
     total_rcv: float = 0.0
 
+    # Model routing (gemini_model="auto"): ModelRouter.summary()
+    model_routing: dict = field(default_factory=dict)
+
     # Status
     error: str = ""
 
@@ -157,6 +168,7 @@ def _extract_customer_name(claim: dict) -> str:
     return name.replace(" ", "_")
 
 
+@call_ledger.scoped
 def run_encircle_pipeline(
     claim_name: str = None,
     claim_id: str = None,
@@ -181,14 +193,22 @@ def run_encircle_pipeline(
         output_base: Base output directory (default: estimator/output/)
         drive_time_min: One-way drive time for cartage calc
         storage_duration_months: Storage months for estimate
-        gemini_model: Gemini model for video analysis
+        gemini_model: Gemini model for video and photo analysis, or "auto" (opt-in)
+                      to route each video/photo group between the fast and pro
+                      models (model_router; decisions logged per claim). An
+                      escalated video is uploaded again
         skip_whisper: Skip Whisper audio transcription
         gemini_only: Use Gemini only (no Whisper, no Claude merge)
     """
+    from fake_providers import get_fake_client
+
     result = PipelineResult()
-    client = EncircleClient()
+    client = get_fake_client("encircle") or EncircleClient()
+    router = ModelRouter() if gemini_model == AUTO_MODEL else None
+    call_ledger.set_claim(claim_id or claim_name)
 
     # ── Step 1: Find claim ──────────────────────────────────
+    stage("find claim")
     print("\n=== Encircle Pipeline ===\n")
 
     if claim_id:
@@ -214,11 +234,13 @@ def run_encircle_pipeline(
     result.claim = claim
     result.claim_id = claim.get("id", "")
     result.customer_name = _extract_customer_name(claim)
+    call_ledger.set_claim(f"{result.customer_name} ({result.claim_id})")
 
     print(f"\nFound claim:")
     client.print_claim_summary(claim)
 
     # ── Step 2: List media ──────────────────────────────────
+    stage("list media")
     print(f"\nFetching media for claim {result.claim_id}...")
     media = client.get_media(result.claim_id)
     videos = client.filter_videos(media)
@@ -273,6 +295,7 @@ def run_encircle_pipeline(
     print(f"\nOutput directory: {output_dir}")
 
     # ── Step 4: Download videos ─────────────────────────────
+    stage("download videos")
     if videos and not photos_only:
         video_dir = output_dir / "videos"
         print(f"\nDownloading {len(videos)} video(s)...")
@@ -284,6 +307,7 @@ def run_encircle_pipeline(
                 print(f"  WARNING: Failed to download video: {e}")
 
     # ── Step 5: Download photos (grouped by room) ──────────
+    stage("download photos")
     photos_by_room = {}  # room_name -> list of local file paths
     if photos:
         photo_dir = output_dir / "photos"
@@ -307,6 +331,7 @@ def run_encircle_pipeline(
         print(f"  Downloaded {total_dl} photo(s) in {len(photos_by_room)} room group(s)")
 
     # ── Step 6: Fetch room structure ────────────────────────
+    stage("room structure")
     print(f"\nFetching Encircle room structure...")
     try:
         rooms = client.get_all_rooms(result.claim_id)
@@ -327,6 +352,7 @@ def run_encircle_pipeline(
         print(f"  Saved: {rooms_path}")
 
     # ── Step 6b: Fetch notes (claim-level + room-level) ───
+    stage("notes")
     all_notes = {"claim_notes": [], "room_notes": {}}
     print(f"\nFetching notes...")
     try:
@@ -370,6 +396,7 @@ def run_encircle_pipeline(
         return result
 
     # ── Step 7: Process videos and/or photos into rooms ─────
+    stage("rooms")
     try:
         from generate_estimate import analyze_from_rooms_json, generate_5phase_estimate
 
@@ -402,6 +429,7 @@ def run_encircle_pipeline(
                     save_intermediates=True,
                     drive_time_min=drive_time_min,
                     storage_duration_months=storage_duration_months,
+                    router=router,
                 )
                 video_results.append(vr)
 
@@ -423,8 +451,9 @@ def run_encircle_pipeline(
             print(f"\n--- Photo Supplement ({len(photos_by_room)} room groups) ---")
             if merged:
                 # Supplement existing video-derived rooms with photo data
+                stage("photo supplement")
                 merged = _supplement_rooms_with_photos(
-                    merged, photos_by_room, gemini_model=gemini_model
+                    merged, photos_by_room, gemini_model=gemini_model, router=router,
                 )
             else:
                 # Photos-only mode: build rooms entirely from photos
@@ -434,7 +463,10 @@ def run_encircle_pipeline(
                     if room_name == "_unassigned":
                         continue
                     print(f"  Analyzing: {room_name} ({len(photo_paths)} photos)...")
-                    analysis = _analyze_room_photos(photo_paths, room_name, gemini_model)
+                    if router:
+                        analysis = _routed_room_photos(router, photo_paths, room_name)
+                    else:
+                        analysis = _analyze_room_photos(photo_paths, room_name, gemini_model)
                     if analysis:
                         cat = classify_room(room_name)
                         merged.append({
@@ -470,6 +502,7 @@ def run_encircle_pipeline(
             print(f"  Saved: {merged_path}")
 
             # ── Step 8: Generate combined estimate ────────────
+            stage("estimate")
             print(f"\nGenerating combined 5-phase estimate...")
             walkthrough = analyze_from_rooms_json(merged)
             est = generate_5phase_estimate(
@@ -507,6 +540,11 @@ def run_encircle_pipeline(
     print(f"  Output:      {output_dir}")
     if result.error:
         print(f"  Error:       {result.error}")
+    print_cache_stats()
+    print_call_stats()
+    if router:
+        result.model_routing = router.summary()
+        router.print_summary()
 
     return result
 
@@ -578,67 +616,312 @@ Respond with ONLY valid JSON (no markdown fences):
 }"""
 
 
+def _gemini_photo_client():
+    """Shared Gemini client for photo analysis, or None without a key."""
+    try:
+        return get_client("gemini")
+    except ProviderNotConfigured:
+        print(f"    WARNING: No GOOGLE_API_KEY — skipping photo analysis")
+        return None
+
+
+def _room_photo_parts(photo_paths: list[str], room_name: str,
+                      contact_sheet: bool = None,
+                      budget_bytes: int = None) -> tuple[list, str]:
+    """Prepare one room's photos as Gemini parts. Returns (parts, sheet_note).
+
+    budget_bytes caps the room's image payload (default PHOTO_REQUEST_BUDGET_MB);
+    over budget, photos are downscaled rather than sent as-is.
+    """
+    import image_prep
+    from image_prep import gemini_image_parts, gemini_sheet_part, select_photos
+
+    if contact_sheet is None:
+        contact_sheet = image_prep.CONTACT_SHEET
+
+    # Skip blurry frames and near-duplicate shots -- they add payload, not information
+    try:
+        photo_paths = select_photos([pp for pp in photo_paths if Path(pp).exists()],
+                                    max_photos=image_prep.MAX_ROOM_PHOTOS)
+    except ImportError:
+        pass
+
+    # Photos are downscaled JPEGs sent inline, which skips a Files API
+    # upload round-trip per photo.
+    parts = []
+    existing = [pp for pp in photo_paths if Path(pp).exists()]
+    sheet_note = ""
+    if contact_sheet and len(existing) > 1:
+        try:
+            parts.append(gemini_sheet_part(existing, budget_bytes))
+            sheet_note = image_prep.CONTACT_SHEET_NOTE.format(count=len(existing)) + "\n\n"
+        except Exception as e:
+            print(f"    WARNING: Contact sheet failed for {room_name}, sending photos separately: {e}")
+    if not parts:
+        parts = gemini_image_parts(existing, budget_bytes)
+    return parts, sheet_note
+
+
 def _analyze_room_photos(photo_paths: list[str], room_name: str,
-                          gemini_model: str = "gemini-2.5-pro") -> dict | None:
+                          gemini_model: str = "gemini-2.5-pro",
+                          contact_sheet: bool = None) -> dict | None:
     """Send room photos to Gemini for TAG/box count analysis.
 
+    contact_sheet=True tiles the photos into one labeled image instead of
+    sending each separately (default: PHOTO_CONTACT_SHEET env var).
+
     Returns dict with estimated_tags, estimated_boxes, density, notes
     or None on failure.
     """
-    from google import genai
-
-    api_key = os.environ.get("GOOGLE_API_KEY")
-    if not api_key:
-        print(f"    WARNING: No GOOGLE_API_KEY — skipping photo analysis")
+    client = _gemini_photo_client()
+    if client is None:
         return None
 
-    client = genai.Client(api_key=api_key)
-
     # Build content: photos + prompt
-    contents = []
-    for pp in photo_paths:
-        p = Path(pp)
-        if not p.exists():
-            continue
-        # Upload image file to Gemini
-        try:
-            uploaded = client.files.upload(file=str(p))
-            contents.append(uploaded)
-        except Exception as e:
-            print(f"    WARNING: Could not upload {p.name}: {e}")
-
+    contents, sheet_note = _room_photo_parts(photo_paths, room_name, contact_sheet)
     if not contents:
         return None
 
-    prompt = f"Room: {room_name}\n\n{PHOTO_ANALYSIS_PROMPT}"
+    if PROMPT_CACHE_ENABLED:
+        # Calibration prompt goes in the (cached) system instruction; only the
+        # room label and photos vary per call
+        prompt = f"Room: {room_name}\n\n{sheet_note}Analyze the photos of this room."
+    else:
+        prompt = f"Room: {room_name}\n\n{sheet_note}{PHOTO_ANALYSIS_PROMPT}"
     contents.append(prompt)
 
     try:
-        response = client.models.generate_content(
-            model=gemini_model,
-            contents=contents,
-            config={
-                "response_mime_type": "application/json",
-                "temperature": 0.1,
-            },
+        response = gemini_generate(
+            client, gemini_model, contents, PHOTO_ANALYSIS_PROMPT,
+            {"response_mime_type": "application/json", "temperature": 0.1},
+            prompt_name="photo",
         )
-        text = response.text.strip()
-        # Strip markdown fences if present
-        if text.startswith("```"):
-            lines = text.split("\n")
-            lines = [l for l in lines if not l.strip().startswith("```")]
-            text = "\n".join(lines).strip()
-        result = json.loads(text)
-        return result
+        return parse_json(response_text(response))
     except Exception as e:
         print(f"    WARNING: Gemini photo analysis failed for {room_name}: {e}")
         return None
 
 
+# Small rooms are batched into one Gemini request (one copy of the prompt)
+PHOTO_BATCH_MAX_ROOMS = int(os.environ.get("PHOTO_BATCH_MAX_ROOMS", 4))  # 0/1 = off
+PHOTO_BATCH_MAX_PHOTOS = 4  # rooms with more photos than this go alone
+SMALL_ROOM_CATEGORIES = {"bathroom", "closet", "laundry", "hallway"}
+
+BATCH_PROMPT_SUFFIX = """
+
+## MULTIPLE ROOMS
+
+This request covers several rooms. Each room's photos follow a "Room: <name>" label.
+Analyze each room separately -- never count an item in more than one room.
+Respond with ONLY a JSON object whose keys are the room names exactly as labeled,
+each mapping to an object with the fields from the instructions:
+{"<room name>": {"estimated_tags": <int>, "estimated_boxes": <int>, "tag_items": [...], "density": "...", "notes": "..."}}"""
+
+
+def _is_batchable_room(room_name: str, photo_paths: list[str]) -> bool:
+    from build_visual_training import classify_room
+    return (classify_room(room_name) in SMALL_ROOM_CATEGORIES
+            and 0 < len(photo_paths) <= PHOTO_BATCH_MAX_PHOTOS)
+
+
+def _analyze_room_photos_batch(groups: dict[str, list[str]],
+                               gemini_model: str = "gemini-2.5-pro",
+                               contact_sheet: bool = None) -> dict[str, dict | None]:
+    """Analyze several small rooms in one Gemini request.
+
+    Returns {room_name: analysis dict or None}. Rooms missing from (or
+    malformed in) the response are retried with single-room calls, as is
+    the whole batch if the response can't be parsed.
+    """
+    if len(groups) == 1:
+        (name, paths), = groups.items()
+        return {name: _analyze_room_photos(paths, name, gemini_model, contact_sheet)}
+
+    client = _gemini_photo_client()
+    if client is None:
+        return {name: None for name in groups}
+
+    import image_prep
+
+    contents = [f"Rooms: {json.dumps(list(groups))}"]
+    sent = []
+    room_budget = image_prep.REQUEST_BUDGET_BYTES // len(groups)  # whole request shares one budget
+    for name, paths in groups.items():
+        parts, sheet_note = _room_photo_parts(paths, name, contact_sheet, room_budget)
+        if not parts:
+            continue
+        contents.append(f"Room: {name}\n{sheet_note.strip()}".strip())
+        contents.extend(parts)
+        sent.append(name)
+    contents.append(BATCH_PROMPT_SUFFIX.strip() if PROMPT_CACHE_ENABLED
+                    else PHOTO_ANALYSIS_PROMPT + BATCH_PROMPT_SUFFIX)
+
+    results = {name: None for name in groups}
+    parsed = {}
+    if sent:
+        print(f"    Batched photo analysis: {', '.join(sent)}")
+        try:
+            response = gemini_generate(
+                client, gemini_model, contents, PHOTO_ANALYSIS_PROMPT,
+                {"response_mime_type": "application/json", "temperature": 0.1},
+                prompt_name="photo_batch",
+            )
+            parsed = parse_json(response_text(response))
+            if not isinstance(parsed, dict):
+                raise ValueError("batch response is not a JSON object")
+        except Exception as e:
+            print(f"    WARNING: Batched photo analysis failed ({e}) -- falling back to single rooms")
+            parsed = {}
+
+    for name in sent:
+        analysis = parsed.get(name)
+        if isinstance(analysis, dict) and "estimated_tags" in analysis:
+            results[name] = analysis
+        else:
+            if parsed:
+                print(f"    WARNING: '{name}' missing from batch response -- analyzing alone")
+            results[name] = _analyze_room_photos(groups[name], name, gemini_model, contact_sheet)
+    return results
+
+
+def _routed_room_photos(router: ModelRouter, photo_paths: list[str], room_name: str,
+                        first: tuple = None, first_result: tuple = None) -> dict | None:
+    """_analyze_room_photos on the routed model, escalating to pro if the
+    fast result is missing or off the lookup baseline."""
+    return router.run(
+        "photos", room_name, first or router.photo_model(room_name, photo_paths),
+        lambda model: _analyze_room_photos(photo_paths, room_name, model),
+        lambda analysis: router.check_photos(room_name, analysis),
+        usable=lambda analysis: isinstance(analysis, dict),
+        first_result=first_result,
+    )
+
+
+def _routed_room_photos_batch(router: ModelRouter,
+                              groups: dict[str, list[str]]) -> dict[str, dict | None]:
+    """Small-room batch on the fast model; rooms that fail the check go to pro alone."""
+    t0 = time.time()
+    fast = _analyze_room_photos_batch(groups, router.fast_model)
+    per_room = (time.time() - t0) / max(len(groups), 1)
+    first = (router.fast_model, "batched small room")
+    return {name: _routed_room_photos(router, paths, name, first, (fast.get(name), per_room))
+            for name, paths in groups.items()}
+
+
+# Max rooms analyzed at once (each is one Gemini vision call)
+PHOTO_MAX_CONCURRENCY = int(os.environ.get("PHOTO_MAX_CONCURRENCY", 4))
+
+# Photo planner: skip photo calls that can't change a room's final counts.
+# Photo counts are assumed not to exceed this room_scope_lookup.json tier
+# (light/medium/heavy/very_heavy); see _plan_photo_groups.
+PHOTO_PLAN = os.environ.get("PHOTO_PLAN", "1") != "0"
+PHOTO_PLAN_CEILING_TIER = os.environ.get("PHOTO_PLAN_CEILING_TIER", "heavy")
+
+
+def _photo_skip_reason(room: dict, lookup_data: dict,
+                       ceiling_tier: str = PHOTO_PLAN_CEILING_TIER) -> str | None:
+    """Why a photo call can't change this video room's counts (None if it might).
+
+    The merge in _supplement_rooms_with_photos only raises video counts, and
+    photo counts are assumed to top out at the room's ceiling_tier lookup
+    counts. So a photo call is skipped only when the video's own TAG and box
+    counts already reach that tier. The lookup floor is deliberately ignored:
+    a room the video undercounted still gets its photos checked.
+    """
+    if room.get('override_tags') is None and room.get('override_boxes') is None:
+        return None  # no video counts to compare against
+
+    category = room.get('room_category', 'other')
+    tiers = lookup_data.get(category, lookup_data.get('other', {}))
+    ceiling_tags = tiers.get('typical_tags', {}).get(ceiling_tier, 0)
+    ceiling_boxes = tiers.get('typical_boxes', {}).get(ceiling_tier, 0)
+    video_tags = room.get('override_tags') or 0
+    video_boxes = room.get('override_boxes') or 0
+
+    if video_tags >= ceiling_tags and video_boxes >= ceiling_boxes:
+        return (f"video {video_tags} TAGs/{video_boxes} boxes already >= "
+                f"{ceiling_tier} {category} ({ceiling_tags}/{ceiling_boxes})")
+    return None
+
+
+def _match_photo_room(enc_room_name: str, room_lookup: dict, matched_room_keys: set):
+    """Video room a photo group supplements: (room dict, lookup key) or (None, None)."""
+    from build_visual_training import classify_room
+
+    # Try exact match first
+    key = enc_room_name.lower().strip()
+    target = room_lookup.get(key)
+    if target:
+        return target, key
+
+    # Try substring/category matching if exact fails
+    enc_cat = classify_room(enc_room_name)
+    for rkey, rdict in room_lookup.items():
+        # Skip rooms already matched by a previous photo group
+        if rkey in matched_room_keys:
+            continue
+        # Match by category
+        if rdict.get("room_category") == enc_cat:
+            return rdict, rkey
+        # Match by substring
+        if key in rkey or rkey in key:
+            return rdict, rkey
+    return None, None
+
+
+def _plan_photo_groups(rooms: list[dict], photos_by_room: dict[str, list[str]],
+                       ceiling_tier: str = PHOTO_PLAN_CEILING_TIER) -> dict[str, str]:
+    """Photo groups whose analysis can't change the estimate -> reason.
+
+    Groups are matched to video rooms the same way the supplement loop does;
+    groups with no video room are always analyzed (they become new rooms).
+
+    Photo counts are assumed to top out at the room's ceiling_tier lookup
+    counts (PHOTO_PLAN_CEILING_TIER, default "heavy"), so only rooms whose
+    video counts already reach that tier are skipped. Use "very_heavy" to
+    skip fewer rooms, or PHOTO_PLAN=0 to turn the planner off.
+    """
+    from build_visual_training import classify_room
+
+    lookup_data = reference_data.room_lookup()
+
+    room_lookup = {r.get("room_name", "").lower().strip(): r for r in rooms}
+    matched_room_keys = set()
+    skipped = {}
+    for enc_room_name in photos_by_room:
+        if enc_room_name == "_unassigned":
+            continue
+        target, target_key = _match_photo_room(enc_room_name, room_lookup, matched_room_keys)
+        if not target:
+            # Will be added as a new room (assuming the analysis succeeds)
+            room_lookup[enc_room_name.lower().strip()] = {
+                "room_name": enc_room_name, "room_category": classify_room(enc_room_name),
+            }
+            continue
+        matched_room_keys.add(target_key)
+        reason = _photo_skip_reason(target, lookup_data, ceiling_tier)
+        if reason:
+            skipped[enc_room_name] = reason
+    return skipped
+
+
+def _plan_photo_requests(groups: list[str], photos_by_room: dict[str, list[str]]):
+    """Split photo groups into (single-room requests, small-room batches)."""
+    small = [name for name in groups if PHOTO_BATCH_MAX_ROOMS > 1
+             and _is_batchable_room(name, photos_by_room[name])]
+    batch_size = max(PHOTO_BATCH_MAX_ROOMS, 1)
+    batches = [small[i:i + batch_size] for i in range(0, len(small), batch_size)]
+    singles = [name for name in groups if name not in small]
+    return singles, batches
+
+
 def _supplement_rooms_with_photos(
     rooms: list[dict],
     photos_by_room: dict[str, list[str]],
     gemini_model: str = "gemini-2.5-pro",
+    max_concurrency: int = None,
+    plan: bool = PHOTO_PLAN,
+    router: ModelRouter = None,
 ) -> list[dict]:
     """Supplement video-derived room data with photo-based box/TAG counts.
 
@@ -646,10 +929,17 @@ def _supplement_rooms_with_photos(
     takes the HIGHER box count (photos catch cabinets/drawers that video misses).
     TAG counts from video are generally trusted; photos can only increase them.
 
+    Room analyses run concurrently (they don't depend on each other); the
+    match/merge pass below then runs in photos_by_room order, so results
+    are identical to analyzing one room at a time.
+
     Args:
         rooms: List of room dicts from video pipeline (with override_tags/boxes)
         photos_by_room: Dict mapping room_name -> list of photo file paths
-        gemini_model: Gemini model for photo analysis
+        gemini_model: Gemini model for photo analysis ("auto" routes fast/pro)
+        max_concurrency: Rooms analyzed at once (default PHOTO_MAX_CONCURRENCY or 4)
+        plan: Skip photo groups whose room can't change (see _photo_skip_reason)
+        router: ModelRouter for gemini_model="auto" (created here if not given)
 
     Returns:
         Updated rooms list with photo-supplemented counts.
@@ -666,6 +956,45 @@ def _supplement_rooms_with_photos(
     # Also try matching Encircle room names to video room names
     from build_visual_training import classify_room
 
+    # Skip groups whose video room is already at/above what photos could add
+    skipped = _plan_photo_groups(rooms, photos_by_room) if plan else {}
+
+    # Analyze every remaining photo group up front, concurrently. Small rooms
+    # (bathrooms, closets, halls) share a request, PHOTO_BATCH_MAX_ROOMS at a time.
+    all_groups = [name for name in photos_by_room if name != "_unassigned"]
+    groups = [name for name in all_groups if name not in skipped]
+    singles, batches = _plan_photo_requests(groups, photos_by_room)
+    requests = len(singles) + len(batches)
+    if skipped:
+        planned = sum(map(len, _plan_photo_requests(all_groups, photos_by_room)))
+        print(f"  Planner: skipping {len(skipped)} of {len(all_groups)} photo group(s) "
+              f"({planned - requests} request(s) saved) -- counts can't change")
+    workers = max(1, min(max_concurrency or PHOTO_MAX_CONCURRENCY, requests or 1))
+    print(f"  Analyzing {len(groups)} photo group(s) in {requests} request(s), {workers} at a time...")
+    own_router = gemini_model == AUTO_MODEL and router is None
+    if own_router:
+        router = ModelRouter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        if router and gemini_model == AUTO_MODEL:
+            futures = {name: call_ledger.submit(pool, _routed_room_photos, router,
+                                                photos_by_room[name], name)
+                       for name in singles}
+            batch_futures = [call_ledger.submit(pool, _routed_room_photos_batch, router,
+                                                {name: photos_by_room[name] for name in batch})
+                             for batch in batches]
+        else:
+            futures = {name: call_ledger.submit(pool, _analyze_room_photos, photos_by_room[name],
+                                                name, gemini_model)
+                       for name in singles}
+            batch_futures = [call_ledger.submit(pool, _analyze_room_photos_batch,
+                                                {name: photos_by_room[name] for name in batch},
+                                                gemini_model)
+                             for batch in batches]
+        analyses = {name: f.result() for name, f in futures.items()}
+        for f in batch_futures:
+            analyses.update(f.result())
+    analyses.update(dict.fromkeys(skipped))
+
     # Track which video rooms have already been matched by a photo group
     # to prevent multiple photo groups from supplementing the same room
     matched_room_keys = set()
@@ -675,33 +1004,13 @@ def _supplement_rooms_with_photos(
         if enc_room_name == "_unassigned":
             continue
 
-        # Try exact match first
         key = enc_room_name.lower().strip()
-        target = room_lookup.get(key)
-        target_key = key if target else None
-
-        # Try substring/category matching if exact fails
-        if not target:
-            enc_cat = classify_room(enc_room_name)
-            for rkey, rdict in room_lookup.items():
-                # Skip rooms already matched by a previous photo group
-                if rkey in matched_room_keys:
-                    continue
-                # Match by category
-                if rdict.get("room_category") == enc_cat:
-                    target = rdict
-                    target_key = rkey
-                    break
-                # Match by substring
-                if key in rkey or rkey in key:
-                    target = rdict
-                    target_key = rkey
-                    break
+        target, target_key = _match_photo_room(enc_room_name, room_lookup, matched_room_keys)
 
         if not target:
             # Room in photos but not in video — add it as a new room
             print(f"  Photo room not in video: '{enc_room_name}' — analyzing as new room")
-            analysis = _analyze_room_photos(photo_paths, enc_room_name, gemini_model)
+            analysis = analyses[enc_room_name]
             if analysis:
                 cat = classify_room(enc_room_name)
                 new_room = {
@@ -723,8 +1032,11 @@ def _supplement_rooms_with_photos(
         if target_key:
             matched_room_keys.add(target_key)
 
+        if enc_room_name in skipped:
+            print(f"  Skipped '{target['room_name']}' photos: {skipped[enc_room_name]}")
+            continue
         print(f"  Supplementing '{target['room_name']}' with {len(photo_paths)} photo(s)...")
-        analysis = _analyze_room_photos(photo_paths, enc_room_name, gemini_model)
+        analysis = analyses[enc_room_name]
         if not analysis:
             continue
 
@@ -762,6 +1074,8 @@ def _supplement_rooms_with_photos(
             print(f"    No change (video counts already >= photo counts)")
 
     print(f"  Photo supplement: {matched} room(s) analyzed")
+    if own_router:
+        router.print_summary()
     return rooms
 
 
@@ -974,9 +1288,7 @@ def _apply_lookup_floor(rooms: list[dict], bump_density: bool = False,
         'very_heavy': 'very_heavy',
     }
 
-    lookup_path = Path(__file__).parent / 'data' / 'room_scope_lookup.json'
-    with open(lookup_path) as f:
-        lookup_data = json.load(f)['room_types']
+    lookup_data = reference_data.room_lookup()
 
     adjustments = 0
     for room in rooms:
@@ -1145,10 +1457,15 @@ def main():
     # Pipeline options
     parser.add_argument("--drive-time", type=float, default=25.0, help="One-way drive time in minutes")
     parser.add_argument("--storage-months", type=int, default=2, help="Storage duration in months")
-    parser.add_argument("--gemini-model", type=str, default="gemini-2.5-pro", help="Gemini model")
+    parser.add_argument("--gemini-model", type=str, default="gemini-2.5-pro",
+                        help='Gemini model, or "auto" (fast model first, pro on escalation)')
     parser.add_argument("--skip-whisper", action="store_true", help="Skip Whisper transcription")
     parser.add_argument("--gemini-only", action="store_true", help="Gemini only (no Whisper/Claude)")
     parser.add_argument("--output-dir", type=str, default=None, help="Output base directory")
+    parser.add_argument("--profile", action="store_true",
+                        help="Profile the run (cProfile); reports saved next to the estimate CSV")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="With --profile: also trace peak memory per stage (slower)")
 
     args = parser.parse_args()
 
@@ -1170,7 +1487,7 @@ def main():
         sys.exit(1)
 
     # Run pipeline
-    result = run_encircle_pipeline(
+    run = lambda: run_encircle_pipeline(
         claim_name=args.claim,
         claim_id=args.claim_id,
         download_only=args.download_only,
@@ -1183,6 +1500,12 @@ def main():
         skip_whisper=args.skip_whisper,
         gemini_only=args.gemini_only,
     )
+    if args.profile:
+        result = run_profiled(run, memory=args.profile_memory,
+                              output_for=lambda r: r.estimate_result.get("csv_path"),
+                              default_dir=args.output_dir)
+    else:
+        result = run()
 
     sys.exit(0 if result.ok else 1)
 
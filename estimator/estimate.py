@@ -19,6 +19,7 @@ import json
 import os
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -31,6 +32,8 @@ sys.path.insert(0, str(Path(__file__).parent))
 from generate_estimate import analyze_from_rooms_json, generate_5phase_estimate
 from gemini_video_analyzer import analyze_video
 from video_summarizer import gemini_fallback
+import call_ledger
+from profiling import run_profiled, stage
 
 
 # ── Box prediction (room-type-aware) ─────────────────────────────────
@@ -250,16 +253,10 @@ def apply_box_prediction(rooms):
 
 # ── Photo TAG analysis ──────────────────────────────────────────────
 
-# Load room baselines once
-_BASELINES = None
-
 def _load_baselines():
-    global _BASELINES
-    if _BASELINES is None:
-        lookup_path = Path(__file__).parent / 'data' / 'room_scope_lookup.json'
-        with open(lookup_path) as f:
-            _BASELINES = json.load(f)['room_types']
-    return _BASELINES
+    """Room baselines (room_scope_lookup.json room_types), shared via reference_data."""
+    import reference_data
+    return reference_data.room_lookup()
 
 
 def _get_baseline(room_category, density):
@@ -273,11 +270,8 @@ def _get_baseline(room_category, density):
     return tags, boxes, common_tags
 
 
-PHOTO_PROMPT = """You are an expert contents packout estimator for 1-800-Packouts. These photos show the "{room_name}" room.
-
-## CONTEXT
-A typical {density}-density {room_category} has about {baseline_tags} TAG items such as: {common_tags_str}.
-Your count should be in the same general range unless this room is clearly unusual.
+# Static calibration text -- a cached system prompt with PROMPT_CACHE=1 (prompt_cache)
+PHOTO_SYSTEM_PROMPT = """You are an expert contents packout estimator for 1-800-Packouts. You will be shown photos of one room and asked to inventory its TAG items.
 
 ## WHAT IS A TAG ITEM?
 Anything that gets individually inventoried, wrapped in furniture pads, and moved:
@@ -290,21 +284,43 @@ Anything that gets individually inventoried, wrapped in furniture pads, and move
 NOT TAG items: small decorative items, candles, small frames, kitchenware, small electronics, built-in cabinets/shelving, countertops, appliances staying with home, throw pillows, blankets, curtains, plants, chandeliers/ceiling fixtures, inflatable/temporary items.
 
 ## CRITICAL RULES
-1. ONLY count items physically IN this room ("{room_name}"). If you can see into an adjacent room through a doorway or open floor plan, do NOT count those items.
-2. These photos show the SAME room from MULTIPLE angles. Each unique physical item = ONLY ONE entry. If you see the same couch from 3 angles, list it once.
+1. ONLY count items physically IN the named room. If you can see into an adjacent room through a doorway or open floor plan, do NOT count those items.
+2. The photos show the SAME room from MULTIPLE angles. Each unique physical item = ONLY ONE entry. If you see the same couch from 3 angles, list it once.
 3. When in doubt whether two items in different photos are the same physical item, assume they ARE the same.
 4. List every item. tag_count MUST equal len(tag_items).
 
 Respond with ONLY valid JSON:
-{{
+{
   "tag_items": ["item 1", "item 2", ...],
   "tag_count": <MUST equal len(tag_items)>,
   "box_estimate": <medium boxes (15x15x15 in) for smaller items in this room>
-}}"""
+}"""
+
+# Room-specific suffix -- the only part of the prompt that varies per call
+PHOTO_ROOM_PROMPT = """These photos show the "{room_name}" room.
+
+## CONTEXT
+A typical {density}-density {room_category} has about {baseline_tags} TAG items such as: {common_tags_str}.
+Your count should be in the same general range unless this room is clearly unusual.
+ONLY count items physically IN "{room_name}"."""
+
+# Full single-message prompt (system + room), sent when PROMPT_CACHE is off
+PHOTO_PROMPT = (PHOTO_SYSTEM_PROMPT.replace("{", "{{").replace("}", "}}")
+                + "\n\n" + PHOTO_ROOM_PROMPT)
 
 
 def _sample_photos(photo_paths, max_photos=5):
-    """Select evenly-spaced photos from a larger set for best room coverage."""
+    """Select the most informative photos from a larger set for best room coverage.
+
+    Drops blurry shots and near-duplicates, then picks the most visually
+    distinct subset (image_prep.select_photos). Falls back to evenly-spaced
+    sampling if Pillow/numpy aren't installed.
+    """
+    try:
+        from image_prep import select_photos
+        return select_photos(photo_paths, max_photos=max_photos)
+    except ImportError:
+        pass
     if len(photo_paths) <= max_photos:
         return list(photo_paths)
     # Evenly sample across the set
@@ -313,36 +329,46 @@ def _sample_photos(photo_paths, max_photos=5):
 
 
 def analyze_photos_for_room(photo_paths, room_name, client, room_category='other',
-                             density='medium', model="claude-sonnet-4-5-20250929"):
-    """Analyze room photos with Claude: single batch, baseline-anchored, max 5 photos."""
-    import base64
+                             density='medium', model="claude-sonnet-4-5-20250929",
+                             contact_sheet=None):
+    """Analyze room photos with Claude: single batch, baseline-anchored, max 5 photos.
+
+    contact_sheet=True tiles the sampled photos into one labeled image
+    (default: PHOTO_CONTACT_SHEET env var).
+    """
+    import image_prep
+    from image_prep import claude_image_blocks, claude_sheet_block
+
+    if contact_sheet is None:
+        contact_sheet = image_prep.CONTACT_SHEET
 
     baseline_tags, baseline_boxes, common_tags = _get_baseline(room_category, density)
 
-    # Sample down to 5 photos for best results
-    sampled = _sample_photos(photo_paths, max_photos=5)
+    # Sample down to MAX_ROOM_PHOTOS (5) for best results
+    sampled = _sample_photos(photo_paths, max_photos=image_prep.MAX_ROOM_PHOTOS)
 
     # Build content blocks: images first, then prompt
     content = []
-    for p in sampled:
+    if contact_sheet and len(sampled) > 1:
         try:
-            with open(p, 'rb') as f:
-                data = base64.standard_b64encode(f.read()).decode('utf-8')
-            content.append({
-                "type": "image",
-                "source": {
-                    "type": "base64",
-                    "media_type": "image/jpeg",
-                    "data": data,
-                },
-            })
+            content.append(claude_sheet_block(sampled))
+            content.append({"type": "text", "text": image_prep.CONTACT_SHEET_NOTE.format(count=len(sampled))})
         except Exception as e:
-            print(f"    Skipping {p.name}: {e}")
+            print(f"    Contact sheet failed for {room_name}, sending photos separately: {e}")
+            content = []
+    if not content:
+        # Downscaled JPEGs (HEIC/PNG decoded), cached by content hash and
+        # shrunk further if the request would exceed PHOTO_REQUEST_BUDGET_MB
+        content = claude_image_blocks(sampled)
 
     if not content:
         return None
 
-    prompt = PHOTO_PROMPT.format(
+    from prompt_cache import PROMPT_CACHE_ENABLED, claude_system, record_claude_usage
+    from providers import call, parse_json, response_text
+
+    # With PROMPT_CACHE the calibration text is a cached system block
+    prompt = (PHOTO_ROOM_PROMPT if PROMPT_CACHE_ENABLED else PHOTO_PROMPT).format(
         room_name=room_name,
         density=density,
         room_category=room_category.replace('_', ' '),
@@ -350,19 +376,19 @@ def analyze_photos_for_room(photo_paths, room_name, client, room_category='other
         common_tags_str=', '.join(common_tags) if common_tags else 'varies',
     )
     content.append({"type": "text", "text": prompt})
+    system = {"system": claude_system(PHOTO_SYSTEM_PROMPT)} if PROMPT_CACHE_ENABLED else {}
 
     try:
-        response = client.messages.create(
+        t0 = time.time()
+        response = call(
+            "claude", "photo", client.messages.create,
             model=model,
             max_tokens=2000,
             messages=[{"role": "user", "content": content}],
+            **system,
         )
-        text = response.content[0].text.strip()
-        if text.startswith("```"):
-            lines = text.split("\n")
-            lines = [l for l in lines if not l.strip().startswith("```")]
-            text = "\n".join(lines).strip()
-        result = json.loads(text)
+        record_claude_usage("photo", response, time.time() - t0)
+        result = parse_json(response_text(response))
         tag_items = result.get('tag_items', [])
         return {
             'tag_items': tag_items,
@@ -374,49 +400,64 @@ def analyze_photos_for_room(photo_paths, room_name, client, room_category='other
         return None
 
 
-def supplement_with_photos(rooms, photos_by_room):
+# Max rooms analyzed at once (each is one Claude vision call)
+PHOTO_MAX_CONCURRENCY = int(os.environ.get("PHOTO_MAX_CONCURRENCY", 4))
+
+
+def supplement_with_photos(rooms, photos_by_room, max_concurrency=None):
     """Supplement video-derived rooms with photo-based TAG counts.
 
     Uses baseline-anchored sequential inventory building:
     1. Looks up expected TAG/box count from room_scope_lookup.json
     2. Processes photos in batches, building inventory sequentially
     3. Takes max(video, photo) for final counts
+
+    Rooms are analyzed concurrently (up to max_concurrency, default
+    PHOTO_MAX_CONCURRENCY); results are merged in match order afterwards.
     """
     if not photos_by_room:
         return rooms
 
-    import anthropic
+    from providers import get_client, ProviderNotConfigured
 
-    api_key = os.environ.get("ANTHROPIC_API_KEY")
-    if not api_key:
+    try:
+        client = get_client("claude")
+    except ProviderNotConfigured:
         print("  ANTHROPIC_API_KEY not set -- skipping photo supplement")
         return rooms
 
-    client = anthropic.Anthropic(api_key=api_key)
-
     # Build fuzzy room name mapping: Encircle room names -> video room indices
     room_matches = _match_rooms(rooms, list(photos_by_room.keys()))
+    work = [(enc_room, video_idx) for enc_room, video_idx in room_matches.items()
+            if photos_by_room[enc_room]]
+
+    # Category/density don't change during the merge, so every room's
+    # analysis can be requested up front and in parallel
+    workers = max(1, min(max_concurrency or PHOTO_MAX_CONCURRENCY, len(work) or 1))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for enc_room, video_idx in work:
+            room = rooms[video_idx]
+            room_category = room.get('room_category', 'other')
+            density = room.get('density', 'medium')
+            baseline_tags, baseline_boxes, _ = _get_baseline(room_category, density)
+            print(f"  {enc_room} ({len(photos_by_room[enc_room])} photos, "
+                  f"baseline: {baseline_tags} TAGs, {baseline_boxes} boxes)")
+            futures[enc_room] = call_ledger.submit(
+                pool, analyze_photos_for_room,
+                photos_by_room[enc_room], enc_room, client,
+                room_category=room_category, density=density,
+            )
+        results = {enc_room: f.result() for enc_room, f in futures.items()}
 
     updated = 0
-    for enc_room, video_idx in room_matches.items():
-        photo_paths = photos_by_room[enc_room]
-        if not photo_paths:
-            continue
-
+    for enc_room, video_idx in work:
         room = rooms[video_idx]
         video_tags = room.get('override_tags', 0) or 0
         video_boxes = room.get('override_boxes', 0) or 0
         room_name = room.get('room_name', enc_room)
-        room_category = room.get('room_category', 'other')
-        density = room.get('density', 'medium')
 
-        baseline_tags, baseline_boxes, _ = _get_baseline(room_category, density)
-        print(f"  {enc_room} ({len(photo_paths)} photos, baseline: {baseline_tags} TAGs, {baseline_boxes} boxes)")
-
-        result = analyze_photos_for_room(
-            photo_paths, enc_room, client,
-            room_category=room_category, density=density
-        )
+        result = results[enc_room]
 
         if result:
             tag_items = result.get('tag_items', [])
@@ -779,12 +820,26 @@ Examples:
                         help='Override total box count (skips auto box prediction)')
     parser.add_argument('--output-dir', default=None,
                         help='Output directory (default: estimator/output/)')
+    parser.add_argument('--profile', action='store_true',
+                        help='Profile the run (cProfile); reports saved next to the estimate CSV')
+    parser.add_argument('--profile-memory', action='store_true',
+                        help='With --profile: also trace peak memory per stage (slower)')
 
     args = parser.parse_args()
 
     output_dir = Path(args.output_dir) if args.output_dir else Path(__file__).parent / 'output'
 
+    if args.profile:
+        run_profiled(lambda: _run(args, parser, output_dir), memory=args.profile_memory,
+                     output_for=lambda est: est.get('csv_path'), default_dir=output_dir)
+    else:
+        _run(args, parser, output_dir)
+
+
+def _run(args, parser, output_dir: Path) -> dict:
+    """The estimate run behind main(); returns the estimate dict."""
     # ── Step 1: Get rooms ──
+    stage("rooms")
     if args.video:
         if not args.customer:
             parser.error('--customer is required with --video')
@@ -798,6 +853,7 @@ Examples:
             if photos_by_room:
                 total_photos = sum(len(v) for v in photos_by_room.values())
                 print(f"\nSupplementing with {total_photos} photos from {len(photos_by_room)} rooms...")
+                stage("photo supplement")
                 rooms = supplement_with_photos(rooms, photos_by_room)
 
     elif args.rooms:
@@ -811,6 +867,7 @@ Examples:
         customer = args.customer or claim_customer
 
     # Normalize rooms to standard format
+    stage("box prediction")
     rooms = normalize_rooms(rooms)
 
     # Apply box count: manual override or TAG-to-box regression floor
@@ -832,6 +889,7 @@ Examples:
     print_rooms(rooms)
 
     # ── Step 3: Generate estimate ──
+    stage("estimate")
     walkthrough = analyze_from_rooms_json(rooms)
 
     est = generate_5phase_estimate(
@@ -862,6 +920,7 @@ Examples:
     print(f"Handling: {est['handling_hours']:.1f} hr/direction @ ${est['handling_rate']:.2f}/hr")
     print(f"Storage:  {est['storage_vaults']} vaults x {args.months} months")
     print(f"Saved:    {est.get('csv_path', output_dir)}")
+    return est
 
 
 if __name__ == '__main__':
@@ -145,6 +145,10 @@ class EstimateAdjuster:
 
         return result
 
+    def multiplier(self, factor_name: str, is_post_acquisition: bool = True) -> float:
+        """Correction multiplier adjust() applies for factor_name (e.g. 'tag_multiplier')."""
+        return self._get_factor(factor_name, is_post_acquisition)['value']
+
     def _get_factor(self, factor_name: str, use_post_acq: bool) -> dict:
         """Get the best correction factor."""
         factor_data = self.factors.get(factor_name, {})
@@ -0,0 +1,138 @@
+"""
+Batch vs one-at-a-time 5-phase estimates: jobs per second and RCV parity.
+
+Builds a density sweep over the labeled walkthroughs (every
+walkthrough_visual_training.json job at light / medium / heavy, the way
+analyze_backtest.py sweeps density) with varied drive times and margins,
+then prices it twice:
+
+  loop    generate_5phase_estimate per job, writing CSV/summary files the
+          way run_backtest.py does
+  batch   generate_5phase_estimate_batch over all jobs (no reports)
+
+Walkthrough analysis and reference data loading are outside both timings.
+Exits 1 if any job's RCV differs between the two.
+
+--check skips the timings and runs generate_estimate.check_batch_parity on
+the sweep, cycling per-job overrides (pad count, vaults, climate storage,
+no corrections, crew/trucks, handling rate) through it, and compares every
+count and line item. Exits 1 on any difference. Run it after changing
+build_5phase_estimate, calculate_cartage, calculate_storage_vaults or the
+batch path.
+
+Usage:
+    python estimate_batch_benchmark.py
+    python estimate_batch_benchmark.py --jobs 2000 --repeat 5
+    python estimate_batch_benchmark.py --no-files        # loop without file writes
+    python estimate_batch_benchmark.py --check           # line-item parity only
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from generate_estimate import (
+    analyze_from_rooms_json, check_batch_parity, generate_5phase_estimate, generate_5phase_estimate_batch,
+)
+
+DATA_DIR = Path(__file__).parent / 'data'
+DENSITIES = ('light', 'medium', 'heavy')
+DRIVE_TIMES = (15.0, 25.0, 45.0, 60.0)
+MARGINS = (0.60, 0.65, 0.70)
+# Per-job overrides cycled through the --check sweep
+OVERRIDES = (
+    {},
+    {'pad_count': 12},
+    {'storage_vaults': 2},
+    {'climate_storage_sf': 150},
+    {'apply_corrections': False},
+    {'crew_size': 3, 'truck_loads': 2},
+    {'handling_rate': 85.0},
+)
+
+
+def build_jobs(n_jobs: int, overrides: bool = False) -> tuple[list, list]:
+    """(walkthroughs, per-job params) cycling walkthroughs x densities up to n_jobs,
+    with OVERRIDES cycled in when overrides is set."""
+    with open(DATA_DIR / 'walkthrough_visual_training.json') as f:
+        walkthroughs = json.load(f)['walkthroughs']
+
+    base = []
+    for wt in walkthroughs:
+        rooms = [r for r in wt.get('rooms', []) if r.get('room_category') != 'exterior']
+        if not rooms:
+            continue
+        for density in DENSITIES:
+            base.append((f"{wt['customer']} ({density})", analyze_from_rooms_json(rooms, density=density)))
+
+    jobs, params = [], []
+    for i in range(n_jobs):
+        name, walkthrough = base[i % len(base)]
+        jobs.append(walkthrough)
+        params.append({
+            'customer_name': f"{name} #{i}",
+            'drive_time_min': DRIVE_TIMES[i % len(DRIVE_TIMES)],
+            'target_margin': MARGINS[(i // len(base)) % len(MARGINS)],
+            **(OVERRIDES[i % len(OVERRIDES)] if overrides else {}),
+        })
+    return jobs, params
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Batch vs loop 5-phase estimate benchmark')
+    parser.add_argument('--jobs', type=int, default=500, help='Jobs in the sweep')
+    parser.add_argument('--repeat', type=int, default=3, help='Batch runs (best time is reported)')
+    parser.add_argument('--no-files', action='store_true', help="Loop doesn't write CSV/summary files")
+    parser.add_argument('--check', action='store_true', help='Compare every line item (with overrides), no timings')
+    args = parser.parse_args()
+
+    jobs, params = build_jobs(args.jobs, overrides=args.check)
+    print(f"Density sweep: {len(jobs)} jobs")
+
+    if args.check:
+        problems = check_batch_parity(jobs, params)
+        for line in problems[:20]:
+            print(f"  {line}")
+        if len(problems) > 20:
+            print(f"  ... {len(problems) - 20} more")
+        print(f"Line-item parity: {len(problems)} difference(s)")
+        sys.exit(1 if problems else 0)
+
+    # Warm-up: load pricing, correction factors, similarity data, ...
+    generate_5phase_estimate(jobs[0], **params[0])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output_dir = None if args.no_files else tmp
+        t0 = time.perf_counter()
+        loop_rcv = [generate_5phase_estimate(walkthrough, output_dir=output_dir, **p)['total_rcv']
+                    for walkthrough, p in zip(jobs, params)]
+        loop_s = time.perf_counter() - t0
+
+    batch_s = float('inf')
+    for _ in range(max(1, args.repeat)):
+        t0 = time.perf_counter()
+        batch = generate_5phase_estimate_batch(jobs, params)
+        batch_s = min(batch_s, time.perf_counter() - t0)
+
+    diffs = [abs(a - b) for a, b in zip(loop_rcv, batch.total_rcv.tolist())]
+    mismatched = sum(1 for d in diffs if d >= 0.005)
+
+    print(f"\n{'Mode':<8} {'Seconds':>9} {'Jobs/s':>12}")
+    print("-" * 31)
+    print(f"{'loop':<8} {loop_s:>9.3f} {len(jobs) / loop_s:>12,.0f}"
+          f"{'' if args.no_files else '   (with file writes)'}")
+    print(f"{'batch':<8} {batch_s:>9.3f} {len(jobs) / batch_s:>12,.0f}")
+    print(f"\nSpeedup: {loop_s / batch_s:.0f}x")
+    print(f"RCV parity: max |loop - batch| ${max(diffs):.2f}, {mismatched} of {len(jobs)} jobs differ")
+    print(f"Sweep RCV: ${batch.total_rcv.sum():,.2f} total, "
+          f"${batch.total_rcv.min():,.2f} - ${batch.total_rcv.max():,.2f} per job")
+    if mismatched:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
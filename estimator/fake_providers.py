@@ -0,0 +1,570 @@
+"""
+Fake Providers — Deterministic local stand-ins for Gemini, Claude, OpenAI and Encircle
+
+Lets us benchmark pipeline throughput and concurrency changes without
+spending API money or touching the network. Each fake mimics the small
+slice of the real SDK surface the estimator uses:
+
+  Gemini  (google-genai):  client.files.upload/get/delete,
+                           client.models.generate_content / generate_content_stream
+  Claude  (anthropic):     client.messages.create
+  OpenAI  (openai):        client.audio.transcriptions.create
+  Encircle:                EncircleClient claim/media/room/note methods
+
+Responses come from the Huttie validation fixtures in output/validation/ and
+the room_scope_lookup.json baselines, so identical inputs always give
+identical outputs. Latency, jitter, failure rate and 429 rate are
+configurable and seeded, so a load test is reproducible run to run.
+
+Enable via environment (read at call time):
+    ESTIMATOR_FAKE_PROVIDERS=1
+    FAKE_LATENCY=2.0          # mean seconds per call
+    FAKE_JITTER=0.5           # +/- uniform seconds
+    FAKE_FAILURE_RATE=0.02    # fraction of calls raising FakeAPIError (500)
+    FAKE_429_RATE=0.05        # fraction of calls raising FakeRateLimitError
+    FAKE_TAIL_RATE=0.02       # fraction of calls that take FAKE_TAIL_LATENCY instead
+    FAKE_TAIL_LATENCY=120
+    FAKE_SEED=42
+    FAKE_GEMINI_LATENCY=30    # per-provider override (GEMINI/CLAUDE/OPENAI/ENCIRCLE)
+
+Or programmatically:
+    import fake_providers
+    fake_providers.enable(latency=0.5, jitter=0.1, rate_limit_rate=0.05)
+
+Call sites ask for a client with get_fake_client(provider); it returns None
+when fakes are disabled, so the real SDK path is untouched.
+"""
+
+import json
+import os
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import SimpleNamespace
+
+FIXTURE_DIR = Path(__file__).parent / 'output' / 'validation'
+DATA_DIR = Path(__file__).parent / 'data'
+
+PROVIDERS = ("gemini", "claude", "openai", "encircle")
+
+# Smallest valid baseline JPEG (1x1 gray) — written for fake photo downloads
+_TINY_JPEG = bytes.fromhex(
+    "ffd8ffe000104a46494600010100000100010000ffdb004300080606070605080707"
+    "070909080a0c140d0c0b0b0c1912130f141d1a1f1e1d1a1c1c20242e2720222c231c"
+    "1c2837292c30313434341f27393d38323c2e333432ffc0000b080001000101011100"
+    "ffc4001f0000010501010101010100000000000000000102030405060708090a0bff"
+    "c400b5100002010303020403050504040000017d0102030004110512213141061351"
+    "6107227114328191a1082342b1c11552d1f02433627282090a161718191a25262728"
+    "292a3435363738393a434445464748494a535455565758595a636465666768696a73"
+    "7475767778797a838485868788898a92939495969798999aa2a3a4a5a6a7a8a9aab2"
+    "b3b4b5b6b7b8b9bac2c3c4c5c6c7c8c9cad2d3d4d5d6d7d8d9dae1e2e3e4e5e6e7e8"
+    "e9eaf1f2f3f4f5f6f7f8f9faffda0008010100003f00fbd3ffd9"
+)
+
+
+class FakeAPIError(Exception):
+    """Raised by fake clients for injected provider failures."""
+    def __init__(self, provider: str, status_code: int = 500, message: str = "injected failure"):
+        self.provider = provider
+        self.status_code = status_code
+        super().__init__(f"Fake {provider} API {status_code}: {message}")
+
+
+class FakeRateLimitError(FakeAPIError):
+    """Injected HTTP 429."""
+    def __init__(self, provider: str):
+        super().__init__(provider, 429, "rate limit exceeded")
+
+
+@dataclass
+class FakeProviderConfig:
+    """Latency and failure behaviour for the fake providers."""
+    latency: float = 1.0
+    jitter: float = 0.25
+    failure_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    tail_rate: float = 0.0      # fraction of calls that hang for tail_latency
+    tail_latency: float = 60.0
+    seed: int = 42
+    provider_latency: dict = field(default_factory=dict)  # provider -> mean seconds
+
+    @classmethod
+    def from_env(cls) -> "FakeProviderConfig":
+        cfg = cls(
+            latency=float(os.environ.get("FAKE_LATENCY", 1.0)),
+            jitter=float(os.environ.get("FAKE_JITTER", 0.25)),
+            failure_rate=float(os.environ.get("FAKE_FAILURE_RATE", 0.0)),
+            rate_limit_rate=float(os.environ.get("FAKE_429_RATE", 0.0)),
+            tail_rate=float(os.environ.get("FAKE_TAIL_RATE", 0.0)),
+            tail_latency=float(os.environ.get("FAKE_TAIL_LATENCY", 60.0)),
+            seed=int(os.environ.get("FAKE_SEED", 42)),
+        )
+        for provider in PROVIDERS:
+            val = os.environ.get(f"FAKE_{provider.upper()}_LATENCY")
+            if val:
+                cfg.provider_latency[provider] = float(val)
+        return cfg
+
+
+# Programmatic override (set by enable()); None means "read the environment"
+_config: FakeProviderConfig | None = None
+_enabled_override: bool | None = None
+_call_counts: dict[str, int] = {}
+_lock = threading.Lock()
+
+
+def enable(**overrides):
+    """Turn fakes on for this process, optionally overriding config fields."""
+    global _config, _enabled_override
+    cfg = FakeProviderConfig.from_env()
+    for key, value in overrides.items():
+        if not hasattr(cfg, key):
+            raise TypeError(f"Unknown fake provider setting: {key}")
+        setattr(cfg, key, value)
+    _config = cfg
+    _enabled_override = True
+    reset_counters()
+
+
+def disable():
+    """Turn fakes off (environment is ignored until enable() or reset)."""
+    global _enabled_override
+    _enabled_override = False
+
+
+def is_enabled() -> bool:
+    if _enabled_override is not None:
+        return _enabled_override
+    return os.environ.get("ESTIMATOR_FAKE_PROVIDERS", "").lower() in ("1", "true", "yes")
+
+
+def get_config() -> FakeProviderConfig:
+    return _config or FakeProviderConfig.from_env()
+
+
+def reset_counters():
+    with _lock:
+        _call_counts.clear()
+
+
+def call_counts() -> dict[str, int]:
+    """Number of simulated calls per provider since the last reset."""
+    with _lock:
+        return dict(_call_counts)
+
+
+def get_fake_client(provider: str):
+    """Return a fake client for provider if fakes are enabled, else None."""
+    if not is_enabled():
+        return None
+    if provider == "gemini":
+        return FakeGeminiClient()
+    if provider == "claude":
+        return FakeAnthropicClient()
+    if provider == "openai":
+        return FakeOpenAIClient()
+    if provider == "encircle":
+        return FakeEncircleClient()
+    raise ValueError(f"Unknown provider: {provider}")
+
+
+def _simulate_call(provider: str):
+    """Sleep for the configured latency and maybe raise an injected error.
+
+    Randomness is derived from (seed, provider, call number) so a given
+    call sequence is reproducible regardless of thread scheduling order
+    of unrelated providers.
+    """
+    cfg = get_config()
+    with _lock:
+        n = _call_counts.get(provider, 0) + 1
+        _call_counts[provider] = n
+    rng = random.Random(f"{cfg.seed}:{provider}:{n}")
+
+    mean = cfg.provider_latency.get(provider, cfg.latency)
+    delay = max(0.0, mean + rng.uniform(-cfg.jitter, cfg.jitter))
+    roll = rng.random()
+    if rng.random() < cfg.tail_rate:
+        delay = cfg.tail_latency  # a stuck request at the latency tail
+    time.sleep(delay)
+
+    if roll < cfg.rate_limit_rate:
+        raise FakeRateLimitError(provider)
+    if roll < cfg.rate_limit_rate + cfg.failure_rate:
+        raise FakeAPIError(provider)
+
+
+# ── Fixtures ───────────────────────────────────────────────────
+
+_fixture_cache: dict = {}
+
+
+def _fixture_video_rooms() -> list[dict]:
+    if "video_rooms" not in _fixture_cache:
+        with open(FIXTURE_DIR / 'Huttie_Validation_gemini_analysis.json') as f:
+            _fixture_cache["video_rooms"] = json.load(f)
+    return _fixture_cache["video_rooms"]
+
+
+def _fixture_transcript() -> tuple[list[tuple[float, float, str]], str]:
+    """Parse the saved '[MM:SS - MM:SS] text' transcript into segments."""
+    if "transcript" not in _fixture_cache:
+        segments = []
+        full_text = ""
+        text = (FIXTURE_DIR / 'Huttie_Validation_transcript.txt').read_text(encoding='utf-8')
+        body, _, full = text.partition("--- FULL TEXT ---")
+        pattern = re.compile(r'^\[(\d+):(\d+) - (\d+):(\d+)\] (.*)$')
+        for line in body.splitlines():
+            m = pattern.match(line.strip())
+            if m:
+                m1, s1, m2, s2, seg_text = m.groups()
+                segments.append((int(m1) * 60 + int(s1), int(m2) * 60 + int(s2), seg_text))
+        full_text = full.strip() or " ".join(s[2] for s in segments)
+        _fixture_cache["transcript"] = (segments, full_text)
+    return _fixture_cache["transcript"]
+
+
+def _room_baseline(room_name: str, density: str = 'medium') -> tuple[int, int, list]:
+    from build_visual_training import classify_room
+    import reference_data
+    lookup = reference_data.room_lookup()
+    room = lookup.get(classify_room(room_name), lookup.get('other', {}))
+    tags = (room.get('typical_tags') or {}).get(density, 5)
+    boxes = (room.get('typical_boxes') or {}).get(density, 6)
+    return tags, boxes, room.get('common_tags', [])
+
+
+def _fake_tag_items(room_name: str, count: int, common: list) -> list[str]:
+    common = common or ['item']
+    return [f"{common[i % len(common)]} {i // len(common) + 1}" for i in range(count)]
+
+
+def _prompt_text(parts) -> str:
+    """Flatten Gemini contents / Claude content blocks into prompt text."""
+    if isinstance(parts, str):
+        return parts
+    texts = []
+    for p in parts or []:
+        if isinstance(p, str):
+            texts.append(p)
+        elif isinstance(p, dict):
+            if p.get("type") == "text":
+                texts.append(p.get("text", ""))
+            elif isinstance(p.get("content"), (list, str)):
+                texts.append(_prompt_text(p["content"]))
+    return "\n".join(texts)
+
+
+# ── Gemini ─────────────────────────────────────────────────────
+
+class _FakeGeminiFiles:
+    def upload(self, file):
+        _simulate_call("gemini")
+        name = f"files/fake-{Path(file).stem}"
+        return SimpleNamespace(name=name, uri=f"fake://{name}",
+                               state=SimpleNamespace(name="ACTIVE"))
+
+    def get(self, name):
+        return SimpleNamespace(name=name, uri=f"fake://{name}",
+                               state=SimpleNamespace(name="ACTIVE"))
+
+    def delete(self, name):
+        return None
+
+
+class _FakeGeminiCaches:
+    """Context caches: create() returns a name that generate_content accepts."""
+    def __init__(self):
+        self.created = {}
+
+    def create(self, model, config=None):
+        _simulate_call("gemini")
+        text = (config or {}).get("system_instruction", "")
+        name = f"cachedContents/fake-{len(self.created)}"
+        self.created[name] = len(text) // 4
+        return SimpleNamespace(name=name, model=model)
+
+
+_FAKE_GEMINI_CACHES = _FakeGeminiCaches()  # shared like server-side caches
+
+
+def _fake_gemini_usage(contents, config, caches) -> SimpleNamespace:
+    config = config or {}
+    cached = caches.created.get(config.get("cached_content"), 0)
+    prompt = len(_prompt_text(contents)) // 4 + len(config.get("system_instruction", "")) // 4
+    return SimpleNamespace(prompt_token_count=prompt + cached,
+                           cached_content_token_count=cached)
+
+
+class _FakeGeminiModels:
+    def __init__(self, caches):
+        self._caches = caches
+
+    def generate_content(self, model, contents, config=None):
+        _simulate_call("gemini")
+        return SimpleNamespace(text=self._respond(contents),
+                               usage_metadata=_fake_gemini_usage(contents, config, self._caches))
+
+    def generate_content_stream(self, model, contents, config=None):
+        _simulate_call("gemini")
+        text = self._respond(contents)
+        step = 256
+        for i in range(0, len(text), step):
+            last = i + step >= len(text)
+            yield SimpleNamespace(
+                text=text[i:i + step],
+                usage_metadata=_fake_gemini_usage(contents, config, self._caches) if last else None,
+            )
+
+    @staticmethod
+    def _respond(contents) -> str:
+        prompt = _prompt_text(contents)
+        if prompt.startswith("Rooms: "):
+            # encircle_pipeline._analyze_room_photos_batch
+            names = json.loads(prompt.split("\n", 1)[0][len("Rooms: "):])
+            out = {}
+            for room_name in names:
+                tags, boxes, common = _room_baseline(room_name)
+                out[room_name] = {
+                    "estimated_tags": tags,
+                    "estimated_boxes": boxes,
+                    "tag_items": _fake_tag_items(room_name, tags, common),
+                    "density": "medium",
+                    "notes": "fake provider response",
+                }
+            return json.dumps(out)
+        if prompt.startswith("Room: "):
+            # encircle_pipeline._analyze_room_photos
+            room_name = prompt.split("\n", 1)[0][len("Room: "):].strip()
+            tags, boxes, common = _room_baseline(room_name)
+            return json.dumps({
+                "estimated_tags": tags,
+                "estimated_boxes": boxes,
+                "tag_items": _fake_tag_items(room_name, tags, common),
+                "density": "medium",
+                "notes": "fake provider response",
+            })
+        return json.dumps(_fixture_video_rooms())
+
+
+class FakeGeminiClient:
+    """Stand-in for google.genai.Client."""
+    def __init__(self, api_key: str = ""):
+        self.files = _FakeGeminiFiles()
+        self.caches = _FAKE_GEMINI_CACHES
+        self.models = _FakeGeminiModels(self.caches)
+
+
+# ── Claude ─────────────────────────────────────────────────────
+
+_claude_cached_prefixes = set()  # system blocks "cached" so far (server-side in reality)
+
+
+class _FakeMessages:
+    def create(self, model, messages, max_tokens=1024, **kwargs):
+        _simulate_call("claude")
+        prompt = _prompt_text(messages[-1].get("content") if messages else "")
+        text = self._respond(prompt)
+
+        # Prompt caching: cache_control system blocks are written once, then read
+        cache_read = cache_write = uncached_system = 0
+        for block in kwargs.get("system") or []:
+            if not isinstance(block, dict):
+                continue
+            tokens = len(block.get("text", "")) // 4
+            if block.get("cache_control"):
+                key = (model, block.get("text", ""))
+                with _lock:
+                    hit = key in _claude_cached_prefixes
+                    _claude_cached_prefixes.add(key)
+                if hit:
+                    cache_read += tokens
+                else:
+                    cache_write += tokens
+            else:
+                uncached_system += tokens
+        return SimpleNamespace(
+            content=[SimpleNamespace(type="text", text=text)],
+            model=model,
+            usage=SimpleNamespace(input_tokens=len(prompt) // 4 + uncached_system,
+                                  output_tokens=len(text) // 4,
+                                  cache_read_input_tokens=cache_read,
+                                  cache_creation_input_tokens=cache_write),
+        )
+
+    @staticmethod
+    def _respond(prompt: str) -> str:
+        m = re.search(r'These photos show the "(.+?)" room', prompt)
+        if m:
+            # estimate.analyze_photos_for_room
+            room_name = m.group(1)
+            tags, boxes, common = _room_baseline(room_name)
+            items = _fake_tag_items(room_name, tags, common)
+            return json.dumps({"tag_items": items, "tag_count": len(items),
+                               "box_estimate": boxes})
+
+        # video_summarizer.summarize: echo visual rooms as overrides
+        visual = []
+        m = re.search(r'## VISUAL ANALYSIS DATA\n(.*?)\n\n## TRANSCRIPT', prompt, re.S)
+        if m:
+            try:
+                visual = json.loads(m.group(1))
+            except json.JSONDecodeError:
+                visual = []
+        merged = [{
+            "room_name": r.get("room_name", "Unknown"),
+            "room_category": r.get("room_category", "other"),
+            "density": r.get("density", "medium"),
+            "override_tags": r.get("estimated_tags", 0),
+            "override_boxes": r.get("estimated_boxes", 0),
+            "scope_notes": r.get("scope_notes", ""),
+            "damage_indicators": r.get("damage_indicators", []),
+        } for r in visual if isinstance(r, dict)]
+        return json.dumps(merged)
+
+
+class FakeAnthropicClient:
+    """Stand-in for anthropic.Anthropic."""
+    def __init__(self, api_key: str = ""):
+        self.messages = _FakeMessages()
+
+
+# ── OpenAI Whisper ─────────────────────────────────────────────
+
+class _FakeTranscriptions:
+    def create(self, model, file, response_format="verbose_json", **kwargs):
+        _simulate_call("openai")
+        segments, full_text = _fixture_transcript()
+        return SimpleNamespace(
+            text=full_text,
+            language="english",
+            duration=segments[-1][1] if segments else 0.0,
+            segments=[SimpleNamespace(start=s, end=e, text=t) for s, e, t in segments],
+        )
+
+
+class FakeOpenAIClient:
+    """Stand-in for openai.OpenAI (audio transcription only)."""
+    def __init__(self, api_key: str = ""):
+        self.audio = SimpleNamespace(transcriptions=_FakeTranscriptions())
+
+
+# ── Encircle ───────────────────────────────────────────────────
+
+class FakeEncircleClient:
+    """Stand-in for EncircleClient serving one synthetic claim per name.
+
+    Rooms mirror the Huttie fixture; every claim has one walkthrough video
+    and three photos per room. Downloads write small placeholder files.
+    """
+
+    PHOTOS_PER_ROOM = 3
+    MAX_RETRIES = 3
+
+    def __init__(self, api_token: str = ""):
+        pass
+
+    def _call(self):
+        """Simulate a request the way EncircleClient._request behaves:
+        429s are retried internally, other failures surface as EncircleAPIError."""
+        from encircle_client import EncircleAPIError
+        for attempt in range(self.MAX_RETRIES + 1):
+            try:
+                _simulate_call("encircle")
+                return
+            except FakeRateLimitError as e:
+                if attempt == self.MAX_RETRIES:
+                    raise EncircleAPIError(429, str(e))
+            except FakeAPIError as e:
+                raise EncircleAPIError(e.status_code, str(e))
+
+    @staticmethod
+    def _claim_id(name: str) -> str:
+        return "fake-" + re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+
+    def _claim(self, claim_id: str, name: str = None) -> dict:
+        name = name or claim_id.replace("fake-", "").replace("-", " ").title()
+        return {
+            "id": claim_id,
+            "policyholder_name": name,
+            "full_address": "123 Fake St, Phoenix, AZ",
+            "type_of_loss": "type_of_loss_water",
+            "loss_details": "",
+        }
+
+    def list_claims(self, limit: int = 50, search: str = None) -> list[dict]:
+        self._call()
+        return [self._claim(self._claim_id("Fake Claim"), "Fake Claim")]
+
+    def get_claim(self, claim_id: str) -> dict:
+        self._call()
+        return self._claim(claim_id)
+
+    def find_claim_by_name(self, name: str) -> dict | None:
+        self._call()
+        return self._claim(self._claim_id(name), name)
+
+    def _room_names(self) -> list[str]:
+        return [r["room_name"] for r in _fixture_video_rooms()]
+
+    def get_media(self, claim_id: str, limit: int = 100) -> list[dict]:
+        self._call()
+        media = [{
+            "id": f"{claim_id}-video",
+            "filename": "walkthrough.mp4",
+            "content_type": "video/mp4",
+            "labels": ["Main Building", "Video Tour"],
+            "download_uri": "fake://video",
+            "source": {"type": "VideoFile", "primary_id": f"{claim_id}-video",
+                       "file_size": 1024},
+        }]
+        for ri, room in enumerate(self._room_names()):
+            for pi in range(self.PHOTOS_PER_ROOM):
+                media.append({
+                    "id": f"{claim_id}-p{ri}-{pi}",
+                    "filename": f"room{ri:02d}_{pi}.jpg",
+                    "content_type": "image/jpeg",
+                    "labels": ["Main Building", room],
+                    "download_uri": "fake://photo",
+                    "source": {"type": "ClaimRoomAfterPicture",
+                               "primary_id": f"{claim_id}-p{ri}-{pi}"},
+                })
+        return media
+
+    filter_videos = staticmethod(lambda items: [
+        m for m in items if (m.get("source") or {}).get("type") == "VideoFile"])
+    filter_photos = staticmethod(lambda items: [
+        m for m in items if (m.get("source") or {}).get("type") == "ClaimRoomAfterPicture"])
+
+    @staticmethod
+    def group_photos_by_room(photos: list[dict]) -> dict[str, list[dict]]:
+        by_room = {}
+        for p in photos:
+            labels = p.get("labels") or []
+            by_room.setdefault(labels[1] if len(labels) >= 2 else "_unassigned", []).append(p)
+        return by_room
+
+    def download_media(self, media_item: dict, output_dir: str | Path) -> Path:
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        path = output_dir / media_item.get("filename", f"{media_item.get('id')}.bin")
+        if not path.exists():
+            is_photo = media_item.get("content_type", "").startswith("image/")
+            path.write_bytes(_TINY_JPEG if is_photo else b"\0" * 1024)
+        return path
+
+    def get_all_rooms(self, claim_id: str) -> list[dict]:
+        self._call()
+        return [{"id": f"{claim_id}-r{i}", "name": n, "_structure_name": "Main Building"}
+                for i, n in enumerate(self._room_names())]
+
+    def get_all_notes(self, claim_id: str) -> dict:
+        self._call()
+        return {"claim_notes": [], "room_notes": {}}
+
+    def print_claim_summary(self, claim: dict):
+        print(f"  Claim ID:      {claim.get('id', '?')}")
+        print(f"  Policyholder:  {claim.get('policyholder_name', '?')}")
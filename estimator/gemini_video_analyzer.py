@@ -14,10 +14,19 @@ Usage:
     result = analyze_video("walkthrough.mp4")
     for room in result.rooms:
         print(f"{room['room_name']}: {room['estimated_tags']} TAGs, {room['estimated_boxes']} boxes")
+
+    # Streaming: rooms are handed to on_room as soon as each object is complete
+    result = analyze_video("walkthrough.mp4", stream=True, on_room=handle_room)
+
+Settings (environment):
+    GEMINI_STREAM_IDLE=300       stream mode: seconds without a chunk before giving up
+    GEMINI_STREAM_DEADLINE=1800  stream mode: cap on the whole streamed response
 """
 
-import os
 import json
+import os
+import queue
+import threading
 import time
 from pathlib import Path
 from dataclasses import dataclass, field
@@ -26,6 +35,12 @@ from dotenv import load_dotenv
 # Load API keys from estimator/.env
 load_dotenv(Path(__file__).parent / '.env')
 
+# Stream mode: give up on a stream that sends nothing for this long, and on
+# any stream after the hard cap (the non-streaming call keeps the Gemini
+# call deadline)
+STREAM_IDLE_SECONDS = float(os.environ.get("GEMINI_STREAM_IDLE", 300))
+STREAM_DEADLINE = float(os.environ.get("GEMINI_STREAM_DEADLINE", 1800))
+
 
 @dataclass
 class VideoAnalysisResult:
@@ -149,7 +164,17 @@ def _upload_and_wait(client, video_path: Path, timeout: int = 300) -> object:
     """Upload video to Gemini Files API and wait until processing completes."""
     print(f"  Uploading video to Gemini ({video_path.stat().st_size / (1024*1024):.0f} MB)...")
 
-    video_file = client.files.upload(file=str(video_path))
+    import call_ledger
+
+    t0 = time.time()
+    try:
+        video_file = client.files.upload(file=str(video_path))
+    except Exception as e:
+        call_ledger.record("video_upload", "gemini", latency_s=time.time() - t0,
+                           outcome=f"error:{type(e).__name__}", bytes_sent=video_path.stat().st_size)
+        raise
+    call_ledger.record("video_upload", "gemini", latency_s=time.time() - t0,
+                       bytes_sent=video_path.stat().st_size)
     print(f"  Upload complete. File: {video_file.name}, state: {video_file.state}")
 
     # Poll until processing is done
@@ -171,28 +196,12 @@ def _upload_and_wait(client, video_path: Path, timeout: int = 300) -> object:
 
 def _parse_rooms_response(text: str) -> list[dict]:
     """Parse Gemini's JSON response, handling common formatting issues."""
-    text = text.strip()
-
-    # Strip markdown code fences if present
-    if text.startswith("```"):
-        lines = text.split("\n")
-        # Remove first line (```json or ```) and last line (```)
-        lines = [l for l in lines if not l.strip().startswith("```")]
-        text = "\n".join(lines).strip()
+    from providers import parse_json
 
     try:
-        rooms = json.loads(text)
+        rooms = parse_json(text, salvage="[")
     except json.JSONDecodeError:
-        # Try to find JSON array in the text
-        start = text.find("[")
-        end = text.rfind("]")
-        if start >= 0 and end > start:
-            try:
-                rooms = json.loads(text[start:end + 1])
-            except json.JSONDecodeError:
-                return []
-        else:
-            return []
+        return []
 
     if not isinstance(rooms, list):
         return []
@@ -200,32 +209,195 @@ def _parse_rooms_response(text: str) -> list[dict]:
     # Validate and clean each room
     cleaned = []
     for room in rooms:
-        if not isinstance(room, dict):
-            continue
-        # Ensure required fields
-        if "room_name" not in room:
-            continue
-        # Normalize room_category
-        cat = room.get("room_category", "other")
-        if cat not in VALID_ROOM_CATEGORIES:
-            room["room_category"] = "other"
-        # Ensure numeric fields
-        room["estimated_tags"] = int(room.get("estimated_tags", 0))
-        room["estimated_boxes"] = int(room.get("estimated_boxes", 0))
-        # Default missing fields
-        room.setdefault("density", "medium")
-        room.setdefault("tag_items", [])
-        room.setdefault("damage_indicators", [])
-        room.setdefault("scope_notes", "")
-        cleaned.append(room)
+        room = _clean_room(room)
+        if room is not None:
+            cleaned.append(room)
 
     return cleaned
 
 
+def _clean_room(room) -> dict | None:
+    """Validate a single room object and fill defaults. Returns None if unusable."""
+    if not isinstance(room, dict):
+        return None
+    # Ensure required fields
+    if "room_name" not in room:
+        return None
+    # Normalize room_category
+    cat = room.get("room_category", "other")
+    if cat not in VALID_ROOM_CATEGORIES:
+        room["room_category"] = "other"
+    # Ensure numeric fields
+    room["estimated_tags"] = int(room.get("estimated_tags", 0))
+    room["estimated_boxes"] = int(room.get("estimated_boxes", 0))
+    # Default missing fields
+    room.setdefault("density", "medium")
+    room.setdefault("tag_items", [])
+    room.setdefault("damage_indicators", [])
+    room.setdefault("scope_notes", "")
+    return room
+
+
+class RoomStreamParser:
+    """Incrementally parse a streamed JSON array of room objects.
+
+    Feed text fragments as they arrive from generate_content_stream(); each
+    call to feed() returns the room dicts that became complete in that
+    fragment. Each fragment is scanned once: we track brace depth
+    (string-aware), keep only the pieces of the object being scanned, and
+    json.loads() them once its closing brace arrives.
+
+    Markdown fences or preamble before the opening '[' are skipped.
+    """
+
+    def __init__(self):
+        self._parts = []        # every fragment received (joined by .text)
+        self._obj_parts = []    # fragments of the object being scanned
+        self._in_array = False
+        self._in_object = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self.rooms: list[dict] = []
+
+    @property
+    def text(self) -> str:
+        """Everything received so far."""
+        if len(self._parts) > 1:
+            self._parts = ["".join(self._parts)]
+        return self._parts[0] if self._parts else ""
+
+    def feed(self, fragment: str) -> list[dict]:
+        """Consume a text fragment and return newly completed rooms."""
+        if not fragment:
+            return []
+        self._parts.append(fragment)
+        completed = []
+        obj_start = 0 if self._in_object else -1  # where the current object starts in fragment
+
+        for i, ch in enumerate(fragment):
+            if not self._in_array:
+                if ch == "[":
+                    self._in_array = True
+                continue
+
+            if not self._in_object:
+                # Between objects: skip whitespace/commas until the next '{'
+                if ch == "{":
+                    self._in_object = True
+                    obj_start = i
+                    self._depth = 1
+                elif ch == "]":
+                    self._in_array = False
+                continue
+
+            # Inside an object
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._obj_parts.append(fragment[obj_start:i + 1])
+                    room = self._decode("".join(self._obj_parts))
+                    self._obj_parts = []
+                    self._in_object = False
+                    if room is not None:
+                        self.rooms.append(room)
+                        completed.append(room)
+
+        if self._in_object:
+            self._obj_parts.append(fragment[obj_start:])
+        return completed
+
+    @staticmethod
+    def _decode(obj_text: str) -> dict | None:
+        try:
+            return _clean_room(json.loads(obj_text))
+        except (json.JSONDecodeError, TypeError, ValueError):
+            return None
+
+
+_STREAM_END = object()
+
+
+def _generate_rooms_streaming(client, model: str, contents: list, config: dict,
+                              on_room=None, stop=None) -> tuple[str, list[dict], object]:
+    """Stream the Gemini response, emitting each room as soon as it's complete.
+
+    Returns (raw_text, rooms, final chunk). The final chunk carries the
+    usage metadata for the ledger. If incremental parsing yields nothing (e.g. the
+    model wrapped the array in an object), rooms is empty and the caller falls
+    back to _parse_rooms_response on the full text.
+
+    A reader thread pulls chunks so a stalled stream can be given up after
+    STREAM_IDLE_SECONDS without a chunk, however long a stream that keeps
+    producing runs. Once stop is set (the caller gave up on this call) no
+    further rooms are handed to on_room.
+    """
+    from call_guard import DeadlineExceeded
+    from prompt_cache import record_gemini_usage
+
+    stop = stop or threading.Event()
+    chunks = queue.Queue()
+
+    def read():
+        try:
+            for chunk in client.models.generate_content_stream(
+                model=model,
+                contents=contents,
+                config=config,
+            ):
+                chunks.put(chunk)
+                if stop.is_set():
+                    return
+        except Exception as e:
+            chunks.put(e)
+        finally:
+            chunks.put(_STREAM_END)
+
+    parser = RoomStreamParser()
+    t0 = time.time()
+    last = None
+    threading.Thread(target=read, name="gemini-stream", daemon=True).start()
+    while True:
+        try:
+            chunk = chunks.get(timeout=STREAM_IDLE_SECONDS)
+        except queue.Empty:
+            stop.set()
+            raise DeadlineExceeded(
+                "gemini", f"video stream produced nothing for {STREAM_IDLE_SECONDS:g}s")
+        if chunk is _STREAM_END or stop.is_set():
+            break
+        if isinstance(chunk, Exception):
+            raise chunk
+        last = chunk
+        for room in parser.feed(chunk.text or ""):
+            if stop.is_set():
+                break
+            print(f"    Room {len(parser.rooms)}: {room['room_name']} "
+                  f"({room['estimated_tags']} TAGs, {room['estimated_boxes']} boxes)")
+            if on_room:
+                on_room(room)
+    if last is not None:
+        record_gemini_usage("video", last, time.time() - t0)  # usage arrives on the final chunk
+    return parser.text, parser.rooms, last
+
+
 def analyze_video(
     video_path: str | Path,
     model: str = "gemini-2.5-pro",
     timeout: int = 300,
+    stream: bool = False,
+    on_room=None,
 ) -> VideoAnalysisResult:
     """
     Analyze a walkthrough video using Gemini's visual understanding.
@@ -234,40 +406,71 @@ def analyze_video(
         video_path: Path to the video file
         model: Gemini model to use (gemini-2.0-flash recommended for cost/speed)
         timeout: Max seconds to wait for file processing
+        stream: Consume the response incrementally and emit rooms as they
+                are generated instead of waiting for the full JSON array
+        on_room: Optional callback(room_dict) invoked for each room as soon
+                 as it is parsed (stream mode only). Runs on the call's worker
+                 thread, so hand slow work off rather than doing it inline
 
     Returns:
         VideoAnalysisResult with room-by-room analysis
     """
-    from google import genai
+    from providers import get_client, ProviderNotConfigured
 
-    api_key = os.environ.get("GOOGLE_API_KEY")
-    if not api_key:
-        return VideoAnalysisResult(error="GOOGLE_API_KEY not set in environment or .env")
+    try:
+        client = get_client("gemini")
+    except ProviderNotConfigured as e:
+        return VideoAnalysisResult(error=str(e))
 
     video_path = Path(video_path)
     if not video_path.exists():
         return VideoAnalysisResult(error=f"Video not found: {video_path}")
 
-    client = genai.Client(api_key=api_key)
+    from call_guard import breaker
+    if breaker("gemini").state == "open":
+        # Don't spend minutes uploading a video the analysis call will refuse
+        return VideoAnalysisResult(error="Gemini circuit open (provider degraded) -- skipped")
+
     start_time = time.time()
 
     try:
         # Upload video
         video_file = _upload_and_wait(client, video_path, timeout=timeout)
 
-        # Generate analysis
-        print(f"  Analyzing with {model}...")
-        response = client.models.generate_content(
-            model=model,
-            contents=[video_file, GEMINI_ANALYSIS_PROMPT],
-            config={
-                "response_mime_type": "application/json",
-                "temperature": 0.1,  # Low temperature for consistent counting
-            },
-        )
-
-        raw_text = response.text
-        rooms = _parse_rooms_response(raw_text)
+        from prompt_cache import PROMPT_CACHE_ENABLED, gemini_config, gemini_generate
+        from providers import call, response_text
+
+        # Generate analysis. With PROMPT_CACHE the calibration prompt is the
+        # (cached) system instruction and only the video varies per call.
+        contents = [video_file, "Analyze this walkthrough video." if PROMPT_CACHE_ENABLED
+                    else GEMINI_ANALYSIS_PROMPT]
+        base_config = {
+            "response_mime_type": "application/json",
+            "temperature": 0.1,  # Low temperature for consistent counting
+        }
+        if stream:
+            print(f"  Analyzing with {model} (streaming)...")
+            config = gemini_config(client, model, GEMINI_ANALYSIS_PROMPT, base_config)
+            # Not hedged or retried: a second stream would fire on_room twice.
+            # The stream enforces its own idle timeout; the call deadline only
+            # caps the whole response, and stop silences a stream given up on.
+            stop = threading.Event()
+            try:
+                raw_text, rooms, _ = call(
+                    "gemini", "video_stream", _generate_rooms_streaming,
+                    client, model, contents, config, on_room=on_room, stop=stop,
+                    hedge=False, retries=0, deadline=STREAM_DEADLINE, ledger={'model': model},
+                )
+            finally:
+                stop.set()
+            if not rooms:
+                rooms = _parse_rooms_response(raw_text)
+        else:
+            print(f"  Analyzing with {model}...")
+            response = gemini_generate(client, model, contents, GEMINI_ANALYSIS_PROMPT,
+                                       base_config, prompt_name="video")
+            raw_text = response_text(response)
+            rooms = _parse_rooms_response(raw_text)
 
         if not rooms:
             return VideoAnalysisResult(
@@ -394,11 +597,11 @@ def analyze_video_chunked(
 if __name__ == "__main__":
     import sys
     if len(sys.argv) < 2:
-        print("Usage: python gemini_video_analyzer.py <video_path>")
+        print("Usage: python gemini_video_analyzer.py <video_path> [--stream]")
         sys.exit(1)
 
     video = Path(sys.argv[1])
-    result = analyze_video(video)
+    result = analyze_video(video, stream="--stream" in sys.argv[2:])
 
     if result.ok:
         print(f"\n=== VIDEO ANALYSIS: {len(result.rooms)} rooms ===")
@@ -16,6 +16,11 @@ Usage:
     python generate_estimate.py --photos <folder_of_jpgs>
     python generate_estimate.py --pdf <encircle_walkthrough.pdf>
     python generate_estimate.py --rooms <rooms_json>  (for batch/backtest mode)
+
+Many jobs at once (backtests, density sweeps, what-if analysis):
+    batch = generate_5phase_estimate_batch(walkthroughs, {'target_margin': [0.6, 0.65, 0.7]})
+    batch.total_rcv          # per-job RCV; batch.report(i) renders one job's full estimate
+    python estimate_batch_benchmark.py   (jobs/sec vs the generate_5phase_estimate loop)
 """
 
 import argparse
@@ -24,28 +29,30 @@ import csv
 import sys
 from pathlib import Path
 from datetime import datetime
-from dataclasses import asdict
+from dataclasses import asdict, dataclass
 from typing import Optional
 
+import numpy as np
+
 # Add estimator directory to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from photo_analyzer import PhotoAnalyzer, WalkthroughAnalysis
+from photo_analyzer import WalkthroughAnalysis
 from cartage_calculator import calculate_cartage, FactoryStandards
-from pricing_engine import PricingEngine, LineItem, build_standard_estimate, build_5phase_estimate, calculate_storage_vaults
-from labor_rates import LaborRateCalculator, DEFAULT_HANDLING_RATE
-from scope_checker import ScopeChecker
-from estimate_adjuster import EstimateAdjuster
-from job_similarity import JobSimilarityEngine
-from supplement_predictor import SupplementPredictor
-from crew_optimizer import CrewOptimizer
+from pricing_engine import LineItem, build_standard_estimate, build_5phase_estimate, calculate_storage_vaults
+from labor_rates import DEFAULT_HANDLING_RATE
+import reference_data
 
 DATA_DIR = Path(__file__).parent / 'data'
 
 
 def analyze_from_rooms_json(rooms_data: list, density: str = 'medium') -> WalkthroughAnalysis:
-    """Analyze from a pre-built rooms list (for backtesting)."""
-    analyzer = PhotoAnalyzer()
+    """Analyze from a pre-built rooms list (for backtesting).
+
+    Reference data (room lookup, pricing, correction factors, ...) comes from
+    reference_data, loaded once per process and reloaded when the files change.
+    """
+    analyzer = reference_data.photo_analyzer()
     return analyzer.analyze_walkthrough_local(rooms_data, default_density=density)
 
 
@@ -74,7 +81,7 @@ def analyze_from_pdf(pdf_path: str, density: str = 'medium') -> WalkthroughAnaly
             'density': density,
         })
 
-    analyzer = PhotoAnalyzer()
+    analyzer = reference_data.photo_analyzer()
     return analyzer.analyze_walkthrough_local(rooms, default_density=density)
 
 
@@ -98,7 +105,7 @@ def generate_estimate(
     truck_loads = walkthrough.suggested_truck_loads
 
     # Step 2: Apply correction factors if requested
-    adjuster = EstimateAdjuster()
+    adjuster = reference_data.estimate_adjuster()
     if apply_corrections:
         adjusted = adjuster.adjust(
             tags=initial_tags, boxes=initial_boxes,
@@ -141,11 +148,11 @@ def generate_estimate(
     )
 
     # Step 5: Apply pricing
-    engine = PricingEngine()
+    engine = reference_data.pricing_engine()
     estimate_result = engine.price_estimate(items)
 
     # Step 6: Run scope checker
-    checker = ScopeChecker()
+    checker = reference_data.scope_checker()
     scope_items = [{'desc': item.desc, 'qty': item.qty} for item in items]
     scope_result = checker.check(scope_items, job_context={
         'tag_count': final_tags,
@@ -153,7 +160,7 @@ def generate_estimate(
     })
 
     # Step 7: Similar jobs lookup
-    similarity_engine = JobSimilarityEngine()
+    similarity_engine = reference_data.job_similarity()
     similar_jobs = similarity_engine.find_similar(
         room_count=walkthrough.total_rooms,
         tag_estimate=final_tags,
@@ -163,7 +170,7 @@ def generate_estimate(
         similar_jobs, predicted_rcv=estimate_result.subtotal_rcv)
 
     # Step 8: Supplement predictions
-    predictor = SupplementPredictor()
+    predictor = reference_data.supplement_predictor()
     supplements = predictor.predict(
         estimate_items=scope_items,
         tag_count=final_tags,
@@ -172,7 +179,7 @@ def generate_estimate(
     supplement_text = predictor.format_prediction(supplements)
 
     # Step 9: Crew recommendation
-    optimizer = CrewOptimizer()
+    optimizer = reference_data.crew_optimizer()
     crew_rec = optimizer.recommend(
         tag_count=final_tags,
         box_count=final_boxes,
@@ -308,7 +315,7 @@ def generate_5phase_estimate(
     _truck_loads = truck_loads or walkthrough.suggested_truck_loads
 
     # Step 2: Corrections
-    adjuster = EstimateAdjuster()
+    adjuster = reference_data.estimate_adjuster()
     if apply_corrections:
         adjusted = adjuster.adjust(
             tags=initial_tags, boxes=initial_boxes,
@@ -337,7 +344,7 @@ def generate_5phase_estimate(
 
     # Step 4: Calculate handling rate
     if handling_rate is None:
-        calc = LaborRateCalculator()
+        calc = reference_data.labor_rates()
         handling_rate = calc.billing_rate_for_margin(target_margin)
 
     # Step 5: Box sizing
@@ -373,11 +380,11 @@ def generate_5phase_estimate(
     )
 
     # Step 8: Price everything
-    engine = PricingEngine()
+    engine = reference_data.pricing_engine()
     estimate_result = engine.price_5phase_estimate(items, packback_discount)
 
     # Step 9: Scope check
-    checker = ScopeChecker()
+    checker = reference_data.scope_checker()
     scope_items = [{'desc': item.desc, 'qty': item.qty} for item in items]
     scope_result = checker.check(scope_items, job_context={
         'tag_count': final_tags,
@@ -385,7 +392,7 @@ def generate_5phase_estimate(
     })
 
     # Step 10: Similar jobs
-    similarity_engine = JobSimilarityEngine()
+    similarity_engine = reference_data.job_similarity()
     similar_jobs = similarity_engine.find_similar(
         room_count=walkthrough.total_rooms,
         tag_estimate=final_tags,
@@ -395,7 +402,7 @@ def generate_5phase_estimate(
         similar_jobs, predicted_rcv=estimate_result.subtotal_rcv)
 
     # Step 11: Supplement predictions
-    predictor = SupplementPredictor()
+    predictor = reference_data.supplement_predictor()
     supplements = predictor.predict(
         estimate_items=scope_items,
         tag_count=final_tags,
@@ -404,7 +411,7 @@ def generate_5phase_estimate(
     supplement_text = predictor.format_prediction(supplements)
 
     # Step 12: Crew recommendation
-    optimizer = CrewOptimizer()
+    optimizer = reference_data.crew_optimizer()
     crew_rec = optimizer.recommend(
         tag_count=final_tags,
         box_count=final_boxes,
@@ -419,7 +426,7 @@ def generate_5phase_estimate(
     scope_text = checker.format_report(scope_result)
 
     # Labor rate analysis
-    calc = LaborRateCalculator()
+    calc = reference_data.labor_rates()
     labor_text = calc.format_breakdown(target_margin)
 
     # Build summary
@@ -510,6 +517,306 @@ def generate_5phase_estimate(
     }
 
 
+# ── Batch estimates ──────────────────────────────────────────
+
+# generate_5phase_estimate keyword arguments accepted per job by
+# generate_5phase_estimate_batch (customer_name is only used for reports)
+BATCH_PARAMS = (
+    'drive_time_min', 'storage_vaults', 'storage_duration_months', 'apply_corrections',
+    'handling_rate', 'target_margin', 'crew_size', 'truck_loads', 'carry_time_min',
+    'pad_count', 'climate_storage_sf', 'customer_name',
+)
+
+# Quantity behind each build_5phase_estimate line item, by description
+BATCH_QTY_KEYS = {
+    "Eval. pack & invent. misc items - per Med box-high density": 'boxes',
+    "Eval. pack & invent. misc items - per Lg box-high density": 'lg_boxes',
+    "Eval. pack & invent. misc items - per Xlg box-high density": 'xl_boxes',
+    "Evaluate, tag, & inventory miscellaneous - per item": 'tags',
+    "Provide furniture lightweight blanket/pad": 'pads',
+    "Bubble wrap - 48\" wide - Add-on cost for fragile items": 'bubble_wrap_lf',
+    "Provide stretch film/wrap - 20\" x 1000' roll": 'stretch_film_rolls',
+    "Inventory, Packing, Boxing, and Moving charge - per hour": 'handling_hours',
+    "Moving van (21'-27') and equipment (per day)": 'moving_van_days',
+    "Off-site storage vault (per month)": 'storage_months',
+    "Off-site storage & insur. - climate control. (per month)": 'climate_sf_months',
+    "Haul debris - per pickup truck load - including dump fees": 'debris_loads',
+}
+# Line items build_5phase_estimate leaves out when their quantity is 0
+BATCH_OPTIONAL_QTY = {'lg_boxes', 'xl_boxes', 'climate_sf_months'}
+
+
+@dataclass
+class BatchEstimate:
+    """
+    Counts, quantities and RCV for N jobs from generate_5phase_estimate_batch.
+
+    Per-job values are arrays indexed like the input walkthroughs; the line
+    item matrices (qty, unit_cost, rcv) have one column per entry in columns.
+    Text reports, scope checks, similar jobs and files are only produced by
+    report(i).
+    """
+    walkthroughs: list
+    params: dict                # BATCH_PARAMS key -> list of per-job values
+    columns: list               # (phase, desc, unit, qty key) per line item column
+    tags: np.ndarray
+    boxes: np.ndarray
+    lg_boxes: np.ndarray
+    xl_boxes: np.ndarray
+    pads: np.ndarray
+    crew_size: np.ndarray
+    truck_loads: np.ndarray
+    handling_hours: np.ndarray
+    handling_rate: np.ndarray
+    storage_vaults: np.ndarray
+    storage_months: np.ndarray
+    qty: np.ndarray             # (jobs, columns)
+    unit_cost: np.ndarray       # (jobs, columns)
+    rcv: np.ndarray             # (jobs, columns)
+    total_rcv: np.ndarray
+
+    def __len__(self):
+        return len(self.walkthroughs)
+
+    def job_params(self, i: int) -> dict:
+        """generate_5phase_estimate keyword arguments for job i."""
+        return {key: values[i] for key, values in self.params.items()}
+
+    def phase_totals(self) -> dict:
+        """Phase -> array of per-job RCV."""
+        totals = {}
+        for col, (phase, _, _, _) in enumerate(self.columns):
+            totals[phase] = totals.get(phase, 0) + self.rcv[:, col]
+        return {phase: _round(total, 2) for phase, total in totals.items()}
+
+    def line_items(self, i: int) -> list[dict]:
+        """Job i's line items, shaped like generate_5phase_estimate()['line_items']."""
+        return [{
+            'desc': desc, 'qty': self.qty[i, col].item(), 'unit': unit,
+            'unit_cost': self.unit_cost[i, col].item(), 'rcv': self.rcv[i, col].item(),
+            'phase': phase,
+        } for col, (phase, desc, unit, key) in enumerate(self.columns)
+            if key not in BATCH_OPTIONAL_QTY or self.qty[i, col] > 0]
+
+    def result(self, i: int) -> dict:
+        """Job i's numbers with the keys generate_5phase_estimate returns (no text)."""
+        return {
+            'customer': self.params['customer_name'][i],
+            'rooms': self.walkthroughs[i].total_rooms,
+            'tags': int(self.tags[i]),
+            'boxes': int(self.boxes[i]),
+            'lg_boxes': int(self.lg_boxes[i]),
+            'xl_boxes': int(self.xl_boxes[i]),
+            'handling_hours': self.handling_hours[i].item(),
+            'handling_rate': self.handling_rate[i].item(),
+            'storage_months': self.storage_months[i].item(),
+            'storage_vaults': int(self.storage_vaults[i]),
+            'total_rcv': self.total_rcv[i].item(),
+            'line_items': self.line_items(i),
+        }
+
+    def report(self, i: int, output_dir: Optional[Path] = None) -> dict:
+        """Full generate_5phase_estimate for job i (text reports, CSV/summary files)."""
+        return generate_5phase_estimate(self.walkthroughs[i], output_dir=output_dir, **self.job_params(i))
+
+
+def _batch_params(params, n: int) -> dict:
+    """BATCH_PARAMS key -> list of n values from shared values, per-job sequences
+    or a list of per-job dicts; missing keys take generate_5phase_estimate's defaults."""
+    import inspect
+    defaults = {name: p.default for name, p in inspect.signature(generate_5phase_estimate).parameters.items()
+                if name in BATCH_PARAMS}
+
+    params = params or {}
+    if isinstance(params, (list, tuple)):
+        if len(params) != n:
+            raise ValueError(f"{len(params)} parameter dicts for {n} walkthroughs")
+        params = {key: [p.get(key, defaults.get(key)) for p in params] for key in set().union(*params)}
+
+    unknown = set(params) - set(BATCH_PARAMS)
+    if unknown:
+        raise ValueError(f"Unsupported batch estimate parameter(s): {', '.join(sorted(unknown))}")
+
+    resolved = {}
+    for key in BATCH_PARAMS:
+        value = params.get(key, defaults[key])
+        if isinstance(value, (list, tuple, np.ndarray)):
+            if len(value) != n:
+                raise ValueError(f"{key}: {len(value)} values for {n} walkthroughs")
+            resolved[key] = list(value)
+        else:
+            resolved[key] = [value] * n
+    return resolved
+
+
+def _round(values: np.ndarray, ndigits: int) -> np.ndarray:
+    """np.round giving Python round()'s results. np.round scales by 10**ndigits
+    first, which can move an amount like 7031.775 to the other side of the tie."""
+    rounded = np.round(values, ndigits)
+    scaled = values * 10.0 ** ndigits
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near_tie.any():
+        rounded[near_tie] = [round(v, ndigits) for v in values[near_tie].tolist()]
+    return rounded
+
+
+def generate_5phase_estimate_batch(walkthroughs: list, params=None) -> BatchEstimate:
+    """
+    generate_5phase_estimate's counts, cartage, vaults, line items and RCV
+    for many walkthroughs at once (backtests, density sweeps, what-if runs).
+
+    Each step is one array operation over all jobs, and every line item
+    price is looked up once for the batch. Nothing is formatted or written;
+    call report(i) for a job's full estimate.
+
+    Args:
+        walkthroughs: WalkthroughAnalysis per job
+        params: generate_5phase_estimate keyword arguments (BATCH_PARAMS). Each
+                value is shared by all jobs or is a sequence with one value per
+                job (None = that job's default). A list of per-job dicts also works.
+
+    Returns:
+        BatchEstimate; total_rcv[i] matches generate_5phase_estimate's total_rcv
+    """
+    n = len(walkthroughs)
+    p = _batch_params(params, n)
+
+    def per_job(key, fallback, use_fallback=lambda v: v is None):
+        return np.array([fb if use_fallback(v) else v for v, fb in zip(p[key], fallback)])
+
+    # Step 1-2: Counts, with correction factors where enabled
+    tags = np.array([w.total_tags for w in walkthroughs], dtype=np.int64)
+    boxes = np.array([w.total_boxes for w in walkthroughs], dtype=np.int64)
+    corrected = np.array(p['apply_corrections'], dtype=bool)
+    if corrected.any():
+        adjuster = reference_data.estimate_adjuster()
+        tag_factor = adjuster.multiplier('tag_multiplier')
+        box_factor = adjuster.multiplier('box_multiplier')
+        tags = np.where(corrected, np.round(tags * tag_factor), tags).astype(np.int64)
+        boxes = np.where(corrected, np.round(boxes * box_factor), boxes).astype(np.int64)
+    crew_size = per_job('crew_size', [w.suggested_crew_size for w in walkthroughs], lambda v: not v)
+    truck_loads = per_job('truck_loads', [w.suggested_truck_loads for w in walkthroughs], lambda v: not v)
+
+    # Step 3: Cartage hours (cartage_calculator.calculate_cartage)
+    std = FactoryStandards()
+    carry = np.array(p['carry_time_min'], dtype=float)
+    drive = np.array(p['drive_time_min'], dtype=float)
+    minutes_per_tag = std.pad_wrap_tag + std.load_tag + std.unload_tag + std.move_tag_to_storage + carry
+    minutes_per_box = (std.load_3box + std.unload_3box + std.move_3box_to_storage + carry) / 3.0
+    total_hours = (minutes_per_tag * tags / 60.0 + minutes_per_box * boxes / 60.0
+                   + drive * 2 * crew_size * truck_loads / 60.0)
+    handling_hours = _round(_round(total_hours, 4), 2)
+
+    # Step 4: Handling rate, one billing_rate_for_margin per distinct margin
+    calc = reference_data.labor_rates()
+    margin_rates = {m: calc.billing_rate_for_margin(m) for m in set(p['target_margin'])}
+    handling_rate = per_job('handling_rate', [margin_rates[m] for m in p['target_margin']]).astype(float)
+
+    # Step 5: Box sizing
+    lg_boxes = np.where(boxes > 30, boxes // 15, 0)
+    xl_boxes = np.where(boxes > 80, boxes // 40, 0)
+
+    # Step 6: Vaults (pricing_engine.calculate_storage_vaults unless given)
+    component_vaults = np.ceil(boxes / 60) + np.ceil(tags / 20)
+    capacity_vaults = np.ceil((tags + boxes) / 50)
+    auto_vaults = np.maximum(1, np.minimum(component_vaults, capacity_vaults)).astype(np.int64)
+    storage_vaults = per_job('storage_vaults', auto_vaults).astype(np.int64)
+    duration = np.array(p['storage_duration_months'])
+    storage_months = storage_vaults * duration
+    climate_sf = np.array([sf if sf is not None and sf > 0 else 0 for sf in p['climate_storage_sf']])
+    climate_sf_months = climate_sf * duration
+
+    # Step 7: Line item quantities (pricing_engine.build_5phase_estimate; after
+    # changing either, run estimate_batch_benchmark.py --check)
+    ratio = np.where(tags <= 31, 0.645,
+                     np.where(tags >= 84, 1.226, 0.645 + (tags - 31) / (84 - 31) * (1.226 - 0.645)))
+    adaptive_pads = np.where(tags <= 0, 1, np.maximum(1, np.round(tags * np.minimum(ratio, 1.25))))
+    pads = per_job('pad_count', adaptive_pads).astype(np.int64)
+    quantities = {
+        'tags': tags, 'boxes': boxes, 'lg_boxes': lg_boxes, 'xl_boxes': xl_boxes, 'pads': pads,
+        'bubble_wrap_lf': np.maximum(100, boxes * 7),
+        'stretch_film_rolls': np.maximum(2, boxes // 35),
+        'handling_hours': handling_hours, 'moving_van_days': truck_loads,
+        'storage_months': storage_months, 'climate_sf_months': climate_sf_months,
+        'debris_loads': np.ones(n),
+    }
+
+    # Step 8: Prices -- the line items build_5phase_estimate makes when every
+    # optional item is present, priced the way price_5phase_estimate does
+    template, packback_discount = build_5phase_estimate(
+        tag_count=1, box_count=1, handling_hours=1, lg_boxes=1, xl_boxes=1, climate_storage_sf=1)
+    engine = reference_data.pricing_engine()
+    columns, qty_cols, cost_cols = [], [], []
+    for item in template:
+        key = BATCH_QTY_KEYS[item.desc]
+        if key == 'handling_hours':
+            cost = handling_rate
+        elif item.unit_cost is not None:
+            cost = item.unit_cost
+        else:
+            ref = engine.find_price(item.desc)
+            cost = ref['unit_cost_weighted_median'] if ref is not None else 0.0
+            if ref is not None and item.phase == 'Pack back' and 'box' in item.desc.lower():
+                cost = round(cost * (1 - packback_discount), 2)
+        columns.append((item.phase, item.desc, item.unit, key))
+        qty_cols.append(quantities[key])
+        cost_cols.append(np.broadcast_to(np.asarray(cost, dtype=float), (n,)))
+
+    qty = np.column_stack(qty_cols).astype(float) if n else np.zeros((0, len(columns)))
+    unit_cost = np.column_stack(cost_cols) if n else np.zeros((0, len(columns)))
+    rcv = _round(unit_cost * qty, 2)
+
+    return BatchEstimate(
+        walkthroughs=list(walkthroughs), params=p, columns=columns,
+        tags=tags, boxes=boxes, lg_boxes=lg_boxes, xl_boxes=xl_boxes, pads=pads,
+        crew_size=crew_size, truck_loads=truck_loads,
+        handling_hours=handling_hours, handling_rate=handling_rate,
+        storage_vaults=storage_vaults, storage_months=storage_months,
+        qty=qty, unit_cost=unit_cost, rcv=rcv, total_rcv=_round(rcv.sum(axis=1), 2),
+    )
+
+
+# Values BatchEstimate.result() shares with generate_5phase_estimate
+BATCH_PARITY_KEYS = ('tags', 'boxes', 'lg_boxes', 'xl_boxes', 'handling_hours', 'handling_rate',
+                     'storage_months', 'storage_vaults', 'total_rcv')
+
+
+def check_batch_parity(walkthroughs: list, params=None, tolerance: float = 0.005) -> list[str]:
+    """
+    Price the jobs with generate_5phase_estimate_batch and with
+    generate_5phase_estimate one at a time and list every difference:
+    counts, hours, rates, line items (description, phase, qty, unit cost,
+    RCV) and total RCV. The batch path re-implements the per-line formulas
+    of build_5phase_estimate and calculate_cartage, so this is the check
+    that they still agree.
+
+    Returns:
+        One "job i: ..." line per difference (empty when they agree)
+    """
+    batch = generate_5phase_estimate_batch(walkthroughs, params)
+    problems = []
+
+    def differs(a, b):
+        if isinstance(a, str) or isinstance(b, str):
+            return a != b
+        return abs(a - b) >= tolerance
+
+    for i in range(len(batch)):
+        got = batch.result(i)
+        want = generate_5phase_estimate(walkthroughs[i], **batch.job_params(i))
+        for key in BATCH_PARITY_KEYS:
+            if differs(got[key], want[key]):
+                problems.append(f"job {i}: {key} batch {got[key]} vs loop {want[key]}")
+        got_items, want_items = got['line_items'], want['line_items']
+        if len(got_items) != len(want_items):
+            problems.append(f"job {i}: {len(got_items)} batch line items vs {len(want_items)} loop")
+        for n, (g, w) in enumerate(zip(got_items, want_items), 1):
+            for key in ('desc', 'phase', 'qty', 'unit_cost', 'rcv'):
+                if differs(g[key], w[key]):
+                    problems.append(f"job {i}: line {n} {key} batch {g[key]!r} vs loop {w[key]!r}")
+    return problems
+
+
 def main():
     parser = argparse.ArgumentParser(description='Generate a draft packout estimate from walk-through data')
     parser.add_argument('--pdf', type=str, help='Path to Encircle walk-through PDF')
@@ -0,0 +1,681 @@
+"""
+Image Preparation Module
+Decodes room photos (JPEG/PNG/WebP/GIF/HEIC), downscales them to a max
+dimension, and re-encodes as JPEG before they are sent to a vision model.
+
+Encircle photos are typically 3-12 MP originals (HEIC from iPhones). The
+models don't need that much resolution to count furniture and boxes, and
+shipping the originals costs upload time and request payload. Prepared
+images are cached by content hash (in memory and on disk), so the same
+photo analyzed by a retry, a second model, or a later run is only
+processed once. Both caches are bounded: the memory cache by
+MEMORY_CACHE_MAX_BYTES, the disk cache by PHOTO_CACHE_MAX_MB (least
+recently used files are deleted first).
+
+Requires Pillow; HEIC needs pillow-heif (pip install pillow pillow-heif).
+Without Pillow, JPEG/PNG/WebP/GIF files are passed through unchanged with
+their correct media type.
+
+Usage:
+    from image_prep import prepare_image, claude_image_blocks, gemini_image_parts
+
+    img = prepare_image("IMG_0412.HEIC")
+    print(img.media_type, img.width, img.height, len(img.data))
+
+    # Whole request kept under PHOTO_REQUEST_BUDGET_MB (downscaled if needed)
+    content = claude_image_blocks(photo_paths)    # Anthropic
+    contents = gemini_image_parts(photo_paths)    # google-genai
+
+    # Drop blurry shots and near-duplicates, keep the most distinct 5
+    photos = select_photos(photo_paths, max_photos=MAX_ROOM_PHOTOS)
+
+    # One labeled image instead of five (PHOTO_CONTACT_SHEET=1 turns this on
+    # in the photo analyzers)
+    sheet = make_contact_sheet(photos)
+"""
+
+import base64
+import hashlib
+import io
+import math
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+# Long edge in pixels. 1568 is the largest size Claude uses without
+# downscaling server-side; Gemini tiles at 768 so this is plenty there too.
+MAX_DIMENSION = int(os.environ.get("PHOTO_MAX_DIMENSION", 1568))
+MIN_DIMENSION = 384   # budget-driven downscaling never goes below this
+JPEG_QUALITY = int(os.environ.get("PHOTO_JPEG_QUALITY", 82))
+MIN_JPEG_QUALITY = 60
+CACHE_DIR = Path(os.environ.get("PHOTO_CACHE_DIR",
+                                Path(tempfile.gettempdir()) / "estimator_photo_cache"))
+MEMORY_CACHE_MAX_BYTES = 64 * 1024 * 1024  # prepared JPEG bytes kept in process
+DISK_CACHE_MAX_BYTES = int(float(os.environ.get("PHOTO_CACHE_MAX_MB", 512)) * 1024 * 1024)
+DISK_CACHE_PRUNE_EVERY = 64  # disk cache writes between size checks
+
+# Base64 image payload allowed in one model request. Over budget, every
+# photo in the request is downscaled and re-encoded until it fits
+# (Claude rejects requests over 32MB, Gemini inline data over 20MB).
+REQUEST_BUDGET_BYTES = int(float(os.environ.get("PHOTO_REQUEST_BUDGET_MB", 8)) * 1024 * 1024)
+
+PASSTHROUGH_TYPES = {
+    '.jpg': 'image/jpeg', '.jpeg': 'image/jpeg',
+    '.png': 'image/png', '.gif': 'image/gif', '.webp': 'image/webp',
+}
+HEIC_SUFFIXES = {'.heic', '.heif'}
+_READ_BLOCK = 1024 * 1024
+
+
+class ImagePrepError(Exception):
+    """Photo could not be decoded or re-encoded."""
+
+
+@dataclass
+class PreparedImage:
+    """A photo ready to send to a vision model."""
+    data: bytes
+    media_type: str
+    width: int = 0
+    height: int = 0
+    original_bytes: int = 0
+    source: str = ""
+
+    @property
+    def b64(self) -> str:
+        return base64.standard_b64encode(self.data).decode('ascii')
+
+    @property
+    def b64_size(self) -> int:
+        return _b64_size(len(self.data))
+
+
+def _b64_size(n: int) -> int:
+    return (n + 2) // 3 * 4
+
+
+_memory_cache: dict[str, PreparedImage] = {}
+_memory_cache_bytes = 0
+_disk_writes = 0
+_cache_lock = threading.Lock()
+_heif_registered = None
+_stats = {'prepared': 0, 'memory_hits': 0, 'disk_hits': 0,
+          'original_bytes': 0, 'prepared_bytes': 0, 'budget_downscales': 0}
+
+
+def _register_heif() -> bool:
+    """Register pillow-heif with Pillow once. Returns True if HEIC is supported."""
+    global _heif_registered
+    if _heif_registered is None:
+        try:
+            import pillow_heif
+            pillow_heif.register_heif_opener()
+            _heif_registered = True
+        except ImportError:
+            _heif_registered = False
+    return _heif_registered
+
+
+def _have_pillow() -> bool:
+    try:
+        import PIL  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _file_digest(path: Path) -> str:
+    """sha256 of a file, read in blocks so the original is never held whole."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(_READ_BLOCK), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _remember(key: str, img: PreparedImage):
+    """Add to the in-process cache, evicting oldest entries past MEMORY_CACHE_MAX_BYTES."""
+    global _memory_cache_bytes
+    with _cache_lock:
+        if key in _memory_cache:
+            return
+        _memory_cache[key] = img
+        _memory_cache_bytes += len(img.data)
+        while _memory_cache_bytes > MEMORY_CACHE_MAX_BYTES and len(_memory_cache) > 1:
+            old = _memory_cache.pop(next(iter(_memory_cache)))
+            _memory_cache_bytes -= len(old.data)
+
+
+def _prune_disk_cache():
+    """Delete the least recently used cache files past DISK_CACHE_MAX_BYTES
+    (a disk hit bumps the file's mtime)."""
+    try:
+        entries = [e for e in os.scandir(CACHE_DIR) if e.name.endswith('.jpg')]
+        files = sorted((e.stat().st_mtime, e.stat().st_size, e.path) for e in entries)
+    except OSError:
+        return
+    total = sum(size for _, size, _ in files)
+    for _, size, path in files:
+        if total <= DISK_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+
+def _encode(path: Path, max_dimension: int, quality: int) -> tuple[bytes, int, int]:
+    """Decode (from the file, not a copy in memory), orient, downscale and
+    JPEG-encode. Returns (jpeg_bytes, width, height)."""
+    from PIL import Image, ImageOps
+
+    suffix = path.suffix.lower()
+    heif_ok = _register_heif()
+    if suffix in HEIC_SUFFIXES and not heif_ok:
+        raise ImagePrepError("HEIC photo needs pillow-heif (pip install pillow-heif)")
+
+    try:
+        with Image.open(path) as im:
+            im.draft('RGB', (max_dimension, max_dimension))  # fast JPEG downscale on decode
+            im = ImageOps.exif_transpose(im)
+            if im.mode in ('RGBA', 'LA', 'P'):
+                im = im.convert('RGBA')
+                background = Image.new('RGB', im.size, (255, 255, 255))
+                background.paste(im, mask=im.split()[-1])
+                im = background
+            elif im.mode != 'RGB':
+                im = im.convert('RGB')
+            im.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+            out = io.BytesIO()
+            im.save(out, format='JPEG', quality=quality, optimize=True)
+            return out.getvalue(), im.width, im.height
+    except ImagePrepError:
+        raise
+    except Exception as e:
+        raise ImagePrepError(f"Could not decode {suffix or 'image'}: {type(e).__name__}: {e}") from e
+
+
+def prepare_image(
+    path: str | Path,
+    max_dimension: int = None,
+    quality: int = None,
+) -> PreparedImage:
+    """
+    Load a photo and return a downscaled JPEG suitable for a vision model.
+
+    The original is hashed in blocks and decoded straight from the file;
+    only the (small) prepared JPEG is kept.
+
+    Args:
+        path: Photo file (any format Pillow can read; HEIC with pillow-heif)
+        max_dimension: Longest edge in pixels (default PHOTO_MAX_DIMENSION or 1568)
+        quality: JPEG quality 1-95 (default PHOTO_JPEG_QUALITY or 82)
+
+    Returns:
+        PreparedImage (cached by content hash + settings)
+
+    Raises:
+        ImagePrepError if the photo can't be decoded
+    """
+    path = Path(path)
+    max_dimension = max_dimension or MAX_DIMENSION
+    quality = quality or JPEG_QUALITY
+    suffix = path.suffix.lower()
+
+    original_size = path.stat().st_size
+    key = f"{_file_digest(path)}_{max_dimension}_q{quality}"
+
+    with _cache_lock:
+        cached = _memory_cache.get(key)
+        if cached is not None:
+            _stats['memory_hits'] += 1
+            return cached
+
+    disk_path = CACHE_DIR / f"{key}.jpg"
+    if disk_path.exists():
+        data = disk_path.read_bytes()
+        try:
+            os.utime(disk_path)  # recently used: pruned last
+        except OSError:
+            pass
+        img = PreparedImage(data=data, media_type='image/jpeg',
+                            original_bytes=original_size, source=str(path))
+        try:
+            from PIL import Image
+            with Image.open(io.BytesIO(data)) as im:
+                img.width, img.height = im.size
+        except Exception:
+            pass
+        _stats['disk_hits'] += 1
+        _remember(key, img)
+        return img
+
+    if not _have_pillow():
+        # No Pillow: send the original, but at least label it correctly
+        media_type = PASSTHROUGH_TYPES.get(suffix)
+        if media_type is None:
+            raise ImagePrepError(f"{path.name}: {suffix} needs Pillow to convert (pip install pillow)")
+        img = PreparedImage(data=path.read_bytes(), media_type=media_type,
+                            original_bytes=original_size, source=str(path))
+        _remember(key, img)
+        return img
+
+    data, width, height = _encode(path, max_dimension, quality)
+    if (suffix in ('.jpg', '.jpeg') and len(data) >= original_size
+            and max(width, height) < max_dimension):
+        # Already small -- re-encoding would only lose quality
+        data = path.read_bytes()
+    img = PreparedImage(data=data, media_type='image/jpeg', width=width, height=height,
+                        original_bytes=original_size, source=str(path))
+
+    global _disk_writes
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = disk_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, disk_path)
+        with _cache_lock:
+            _disk_writes += 1
+            prune = (_disk_writes - 1) % DISK_CACHE_PRUNE_EVERY == 0  # first write, then every N
+        if prune:
+            _prune_disk_cache()
+    except OSError:
+        pass  # disk cache is best-effort
+
+    with _cache_lock:
+        _stats['prepared'] += 1
+        _stats['original_bytes'] += original_size
+        _stats['prepared_bytes'] += len(data)
+    _remember(key, img)
+    return img
+
+
+def _shrink(dimension: int, quality: int, total: int, budget: int) -> tuple[int, int]:
+    """Next (dimension, quality) step toward fitting total bytes into budget."""
+    # Bytes scale roughly with pixel count, i.e. with dimension squared
+    scale = math.sqrt(budget / total) * 0.9
+    return (max(MIN_DIMENSION, min(int(dimension * scale), dimension - 64)),
+            max(MIN_JPEG_QUALITY, quality - 8))
+
+
+def prepare_images(
+    photo_paths: list,
+    budget_bytes: int = None,
+    max_dimension: int = None,
+    quality: int = None,
+) -> list[PreparedImage]:
+    """
+    Prepare a request's photos so their combined base64 size fits the budget.
+
+    Over budget, all photos are downscaled and re-encoded (dimension and
+    quality stepped down together) until they fit or hit MIN_DIMENSION.
+    Photos that can't be decoded are skipped with a message.
+    """
+    budget = budget_bytes or REQUEST_BUDGET_BYTES
+    dimension = max_dimension or MAX_DIMENSION
+    quality = quality or JPEG_QUALITY
+    can_shrink = _have_pillow()
+
+    while True:
+        images = []
+        for p in photo_paths:
+            try:
+                images.append(prepare_image(p, dimension, quality))
+            except ImagePrepError as e:
+                print(f"    Skipping {Path(p).name}: {e}")
+        total = sum(img.b64_size for img in images)
+        if total <= budget or not can_shrink or dimension <= MIN_DIMENSION:
+            if total > budget:
+                print(f"    WARNING: photo payload {total / 1e6:.1f} MB still over "
+                      f"{budget / 1e6:.1f} MB budget at {dimension}px")
+            return images
+        dimension, quality = _shrink(dimension, quality, total, budget)
+        with _cache_lock:
+            _stats['budget_downscales'] += 1
+        print(f"    Photo payload {total / 1e6:.1f} MB over {budget / 1e6:.1f} MB budget "
+              f"-- re-encoding at {dimension}px, q{quality}")
+
+
+# ── Photo selection ──────────────────────────────────────────
+
+PHASH_DUP_DISTANCE = 10   # Hamming distance (of 64 bits) at or below which two photos are duplicates
+BLUR_RELATIVE = 0.35      # Blurry if sharpness < this fraction of the set's median
+BLUR_ABSOLUTE = 15.0      # ...or below this Laplacian variance outright
+SIGNATURE_SIZE = 512      # Long edge used for the sharpness score
+SIGNATURE_CACHE_MAX = 4096  # signatures kept in process; oldest dropped first
+# Photos sent per room by both photo analyzers (estimate.py, encircle_pipeline)
+MAX_ROOM_PHOTOS = int(os.environ.get("PHOTO_MAX_PER_ROOM", 5))
+
+_signature_cache: dict[tuple, "PhotoSignature"] = {}
+
+
+@dataclass
+class PhotoSignature:
+    """Perceptual hash + sharpness score for one photo."""
+    phash: int
+    sharpness: float
+
+
+def _dct_matrix(n: int):
+    import numpy as np
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    return np.cos(np.pi * (2 * i + 1) * k / (2 * n))
+
+
+def photo_signature(path: str | Path) -> PhotoSignature:
+    """
+    Compute a 64-bit DCT perceptual hash and a sharpness score
+    (variance of the Laplacian on a downscaled grayscale copy).
+
+    Cached per (path, size, mtime). Requires Pillow + numpy.
+    """
+    import numpy as np
+    from PIL import Image, ImageOps
+
+    path = Path(path)
+    stat = path.stat()
+    key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+    with _cache_lock:
+        cached = _signature_cache.get(key)
+    if cached is not None:
+        return cached
+
+    _register_heif()
+    with Image.open(path) as im:
+        im.draft('L', (SIGNATURE_SIZE, SIGNATURE_SIZE))
+        im = ImageOps.exif_transpose(im).convert('L')
+        im.thumbnail((SIGNATURE_SIZE, SIGNATURE_SIZE))
+        gray = np.asarray(im, dtype=np.float32)
+        small = np.asarray(im.resize((32, 32), Image.Resampling.LANCZOS), dtype=np.float32)
+
+    c = _dct_matrix(32)
+    low = (c @ small @ c.T)[:8, :8].flatten()
+    bits = low > np.median(low[1:])  # DC term skews the median
+    phash = int("".join("1" if b else "0" for b in bits), 2)
+
+    lap = (gray[:-2, 1:-1] + gray[2:, 1:-1] + gray[1:-1, :-2] + gray[1:-1, 2:]
+           - 4 * gray[1:-1, 1:-1])
+    sig = PhotoSignature(phash=phash, sharpness=float(lap.var()) if lap.size else 0.0)
+
+    with _cache_lock:
+        _signature_cache[key] = sig
+        while len(_signature_cache) > SIGNATURE_CACHE_MAX:
+            _signature_cache.pop(next(iter(_signature_cache)))
+    return sig
+
+
+def _hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def select_photos(
+    photo_paths: list,
+    max_photos: int = None,
+    dup_distance: int = PHASH_DUP_DISTANCE,
+) -> list:
+    """
+    Choose the most informative photos of a room.
+
+    1. Drop blurry frames (below BLUR_ABSOLUTE or relative to the set's
+       median sharpness). If the whole set is below BLUR_ABSOLUTE (low
+       light, small or heavily compressed photos), only the relative
+       threshold is applied, so a soft room still keeps its distinct shots
+    2. Drop near-duplicates (pHash within dup_distance), keeping the sharper shot
+    3. Pick up to max_photos by farthest-point sampling on pHash distance,
+       starting from the sharpest photo
+
+    Photos that can't be decoded are kept as candidates (treated as
+    distinct, average sharpness). At least one photo is always returned
+    when any are given. Result keeps the original order.
+
+    Raises:
+        ImportError if Pillow or numpy is missing (caller falls back)
+    """
+    import numpy  # noqa: F401
+    import PIL  # noqa: F401
+
+    paths = list(photo_paths)
+    if not paths:
+        return []
+
+    sigs = {}
+    for i, p in enumerate(paths):
+        try:
+            sigs[i] = photo_signature(p)
+        except Exception:
+            sigs[i] = None
+
+    scores = [s.sharpness for s in sigs.values() if s is not None]
+    median = sorted(scores)[len(scores) // 2] if scores else 0.0
+
+    def sharpness(i):
+        return sigs[i].sharpness if sigs[i] is not None else median
+
+    # 1. Blur
+    threshold = max(BLUR_ABSOLUTE, BLUR_RELATIVE * median) if scores else 0.0
+    candidates = [i for i in range(len(paths)) if sharpness(i) >= threshold]
+    if not candidates and scores:
+        threshold = BLUR_RELATIVE * median
+        candidates = [i for i in range(len(paths)) if sharpness(i) >= threshold]
+        print(f"    Photo selection: all {len(paths)} photos below sharpness {BLUR_ABSOLUTE:g} "
+              f"-- using {BLUR_RELATIVE:.0%} of the room median ({threshold:.1f}) as the blur threshold")
+    if not candidates:
+        candidates = [max(range(len(paths)), key=sharpness)]
+
+    # 2. Near-duplicates (sharpest first wins)
+    kept = []
+    for i in sorted(candidates, key=lambda i: (-sharpness(i), i)):
+        if sigs[i] is None or all(
+            sigs[j] is None or _hamming(sigs[i].phash, sigs[j].phash) > dup_distance
+            for j in kept
+        ):
+            kept.append(i)
+
+    # 3. Diverse subset
+    if max_photos and len(kept) > max_photos:
+        chosen = [kept[0]]
+        rest = kept[1:]
+        while len(chosen) < max_photos and rest:
+            def distance(i):
+                if sigs[i] is None:
+                    return 64
+                return min(64 if sigs[j] is None else _hamming(sigs[i].phash, sigs[j].phash)
+                           for j in chosen)
+            best = max(rest, key=lambda i: (distance(i), sharpness(i), -i))
+            chosen.append(best)
+            rest.remove(best)
+        kept = chosen
+
+    dropped = len(paths) - len(kept)
+    if dropped:
+        print(f"    Photo selection: {len(kept)}/{len(paths)} kept "
+              f"({len(paths) - len(candidates)} blurry, "
+              f"{len(candidates) - len(kept)} duplicate/redundant)")
+    return [paths[i] for i in sorted(kept)]
+
+
+# ── Contact sheets ───────────────────────────────────────────
+
+CONTACT_SHEET = os.environ.get("PHOTO_CONTACT_SHEET", "0") == "1"
+CONTACT_SHEET_DIMENSION = int(os.environ.get("PHOTO_CONTACT_SHEET_DIMENSION", MAX_DIMENSION))
+CONTACT_SHEET_NOTE = (
+    "The image is a contact sheet of {count} photos of this room, numbered 1-{count} "
+    "in the top-left corner of each tile. Photos may overlap -- count each item once."
+)
+
+
+def make_contact_sheet(
+    photo_paths: list,
+    max_dimension: int = None,
+    quality: int = None,
+) -> PreparedImage:
+    """
+    Tile photos into one numbered JPEG no larger than max_dimension on its long edge.
+
+    Tiles are 4:3 in a near-square grid; each photo is fitted (not cropped)
+    and labeled with its 1-based position. Cached by photo content + settings.
+
+    Raises:
+        ImagePrepError if none of the photos can be decoded
+    """
+    from PIL import Image, ImageDraw, ImageFont, ImageOps
+
+    max_dimension = max_dimension or CONTACT_SHEET_DIMENSION
+    quality = quality or JPEG_QUALITY
+    paths = [Path(p) for p in photo_paths]
+
+    digest = hashlib.sha256()
+    for p in paths:
+        digest.update(_file_digest(p).encode())
+    key = f"sheet_{digest.hexdigest()}_{max_dimension}_q{quality}"
+    with _cache_lock:
+        cached = _memory_cache.get(key)
+    if cached is not None:
+        return cached
+
+    _register_heif()
+    n = len(paths)
+    if n == 0:
+        raise ImagePrepError("No photos for contact sheet")
+    cols = math.ceil(math.sqrt(n))
+    rows = math.ceil(n / cols)
+    tile_w = max_dimension // cols
+    tile_h = tile_w * 3 // 4
+    if rows * tile_h > max_dimension:
+        tile_h = max_dimension // rows
+        tile_w = tile_h * 4 // 3
+
+    sheet = Image.new('RGB', (cols * tile_w, rows * tile_h), (32, 32, 32))
+    draw = ImageDraw.Draw(sheet)
+    try:
+        font = ImageFont.load_default(size=max(14, tile_h // 10))
+    except TypeError:  # Pillow < 10.1
+        font = ImageFont.load_default()
+
+    placed = 0
+    original_bytes = 0
+    for i, path in enumerate(paths):
+        try:
+            with Image.open(path) as im:
+                im.draft('RGB', (tile_w, tile_h))
+                im = ImageOps.exif_transpose(im).convert('RGB')
+                im.thumbnail((tile_w - 4, tile_h - 4), Image.Resampling.LANCZOS)
+                x = (i % cols) * tile_w + (tile_w - im.width) // 2
+                y = (i // cols) * tile_h + (tile_h - im.height) // 2
+                sheet.paste(im, (x, y))
+        except Exception as e:
+            print(f"    Contact sheet: skipping {path.name}: {e}")
+            continue
+        label = str(i + 1)
+        lx, ly = (i % cols) * tile_w + 4, (i // cols) * tile_h + 4
+        box = draw.textbbox((lx, ly), label, font=font)
+        draw.rectangle((box[0] - 4, box[1] - 4, box[2] + 4, box[3] + 4), fill=(0, 0, 0))
+        draw.text((lx, ly), label, fill=(255, 255, 0), font=font)
+        placed += 1
+        original_bytes += path.stat().st_size
+
+    if not placed:
+        raise ImagePrepError("None of the photos could be decoded for the contact sheet")
+
+    out = io.BytesIO()
+    sheet.save(out, format='JPEG', quality=quality, optimize=True)
+    img = PreparedImage(data=out.getvalue(), media_type='image/jpeg',
+                        width=sheet.width, height=sheet.height,
+                        original_bytes=original_bytes, source=f"contact sheet ({placed} photos)")
+    _remember(key, img)
+    return img
+
+
+def prepare_contact_sheet(photo_paths: list, budget_bytes: int = None) -> PreparedImage:
+    """make_contact_sheet, downscaled until its base64 size fits the budget."""
+    budget = budget_bytes or REQUEST_BUDGET_BYTES
+    dimension, quality = CONTACT_SHEET_DIMENSION, JPEG_QUALITY
+    while True:
+        img = make_contact_sheet(photo_paths, dimension, quality)
+        if img.b64_size <= budget or dimension <= MIN_DIMENSION:
+            return img
+        dimension, quality = _shrink(dimension, quality, img.b64_size, budget)
+        with _cache_lock:
+            _stats['budget_downscales'] += 1
+        print(f"    Contact sheet {img.b64_size / 1e6:.1f} MB over {budget / 1e6:.1f} MB budget "
+              f"-- re-encoding at {dimension}px, q{quality}")
+
+
+# ── Request content ──────────────────────────────────────────
+# Each helper serializes one image at a time; the base64 str lives only in
+# the returned block and nothing else is held once the block is built.
+
+def _claude_block(img: PreparedImage) -> dict:
+    return {
+        "type": "image",
+        "source": {
+            "type": "base64",
+            "media_type": img.media_type,
+            "data": img.b64,
+        },
+    }
+
+
+def _gemini_part(img: PreparedImage) -> dict:
+    # google-genai serializes bytes itself; no base64 copy held here
+    return {"inline_data": {"mime_type": img.media_type, "data": img.data}}
+
+
+def claude_image_block(path: str | Path, **kwargs) -> dict:
+    """Anthropic messages content block for a prepared photo."""
+    return _claude_block(prepare_image(path, **kwargs))
+
+
+def gemini_image_part(path: str | Path, **kwargs) -> dict:
+    """google-genai inline Part for a prepared photo (no Files API upload)."""
+    return _gemini_part(prepare_image(path, **kwargs))
+
+
+def claude_image_blocks(photo_paths: list, budget_bytes: int = None) -> list[dict]:
+    """Anthropic content blocks for a request's photos, within the payload budget."""
+    return [_claude_block(img) for img in prepare_images(photo_paths, budget_bytes)]
+
+
+def gemini_image_parts(photo_paths: list, budget_bytes: int = None) -> list[dict]:
+    """google-genai inline Parts for a request's photos, within the payload budget."""
+    return [_gemini_part(img) for img in prepare_images(photo_paths, budget_bytes)]
+
+
+def claude_sheet_block(photo_paths: list, budget_bytes: int = None) -> dict:
+    """Anthropic content block for a contact sheet of photo_paths."""
+    return _claude_block(prepare_contact_sheet(photo_paths, budget_bytes))
+
+
+def gemini_sheet_part(photo_paths: list, budget_bytes: int = None) -> dict:
+    """google-genai inline Part for a contact sheet of photo_paths."""
+    return _gemini_part(prepare_contact_sheet(photo_paths, budget_bytes))
+
+
+def cache_stats() -> dict:
+    """Counts of prepared/cached photos and bytes saved so far in this process."""
+    with _cache_lock:
+        stats = dict(_stats)
+    stats['bytes_saved'] = stats['original_bytes'] - stats['prepared_bytes']
+    stats['memory_cache_bytes'] = _memory_cache_bytes
+    return stats
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage: python image_prep.py <photo> [<photo> ...]")
+        sys.exit(1)
+
+    for arg in sys.argv[1:]:
+        try:
+            img = prepare_image(arg)
+        except ImagePrepError as e:
+            print(f"{arg}: ERROR {e}")
+            continue
+        print(f"{Path(arg).name}: {img.original_bytes / 1024:.0f} KB -> "
+              f"{len(img.data) / 1024:.0f} KB ({img.width}x{img.height}, {img.media_type})")
@@ -12,8 +12,6 @@ Diana's actuals (ground truth):
 """
 
 import base64
-import json
-import os
 import sys
 import time
 from pathlib import Path
@@ -24,6 +22,7 @@ load_dotenv(Path(__file__).parent / '.env')
 
 sys.path.insert(0, str(Path(__file__).parent))
 from estimate import _load_baselines, _get_baseline, _sample_photos, PHOTO_PROMPT
+from providers import call, get_client, parse_json, response_text
 
 # Diana's actual per-room TAGs (ground truth)
 DIANA_ACTUALS = {
@@ -72,21 +71,10 @@ def build_prompt(room_name, room_category, density):
     )
 
 
-def parse_json_response(text):
-    """Parse JSON from model response, stripping markdown fences."""
-    text = text.strip()
-    if text.startswith("```"):
-        lines = text.split("\n")
-        lines = [l for l in lines if not l.strip().startswith("```")]
-        text = "\n".join(lines).strip()
-    return json.loads(text)
-
-
 # ── Gemini Flash ──────────────────────────────────────────────
 
 def run_gemini(room_name, photo_paths, prompt):
-    from google import genai
-    client = genai.Client(api_key=os.environ['GOOGLE_API_KEY'])
+    client = get_client("gemini")
 
     uploaded = []
     try:
@@ -94,12 +82,13 @@ def run_gemini(room_name, photo_paths, prompt):
             f = client.files.upload(file=str(p))
             uploaded.append(f)
 
-        response = client.models.generate_content(
+        response = call(
+            "gemini", "comparison", client.models.generate_content,
             model="gemini-2.5-flash",
             contents=uploaded + [prompt],
             config={"response_mime_type": "application/json", "temperature": 0.1},
         )
-        result = parse_json_response(response.text)
+        result = parse_json(response_text(response))
         items = result.get('tag_items', [])
         return {
             'tag_items': items,
@@ -117,8 +106,7 @@ def run_gemini(room_name, photo_paths, prompt):
 # ── Claude Sonnet ──────────────────────────────────────────────
 
 def run_claude(room_name, photo_paths, prompt):
-    import anthropic
-    client = anthropic.Anthropic(api_key=os.environ['ANTHROPIC_API_KEY'])
+    client = get_client("claude")
 
     images = load_photos_base64(photo_paths)
 
@@ -135,13 +123,13 @@ def run_claude(room_name, photo_paths, prompt):
         })
     content.append({"type": "text", "text": prompt})
 
-    response = client.messages.create(
+    response = call(
+        "claude", "comparison", client.messages.create,
         model="claude-sonnet-4-5-20250929",
         max_tokens=2000,
         messages=[{"role": "user", "content": content}],
     )
-    text = response.content[0].text
-    result = parse_json_response(text)
+    result = parse_json(response_text(response))
     items = result.get('tag_items', [])
     return {
         'tag_items': items,
@@ -153,8 +141,7 @@ def run_claude(room_name, photo_paths, prompt):
 # ── GPT-4o ──────────────────────────────────────────────────
 
 def run_gpt4o(room_name, photo_paths, prompt):
-    from openai import OpenAI
-    client = OpenAI(api_key=os.environ['OPENAI_API_KEY'])
+    client = get_client("openai")
 
     images = load_photos_base64(photo_paths)
 
@@ -170,14 +157,14 @@ def run_gpt4o(room_name, photo_paths, prompt):
         })
     content.append({"type": "text", "text": prompt})
 
-    response = client.chat.completions.create(
+    response = call(
+        "openai", "comparison", client.chat.completions.create,
         model="gpt-4o",
         messages=[{"role": "user", "content": content}],
         max_tokens=2000,
         temperature=0.1,
     )
-    text = response.choices[0].message.content
-    result = parse_json_response(text)
+    result = parse_json(response_text(response))
     items = result.get('tag_items', [])
     return {
         'tag_items': items,
@@ -0,0 +1,243 @@
+"""
+Model Router — fast vs pro Gemini model per video / photo group
+
+With gemini_model="auto", short videos and small photo groups go to the
+fast model first; long videos and big rooms go straight to pro. A fast
+result is escalated to pro when it fails validation (no/unparseable
+result) or disagrees with the room_scope_lookup.json baselines (counts
+far outside the light..very_heavy range for the room's category).
+
+One ModelRouter is kept per claim; it logs every routing decision and
+estimates the latency saved versus running everything on pro.
+
+Routing is opt-in (--gemini-model auto); the pipelines default to a fixed
+model. Escalating a video runs analyze_video again on pro, which uploads
+the whole file a second time, so long videos are sent straight to pro.
+
+Usage:
+    from model_router import ModelRouter, AUTO_MODEL
+
+    router = ModelRouter()
+    visual = router.run("video", video_path.name, router.video_model(video_path),
+                        lambda model: analyze_video(video_path, model=model),
+                        router.check_video)
+    router.print_summary()
+
+Settings (environment):
+    GEMINI_FAST_MODEL=gemini-2.5-flash   GEMINI_PRO_MODEL=gemini-2.5-pro
+    ROUTER_FAST_VIDEO_MINUTES=6          ROUTER_FAST_MAX_PHOTOS=6
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import reference_data
+
+AUTO_MODEL = "auto"
+FAST_MODEL = os.environ.get("GEMINI_FAST_MODEL", "gemini-2.5-flash")
+PRO_MODEL = os.environ.get("GEMINI_PRO_MODEL", "gemini-2.5-pro")
+
+ROUTER_FAST_VIDEO_MINUTES = float(os.environ.get("ROUTER_FAST_VIDEO_MINUTES", 6))
+ROUTER_FAST_VIDEO_MB = 150          # size fallback when ffprobe is unavailable
+ROUTER_FAST_MAX_PHOTOS = int(os.environ.get("ROUTER_FAST_MAX_PHOTOS", 6))
+
+# A count disagrees with the baseline if above very_heavy * this (+ slack),
+# or zero where even the light tier expects something
+BASELINE_CEILING_FACTOR = 1.5
+BASELINE_SLACK = 2
+VIDEO_DISAGREE_FRACTION = 0.25      # escalate a video if this share of rooms disagree
+
+# Pro latency relative to fast, used until pro calls have been observed
+DEFAULT_PRO_SLOWDOWN = 2.5
+
+
+@dataclass
+class RouteDecision:
+    """How one video / photo group was routed."""
+    kind: str               # "video" or "photos"
+    item: str               # video file or room name
+    model: str              # model whose result was used
+    escalated: bool = False
+    reason: str = ""        # why fast was skipped or escalated
+    fast_seconds: float = 0.0
+    pro_seconds: float = 0.0
+
+
+def _baseline_issue(category: str, tags, boxes, lookup: dict) -> str | None:
+    """Why counts disagree with the lookup baselines for the category, or None."""
+    if not isinstance(tags, (int, float)) or not isinstance(boxes, (int, float)):
+        return "non-numeric counts"
+    tiers = lookup.get(category, lookup.get('other', {}))
+    tag_tiers = tiers.get('typical_tags', {})
+    box_tiers = tiers.get('typical_boxes', {})
+    max_tags = tag_tiers.get('very_heavy', 0) * BASELINE_CEILING_FACTOR + BASELINE_SLACK
+    max_boxes = box_tiers.get('very_heavy', 0) * BASELINE_CEILING_FACTOR + BASELINE_SLACK
+    if tags < 0 or boxes < 0:
+        return "negative counts"
+    if tags > max_tags or boxes > max_boxes:
+        return f"{tags} TAGs/{boxes} boxes above {category} very_heavy range"
+    if tags == 0 and boxes == 0 and (tag_tiers.get('light', 0) or box_tiers.get('light', 0)):
+        return f"empty where light {category} expects contents"
+    return None
+
+
+class ModelRouter:
+    """Routes calls between a fast and a pro model and logs the decisions."""
+
+    def __init__(self, fast_model: str = FAST_MODEL, pro_model: str = PRO_MODEL):
+        self.fast_model = fast_model
+        self.pro_model = pro_model
+        self.decisions: list[RouteDecision] = []
+        self._latency = {}   # (kind, model) -> [total seconds, calls]
+        self._lock = threading.Lock()
+        self._lookup = reference_data.room_lookup()
+
+    # ── Routing ───────────────────────────────────────────────
+
+    def video_model(self, video_path) -> tuple[str, str]:
+        """(first model, reason) for a walkthrough video: short -> fast."""
+        video_path = Path(video_path)
+        try:
+            from audio_extractor import get_duration
+            minutes = get_duration(video_path) / 60
+            if minutes <= ROUTER_FAST_VIDEO_MINUTES:
+                return self.fast_model, f"{minutes:.1f} min video"
+            return self.pro_model, f"{minutes:.1f} min video (> {ROUTER_FAST_VIDEO_MINUTES:g})"
+        except Exception:
+            mb = video_path.stat().st_size / (1024 * 1024) if video_path.exists() else 0
+            if mb <= ROUTER_FAST_VIDEO_MB:
+                return self.fast_model, f"{mb:.0f} MB video"
+            return self.pro_model, f"{mb:.0f} MB video (> {ROUTER_FAST_VIDEO_MB})"
+
+    def photo_model(self, room_name: str, photo_paths: list) -> tuple[str, str]:
+        """(first model, reason) for a room's photo group: few photos -> fast."""
+        if len(photo_paths) <= ROUTER_FAST_MAX_PHOTOS:
+            return self.fast_model, f"{len(photo_paths)} photos"
+        return self.pro_model, f"{len(photo_paths)} photos (> {ROUTER_FAST_MAX_PHOTOS})"
+
+    # ── Validation ────────────────────────────────────────────
+
+    def check_photos(self, room_name: str, analysis) -> str | None:
+        """Reason to escalate a photo analysis, or None if it looks sane."""
+        if not isinstance(analysis, dict):
+            return "no result"
+        from build_visual_training import classify_room
+        return _baseline_issue(classify_room(room_name), analysis.get("estimated_tags"),
+                               analysis.get("estimated_boxes"), self._lookup)
+
+    def check_video(self, visual) -> str | None:
+        """Reason to escalate a video analysis (VideoAnalysisResult), or None."""
+        if not visual.ok:
+            return f"failed: {visual.error[:80]}" if visual.error else "no rooms"
+        issues = [
+            f"{room.get('room_name', '?')}: {issue}"
+            for room in visual.rooms
+            if (issue := _baseline_issue(room.get("room_category", "other"),
+                                         room.get("estimated_tags"),
+                                         room.get("estimated_boxes"), self._lookup))
+        ]
+        if len(issues) > max(1, len(visual.rooms) * VIDEO_DISAGREE_FRACTION):
+            return f"{len(issues)}/{len(visual.rooms)} rooms off baseline ({issues[0]})"
+        return None
+
+    # ── Execution ─────────────────────────────────────────────
+
+    def _timed(self, kind: str, model: str, call):
+        t0 = time.time()
+        try:
+            return call(model), time.time() - t0
+        finally:
+            with self._lock:
+                total = self._latency.setdefault((kind, model), [0.0, 0])
+                total[0] += time.time() - t0
+                total[1] += 1
+
+    def run(self, kind: str, item: str, first: tuple[str, str], call, check, usable=None,
+            first_result: tuple = None):
+        """
+        Run call(model) on the routed model, escalating a failed fast result.
+
+        Args:
+            kind: "video" or "photos" (latency is tracked per kind)
+            item: Label for the log (video file, room name)
+            first: (model, reason) from video_model()/photo_model()
+            call: fn(model) -> result
+            check: fn(result) -> escalation reason or None
+            usable: fn(result) -> bool; if pro's result isn't usable the fast
+                    one is kept (default: check(result) is None)
+            first_result: (result, seconds) if the first model already ran
+                          (e.g. as part of a batched request)
+        """
+        model, reason = first
+        if first_result is not None:
+            result, seconds = first_result
+        else:
+            result, seconds = self._timed(kind, model, call)
+        if model != self.fast_model:
+            self._log(RouteDecision(kind, item, model, reason=reason, pro_seconds=seconds))
+            return result
+
+        issue = check(result)
+        if issue is None:
+            self._log(RouteDecision(kind, item, model, reason=reason, fast_seconds=seconds))
+            return result
+
+        print(f"    Router: escalating {kind} '{item}' to {self.pro_model} ({issue})")
+        pro_result, pro_seconds = self._timed(kind, self.pro_model, call)
+        usable = usable or (lambda r: check(r) is None)
+        keep_pro = usable(pro_result) or not usable(result)
+        self._log(RouteDecision(kind, item, self.pro_model if keep_pro else model, escalated=True,
+                                reason=issue, fast_seconds=seconds, pro_seconds=pro_seconds))
+        return pro_result if keep_pro else result
+
+    def _log(self, decision: RouteDecision):
+        with self._lock:
+            self.decisions.append(decision)
+
+    # ── Reporting ─────────────────────────────────────────────
+
+    def _mean(self, kind: str, model: str) -> float | None:
+        total, calls = self._latency.get((kind, model), (0.0, 0))
+        return total / calls if calls else None
+
+    def seconds_saved(self) -> float:
+        """Estimated model latency saved vs sending everything to pro.
+
+        Fast-only calls save (pro latency - fast latency); escalated calls
+        lose their fast attempt. Pro latency is the mean observed for the
+        same kind of call, or DEFAULT_PRO_SLOWDOWN x fast if none ran.
+        """
+        saved = 0.0
+        with self._lock:
+            for d in self.decisions:
+                if d.escalated:
+                    saved -= d.fast_seconds
+                elif d.model == self.fast_model:
+                    pro = self._mean(d.kind, self.pro_model)
+                    saved += (pro if pro is not None else d.fast_seconds * DEFAULT_PRO_SLOWDOWN) - d.fast_seconds
+        return saved
+
+    def summary(self) -> dict:
+        with self._lock:
+            decisions = list(self.decisions)
+        return {
+            'calls': len(decisions),
+            'fast': sum(1 for d in decisions if d.model == self.fast_model),
+            'pro_direct': sum(1 for d in decisions if d.model == self.pro_model and not d.escalated),
+            'escalated': sum(1 for d in decisions if d.escalated),
+            'seconds_saved': round(self.seconds_saved(), 1),
+        }
+
+    def print_summary(self):
+        if not self.decisions:
+            return
+        s = self.summary()
+        print(f"  Model routing ({self.fast_model} / {self.pro_model}): {s['fast']} fast, "
+              f"{s['pro_direct']} pro, {s['escalated']} escalated -- "
+              f"~{s['seconds_saved']:.0f}s model time saved vs all-pro (est.)")
+        for d in self.decisions:
+            route = f"{self.fast_model} -> {self.pro_model}" if d.escalated else d.model
+            print(f"    {d.kind:<6} {d.item[:32]:<32} {route:<36} {d.reason}")
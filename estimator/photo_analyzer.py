@@ -12,7 +12,6 @@ Designed for the Claude API. Includes prompt templates for structured output.
 """
 
 import json
-import base64
 from pathlib import Path
 from dataclasses import dataclass, field
 from typing import Optional
@@ -280,26 +279,12 @@ class PhotoAnalyzer:
 
     @staticmethod
     def encode_image_for_api(image_path: str) -> dict:
-        """Encode an image file for the Claude API messages format."""
-        path = Path(image_path)
-        suffix = path.suffix.lower()
-        media_types = {
-            '.jpg': 'image/jpeg', '.jpeg': 'image/jpeg',
-            '.png': 'image/png', '.gif': 'image/gif', '.webp': 'image/webp',
-        }
-        media_type = media_types.get(suffix, 'image/jpeg')
-
-        with open(path, 'rb') as f:
-            data = base64.b64encode(f.read()).decode('utf-8')
-
-        return {
-            "type": "image",
-            "source": {
-                "type": "base64",
-                "media_type": media_type,
-                "data": data,
-            }
-        }
+        """Encode an image file for the Claude API messages format.
+
+        Downscaled and re-encoded as JPEG via image_prep (HEIC supported).
+        """
+        from image_prep import claude_image_block
+        return claude_image_block(image_path)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,152 @@
+"""
+Profiling — cProfile / tracemalloc for estimator runs (--profile)
+
+Wraps a run in cProfile and, optionally, tracemalloc. Pipelines call
+stage("name") at each step; with no profiler active that's a no-op.
+The reports are saved next to the estimate CSV:
+
+    estimate_5phase_<customer>_profile.txt   stage wall times, then pstats
+                                             sorted by cumulative and own time
+    estimate_5phase_<customer>.prof          raw stats (snakeviz, pstats)
+    estimate_5phase_<customer>_memory.txt    peak traced memory per stage and
+                                             the largest allocation sites
+
+cProfile sees the thread that started the run. Provider calls run on
+worker threads, so their network time shows up as the caller's wait
+(e.g. call_guard.guarded_call, Future.result) next to local hot spots
+such as the pricing CSV load.
+
+Usage:
+    from profiling import run_profiled, stage
+
+    est = run_profiled(lambda: build(args), memory=args.profile_memory,
+                       output_for=lambda est: est.get('csv_path'))
+"""
+
+import cProfile
+import io
+import pstats
+import time
+import tracemalloc
+from pathlib import Path
+
+PROFILE_TOP = 40            # functions listed per sort order
+MEMORY_TOP = 15             # allocation sites listed
+TRACEMALLOC_FRAMES = 1
+
+_active = None  # RunProfiler while a profiled run is in progress
+
+
+def stage(name: str):
+    """Start a new stage of the profiled run (no-op when not profiling)."""
+    if _active is not None:
+        _active.mark(name)
+
+
+class RunProfiler:
+    """cProfile (+ optional tracemalloc) over one run, split into stages."""
+
+    def __init__(self, memory: bool = False):
+        self.memory = memory
+        self.profile = cProfile.Profile()
+        self.stages = []        # (name, seconds, peak bytes, current bytes)
+        self.snapshot = None
+        self._stage = None
+        self._stage_start = 0.0
+
+    def __enter__(self):
+        global _active
+        _active = self
+        if self.memory:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        self.mark("startup")
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        global _active
+        self.profile.disable()
+        self._close_stage()
+        if self.memory:
+            self.snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+        _active = None
+        return False
+
+    def mark(self, name: str):
+        self._close_stage()
+        self._stage = name
+        self._stage_start = time.perf_counter()
+        if self.memory:
+            tracemalloc.reset_peak()
+
+    def _close_stage(self):
+        if self._stage is None:
+            return
+        current, peak = tracemalloc.get_traced_memory() if self.memory else (0, 0)
+        self.stages.append((self._stage, time.perf_counter() - self._stage_start, peak, current))
+        self._stage = None
+
+    # ── Reports ───────────────────────────────────────────────
+
+    def profile_report(self) -> str:
+        out = io.StringIO()
+        total = sum(s[1] for s in self.stages)
+        out.write("Stages (wall time)\n")
+        for name, seconds, _, _ in self.stages:
+            out.write(f"  {name:<28} {seconds:>8.2f}s  {seconds / total if total else 0:>5.0%}\n")
+        out.write(f"  {'TOTAL':<28} {total:>8.2f}s\n\n")
+        for sort in ("cumulative", "tottime"):
+            out.write(f"Top {PROFILE_TOP} by {sort}\n")
+            stats = pstats.Stats(self.profile, stream=out)
+            stats.strip_dirs().sort_stats(sort).print_stats(PROFILE_TOP)
+        return out.getvalue()
+
+    def memory_report(self) -> str:
+        out = io.StringIO()
+        out.write("Peak traced memory per stage\n")
+        for name, _, peak, current in self.stages:
+            out.write(f"  {name:<28} peak {peak / 1e6:>8.1f} MB   held after {current / 1e6:>8.1f} MB\n")
+        if self.snapshot is not None:
+            out.write(f"\nLargest allocation sites still held at end of run (top {MEMORY_TOP})\n")
+            for stat in self.snapshot.statistics("lineno")[:MEMORY_TOP]:
+                out.write(f"  {stat.size / 1e6:>8.2f} MB  {stat.count:>8} blocks  {stat.traceback}\n")
+        return out.getvalue()
+
+    def save(self, near) -> list[Path]:
+        """Write the reports next to near (the estimate CSV, or a directory)."""
+        near = Path(near)
+        base = near.parent / near.stem if near.suffix else near / "run"
+        base.parent.mkdir(parents=True, exist_ok=True)
+        paths = [Path(f"{base}_profile.txt"), Path(f"{base}.prof")]
+        paths[0].write_text(self.profile_report())
+        self.profile.dump_stats(str(paths[1]))
+        if self.memory:
+            paths.append(Path(f"{base}_memory.txt"))
+            paths[-1].write_text(self.memory_report())
+        return paths
+
+
+def run_profiled(fn, memory: bool = False, output_for=None, default_dir=None):
+    """
+    Run fn() under a RunProfiler and save the reports.
+
+    Args:
+        fn: The run; its return value is passed through
+        memory: Also trace allocations (slower; per-stage peaks)
+        output_for: fn(result) -> estimate CSV path (or None)
+        default_dir: Where reports go when there is no CSV (failed run)
+    """
+    profiler = RunProfiler(memory=memory)
+    result = None
+    try:
+        with profiler:
+            result = fn()
+    finally:
+        near = (output_for(result) if output_for and result is not None else None) \
+            or default_dir or Path(__file__).parent / 'output'
+        paths = profiler.save(near)
+        print(f"\nProfile saved: {', '.join(str(p) for p in paths)}")
+        slowest = sorted(profiler.stages, key=lambda s: -s[1])[:3]
+        print("  Slowest stages: " + ", ".join(f"{name} {seconds:.1f}s" for name, seconds, _, _ in slowest))
+    return result
@@ -0,0 +1,226 @@
+"""
+Provider-side prompt caching for the static calibration prompts.
+
+The photo and video calibration prompts are thousands of characters of
+fixed text sent with every call. With PROMPT_CACHE=1, requests put that
+text first as a system instruction so the provider can cache the prefix:
+
+  Claude:  system block with cache_control (ephemeral, ~5 min TTL,
+           refreshed on every hit)
+  Gemini:  explicit context cache (client.caches.create) holding the
+           system instruction, reused by name until its TTL runs out.
+           If the model/SDK rejects it (e.g. prompt below the minimum
+           cacheable size), the text is sent as system_instruction so
+           Gemini's implicit prefix caching can still apply.
+
+PROMPT_CACHE is off by default: callers then send the calibration text
+inline in the user turn, as before, and gemini_config() leaves the config
+alone. Moving it into the system instruction hasn't been checked against
+the backtest claims yet. Compare run_encircle_backtest.py runs with
+PROMPT_CACHE=0 and PROMPT_CACHE=1 before turning it on.
+
+A failed client.caches.create is remembered for GEMINI_CACHE_RETRY_SECONDS
+when it looks transient (429/5xx/connection error). A rejection, such as a
+prompt below the minimum cacheable size, is remembered for the cache TTL.
+
+Every response's usage is recorded so hit rates, cached tokens and
+latency on hits vs misses can be checked with cache_stats().
+
+Usage:
+    from prompt_cache import PROMPT_CACHE_ENABLED, claude_system, gemini_generate, record_claude_usage
+
+    if PROMPT_CACHE_ENABLED:
+        response = client.messages.create(model=..., system=claude_system(PROMPT),
+                                          messages=[...room text only...])
+    else:
+        response = client.messages.create(model=..., messages=[...PROMPT + room text...])
+    record_claude_usage("photo", response, seconds)
+
+    # contents end with the room text, or with PROMPT when caching is off
+    response = gemini_generate(client, model, contents, PROMPT, {"temperature": 0.1}, "photo")
+"""
+
+import hashlib
+import os
+import threading
+import time
+
+GEMINI_CACHE_TTL_SECONDS = int(os.environ.get("GEMINI_CACHE_TTL_SECONDS", 3600))
+GEMINI_CACHE_RETRY_SECONDS = int(os.environ.get("GEMINI_CACHE_RETRY_SECONDS", 60))
+PROMPT_CACHE_ENABLED = os.environ.get("PROMPT_CACHE", "0") == "1"
+
+_lock = threading.Lock()
+_create_lock = threading.Lock()  # one cache creation at a time; concurrent callers reuse it
+_gemini_caches = {}   # (model, prompt sha) -> (cache name, expires_at) or (None, retry_at)
+_stats = {}           # (provider, prompt name) -> counters
+
+
+def _prompt_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+# ── Request building ─────────────────────────────────────────
+
+def claude_system(static_text: str) -> list[dict]:
+    """System blocks for messages.create with the static prompt marked cacheable."""
+    block = {"type": "text", "text": static_text}
+    if PROMPT_CACHE_ENABLED:
+        block["cache_control"] = {"type": "ephemeral"}
+    return [block]
+
+
+def _gemini_cache_name(client, model: str, static_text: str) -> str | None:
+    """Name of a live explicit cache for this prompt, creating one if needed."""
+    key = (model, _prompt_key(static_text))
+    now = time.time()
+    with _create_lock:
+        name, until = _gemini_caches.get(key, (None, 0))
+        if until > now:
+            return name  # live cache, or a recent failure (None) not worth retrying yet
+
+        try:
+            cache = client.caches.create(
+                model=model,
+                config={
+                    "system_instruction": static_text,
+                    "ttl": f"{GEMINI_CACHE_TTL_SECONDS}s",
+                    "display_name": f"estimator-{key[1]}",
+                },
+            )
+            name = cache.name
+            # Stop using it a minute early so a request never races expiry
+            _gemini_caches[key] = (name, now + GEMINI_CACHE_TTL_SECONDS - 60)
+            print(f"  Gemini context cache created: {name} ({model})")
+            return name
+        except Exception as e:
+            from providers import _is_retryable
+
+            # A transient failure is retried soon; a rejection won't change within the TTL
+            retry_in = GEMINI_CACHE_RETRY_SECONDS if _is_retryable(e) else GEMINI_CACHE_TTL_SECONDS
+            _gemini_caches[key] = (None, now + retry_in)
+            print(f"  Gemini context cache unavailable ({type(e).__name__}) -- "
+                  f"using system_instruction (implicit caching), retrying in {retry_in}s")
+            return None
+
+
+def gemini_config(client, model: str, static_text: str, base_config: dict = None) -> dict:
+    """generate_content config carrying the static prompt via cache or system_instruction
+    (unchanged with PROMPT_CACHE off: the caller sends the prompt inline)."""
+    config = dict(base_config or {})
+    if not PROMPT_CACHE_ENABLED:
+        return config
+    name = _gemini_cache_name(client, model, static_text)
+    if name:
+        config["cached_content"] = name
+    else:
+        config["system_instruction"] = static_text
+    return config
+
+
+def invalidate_gemini_cache(model: str, static_text: str):
+    """Forget a cache the API reported as missing/expired; the next call recreates it."""
+    with _create_lock:
+        _gemini_caches.pop((model, _prompt_key(static_text)), None)
+
+
+def gemini_generate(client, model: str, contents: list, static_text: str,
+                    base_config: dict = None, prompt_name: str = "prompt"):
+    """generate_content with the static prompt cached, recording cache usage.
+
+    If the named cache was deleted/expired server-side, it is dropped and the
+    call is retried once with the prompt sent inline. The call itself goes
+    through providers.call (concurrency limit, retries, call_guard).
+    """
+    from call_guard import ProviderUnavailable
+    from providers import call
+
+    config = gemini_config(client, model, static_text, base_config)
+    t0 = time.time()
+    try:
+        response = call("gemini", prompt_name, client.models.generate_content,
+                        model=model, contents=contents, config=config)
+    except Exception as e:
+        if (isinstance(e, ProviderUnavailable) or "cached_content" not in config
+                or "cache" not in str(e).lower()):
+            raise
+        invalidate_gemini_cache(model, static_text)
+        config = dict(base_config or {})
+        config["system_instruction"] = static_text
+        response = call("gemini", prompt_name, client.models.generate_content,
+                        model=model, contents=contents, config=config)
+    record_gemini_usage(prompt_name, response, time.time() - t0)
+    return response
+
+
+# ── Stats ────────────────────────────────────────────────────
+
+def _record(provider: str, prompt_name: str, input_tokens: int, cached_tokens: int,
+            cache_write_tokens: int, seconds: float):
+    with _lock:
+        s = _stats.setdefault((provider, prompt_name), {
+            'calls': 0, 'hits': 0, 'input_tokens': 0, 'cached_tokens': 0,
+            'cache_write_tokens': 0, 'hit_seconds': 0.0, 'miss_seconds': 0.0,
+        })
+        s['calls'] += 1
+        s['input_tokens'] += input_tokens
+        s['cached_tokens'] += cached_tokens
+        s['cache_write_tokens'] += cache_write_tokens
+        if cached_tokens:
+            s['hits'] += 1
+            s['hit_seconds'] += seconds
+        else:
+            s['miss_seconds'] += seconds
+
+
+def record_claude_usage(prompt_name: str, response, seconds: float = 0.0):
+    """Record an Anthropic response's cache usage (cache reads count as hits)."""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    cached = getattr(usage, "cache_read_input_tokens", 0) or 0
+    written = getattr(usage, "cache_creation_input_tokens", 0) or 0
+    uncached = getattr(usage, "input_tokens", 0) or 0
+    _record("claude", prompt_name, uncached + cached + written, cached, written, seconds)
+
+
+def record_gemini_usage(prompt_name: str, response, seconds: float = 0.0):
+    """Record a Gemini response's cached token count (explicit or implicit cache)."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    cached = getattr(usage, "cached_content_token_count", 0) or 0
+    total = getattr(usage, "prompt_token_count", 0) or 0
+    _record("gemini", prompt_name, total, cached, 0, seconds)
+
+
+def cache_stats() -> dict:
+    """{'provider/prompt': {calls, hits, hit_rate, cached_tokens, ..., avg_hit_s, avg_miss_s}}"""
+    out = {}
+    with _lock:
+        for (provider, name), s in _stats.items():
+            misses = s['calls'] - s['hits']
+            out[f"{provider}/{name}"] = {
+                **s,
+                'hit_rate': s['hits'] / s['calls'] if s['calls'] else 0.0,
+                'cached_fraction': s['cached_tokens'] / s['input_tokens'] if s['input_tokens'] else 0.0,
+                'avg_hit_seconds': s['hit_seconds'] / s['hits'] if s['hits'] else 0.0,
+                'avg_miss_seconds': s['miss_seconds'] / misses if misses else 0.0,
+            }
+    return out
+
+
+def print_cache_stats():
+    """One line per provider/prompt: hit rate, cached token share, hit vs miss latency."""
+    stats = cache_stats()
+    if not stats:
+        return
+    print("  Prompt cache:")
+    for key, s in sorted(stats.items()):
+        print(f"    {key:<22} {s['hits']}/{s['calls']} hits, "
+              f"{s['cached_fraction']:.0%} of input tokens cached, "
+              f"avg {s['avg_hit_seconds']:.1f}s hit / {s['avg_miss_seconds']:.1f}s miss")
+
+
+def reset_stats():
+    with _lock:
+        _stats.clear()
@@ -0,0 +1,323 @@
+"""
+Providers — one client layer for Gemini, Claude and OpenAI
+
+Every analyzer gets its SDK client and sends its requests through here:
+
+  Clients:      one client per provider for the whole process, so HTTP
+                connections (and the SDK's connection pool) are reused
+                across rooms, videos and claims. Fake clients are returned
+                when fake_providers is enabled.
+  Concurrency:  a semaphore per provider caps requests in flight across
+                all pipelines in the process ({PROVIDER}_MAX_CONCURRENCY).
+                Every request actually sent holds a slot until it finishes,
+                including hedges and requests abandoned at their deadline.
+                Per-pipeline limits (PHOTO_MAX_CONCURRENCY, ...) still
+                apply underneath.
+  Retries:      transient API errors (429, 5xx, connection errors) are
+                retried with exponential backoff. The SDKs' own retries are
+                turned off so a request is never retried twice over.
+  Guarding:     each attempt goes through call_guard.guarded_call
+                (deadline, hedging, circuit breaker); guard errors are not
+                retried, and only transient errors count toward the breaker.
+  Parsing:      response_text() / parse_json() replace the per-module
+                markdown-fence stripping.
+  Ledger:       every attempt is appended to call_ledger (tokens, bytes,
+                latency, cache hit, outcome, estimated cost).
+
+Usage:
+    from providers import get_client, call, parse_json, response_text
+
+    client = get_client("claude")        # raises ProviderNotConfigured without a key
+    response = call("claude", "merge", client.messages.create, model=..., messages=...)
+    rooms = parse_json(response_text(response))
+
+Settings (environment):
+    GEMINI_MAX_CONCURRENCY=16  CLAUDE_MAX_CONCURRENCY=8  OPENAI_MAX_CONCURRENCY=8
+    PROVIDER_MAX_RETRIES=2     PROVIDER_RETRY_BACKOFF=2.0
+"""
+
+import json
+import os
+import threading
+import time
+
+API_KEY_ENV = {
+    "gemini": "GOOGLE_API_KEY",
+    "claude": "ANTHROPIC_API_KEY",
+    "openai": "OPENAI_API_KEY",
+}
+
+MAX_CONCURRENCY = {
+    "gemini": int(os.environ.get("GEMINI_MAX_CONCURRENCY", 16)),
+    "claude": int(os.environ.get("CLAUDE_MAX_CONCURRENCY", 8)),
+    "openai": int(os.environ.get("OPENAI_MAX_CONCURRENCY", 8)),
+}
+
+MAX_RETRIES = int(os.environ.get("PROVIDER_MAX_RETRIES", 2))
+RETRY_BACKOFF = float(os.environ.get("PROVIDER_RETRY_BACKOFF", 2.0))  # seconds, doubles each retry
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+
+_lock = threading.Lock()
+_clients = {}      # provider -> real SDK client
+_slots = {}        # provider -> _Slot
+_stats = {}        # provider -> counters
+
+
+class ProviderNotConfigured(RuntimeError):
+    """No API key (or SDK) for a provider."""
+    def __init__(self, provider: str, message: str = None):
+        self.provider = provider
+        super().__init__(message or f"{API_KEY_ENV.get(provider, provider)} not set in environment or .env")
+
+
+# ── Clients ──────────────────────────────────────────────────
+
+def is_configured(provider: str) -> bool:
+    """Whether get_client(provider) can return a client (fake or keyed)."""
+    from fake_providers import is_enabled
+    return is_enabled() or bool(os.environ.get(API_KEY_ENV[provider]))
+
+
+def _create_client(provider: str):
+    api_key = os.environ.get(API_KEY_ENV[provider])
+    if not api_key:
+        raise ProviderNotConfigured(provider)
+    if provider == "gemini":
+        from google import genai
+        return genai.Client(api_key=api_key)
+    if provider == "claude":
+        import anthropic
+        return anthropic.Anthropic(api_key=api_key, max_retries=0)
+    if provider == "openai":
+        import openai
+        return openai.OpenAI(api_key=api_key, max_retries=0)
+    raise ValueError(f"Unknown provider: {provider}")
+
+
+def get_client(provider: str):
+    """The shared client for provider ("gemini", "claude", "openai").
+
+    Fake clients are returned (fresh, they hold no connections) while
+    fake_providers is enabled; otherwise one SDK client is created on first
+    use and reused by every caller.
+
+    Raises:
+        ProviderNotConfigured: the provider's API key is not set
+    """
+    from fake_providers import get_fake_client
+
+    client = get_fake_client(provider)
+    if client is not None:
+        return client
+    with _lock:
+        if provider not in _clients:
+            _clients[provider] = _create_client(provider)
+        return _clients[provider]
+
+
+def api_errors(provider: str) -> tuple:
+    """Exception types the provider's client raises for API failures."""
+    from fake_providers import FakeAPIError
+
+    errors = [FakeAPIError]
+    try:
+        if provider == "gemini":
+            from google.genai import errors as genai_errors
+            errors.append(genai_errors.APIError)
+        elif provider == "claude":
+            import anthropic
+            errors.append(anthropic.APIError)
+        elif provider == "openai":
+            import openai
+            errors.append(openai.APIError)
+    except ImportError:
+        pass
+    return tuple(errors)
+
+
+def _is_retryable(error: Exception) -> bool:
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if not isinstance(status, int):
+        return True  # connection errors / timeouts carry no status
+    return status in RETRYABLE_STATUS
+
+
+# ── Calls ────────────────────────────────────────────────────
+
+def _count(provider: str, key: str, n: float = 1):
+    with _lock:
+        s = _stats.setdefault(provider, {
+            'calls': 0, 'retries': 0, 'in_flight': 0, 'peak_in_flight': 0,
+            'queued': 0, 'queue_seconds': 0.0,
+        })
+        s[key] += n
+        if key == 'in_flight':
+            s['peak_in_flight'] = max(s['peak_in_flight'], s['in_flight'])
+
+
+class _Slot:
+    """A provider's concurrency limit as guarded_call uses it: each running
+    request (hedges and abandoned requests too) holds one until it finishes."""
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        self._sem = threading.BoundedSemaphore(MAX_CONCURRENCY.get(provider, 8))
+
+    def acquire(self, blocking: bool = True) -> bool:
+        if not self._sem.acquire(blocking=False):
+            if not blocking:
+                return False
+            t0 = time.monotonic()
+            _count(self.provider, 'queued')
+            self._sem.acquire()
+            _count(self.provider, 'queue_seconds', time.monotonic() - t0)
+        _count(self.provider, 'in_flight')
+        return True
+
+    def release(self):
+        _count(self.provider, 'in_flight', -1)
+        self._sem.release()
+
+
+def _slot(provider: str) -> _Slot:
+    with _lock:
+        if provider not in _slots:
+            _slots[provider] = _Slot(provider)
+        return _slots[provider]
+
+
+def call(provider: str, name: str, fn, *args, retries: int = None,
+         hedge: bool = True, deadline: float = None, ledger: dict = None, **kwargs):
+    """
+    Call fn(*args, **kwargs) under the provider's concurrency limit,
+    retrying transient API errors.
+
+    Args:
+        provider: "gemini", "claude", "openai"
+        name: Kind of call ("photo", "merge", "transcribe", ...) for the guard
+        fn: The SDK call
+        retries: Retries on transient API errors (default PROVIDER_MAX_RETRIES).
+                 Pass 0 for calls with side effects (streaming callbacks)
+        hedge, deadline: Passed to call_guard.guarded_call
+        ledger: call_ledger.record fields the call kwargs don't show
+                (model, bytes_sent, audio_seconds). By default model is
+                kwargs["model"] and bytes are measured from contents/messages.
+                A tuple result is assumed to end with the final response
+                (streaming helpers), whose usage is recorded.
+
+    Raises:
+        ProviderUnavailable: deadline or open circuit (not retried)
+        Exception: the provider's API error once retries are exhausted
+    """
+    import call_ledger
+    from call_guard import guarded_call, ProviderUnavailable
+
+    meta = {
+        'model': kwargs.get("model", ""),
+        'bytes_sent': call_ledger.payload_bytes(kwargs.get("contents") or kwargs.get("messages")),
+        **(ledger or {}),
+    }
+    retries = MAX_RETRIES if retries is None else retries
+    retryable = api_errors(provider)
+    slot = _slot(provider)
+
+    for attempt in range(retries + 1):
+        slot.acquire()  # released by guarded_call when this request finishes
+        _count(provider, 'calls')
+        sent = time.monotonic()
+        try:
+            result = guarded_call(provider, name, fn, *args, deadline=deadline, hedge=hedge,
+                                  slot=slot, transient=_is_retryable, **kwargs)
+            call_ledger.record(name, provider, latency_s=time.monotonic() - sent,
+                               response=result[-1] if isinstance(result, tuple) else result, **meta)
+            return result
+        except ProviderUnavailable as e:
+            call_ledger.record(name, provider, latency_s=time.monotonic() - sent,
+                               outcome=f"unavailable:{type(e).__name__}", **meta)
+            raise
+        except retryable as e:
+            retry = attempt < retries and _is_retryable(e)
+            call_ledger.record(name, provider, latency_s=time.monotonic() - sent,
+                               outcome=f"{'retried' if retry else 'error'}:{type(e).__name__}", **meta)
+            if not retry:
+                raise
+        except Exception as e:
+            # Not an API error (a bug in fn, a parse error in a streaming helper, ...)
+            call_ledger.record(name, provider, latency_s=time.monotonic() - sent,
+                               outcome=f"error:{type(e).__name__}", **meta)
+            raise
+            wait = RETRY_BACKOFF * (2 ** attempt)
+            print(f"    {provider} {name} call failed, retrying in {wait:.0f}s: {e}")
+            _count(provider, 'retries')
+        time.sleep(wait)  # the failed request's slot is already free while we back off
+
+
+# ── Responses ────────────────────────────────────────────────
+
+def response_text(response) -> str:
+    """Text of a Gemini, Anthropic or OpenAI chat response."""
+    if hasattr(response, "content") and isinstance(response.content, list):
+        return "".join(getattr(block, "text", "") for block in response.content)
+    if hasattr(response, "choices"):
+        return response.choices[0].message.content or ""
+    return response.text or ""
+
+
+def strip_fences(text: str) -> str:
+    """Remove markdown code fences (```json ... ```) around a response."""
+    text = text.strip()
+    if text.startswith("```"):
+        lines = text.split("\n")
+        lines = [l for l in lines if not l.strip().startswith("```")]
+        text = "\n".join(lines).strip()
+    return text
+
+
+def parse_json(text: str, salvage: str = None):
+    """json.loads after stripping markdown fences.
+
+    salvage="[" or "{" retries on the outermost array/object in the text
+    when the response has prose around the JSON.
+
+    Raises:
+        json.JSONDecodeError: not valid JSON (after salvaging, if requested)
+    """
+    text = strip_fences(text)
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        if not salvage:
+            raise
+        close = "]" if salvage == "[" else "}"
+        start, end = text.find(salvage), text.rfind(close)
+        if start < 0 or end <= start:
+            raise
+        return json.loads(text[start:end + 1])
+
+
+# ── Stats ────────────────────────────────────────────────────
+
+def provider_stats() -> dict:
+    """{provider: {calls, retries, peak_in_flight, queued, queue_seconds, limit}}"""
+    with _lock:
+        out = {p: {k: v for k, v in s.items() if k != 'in_flight'} for p, s in _stats.items()}
+    for provider, s in out.items():
+        s['limit'] = MAX_CONCURRENCY.get(provider, 8)
+    return out
+
+
+def print_provider_stats():
+    """One line per provider: calls, retries, peak concurrency vs limit, queueing."""
+    stats = provider_stats()
+    if not stats:
+        return
+    print("  Provider concurrency:")
+    for provider, s in sorted(stats.items()):
+        print(f"    {provider:<8} {s['calls']} calls, {s['retries']} retried, "
+              f"peak {s['peak_in_flight']}/{s['limit']} in flight, "
+              f"{s['queued']} queued ({s['queue_seconds']:.1f}s waiting)")
+
+
+def reset_stats():
+    with _lock:
+        _stats.clear()
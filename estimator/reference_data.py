@@ -0,0 +1,145 @@
+"""
+Reference Data — process-wide registry of loaded reference datasets
+
+Estimate generation needs the pricing table, correction factors, scope
+templates, historical jobs and room baselines. Building those objects
+(pandas read_csv + iterrows, JSON parsing, training-data scans) costs
+far more than pricing one job, so each is loaded once per process and
+shared.
+
+  Sharing:  the objects are read-only after construction (nothing mutates
+            them while estimating), so any number of threads can use the
+            same instance. Don't modify what you get back.
+  Reloads:  every get() compares the source files' mtime/size with what
+            was loaded; a changed file is reloaded on next use. Jobs already
+            holding the old object finish with it.
+  Locking:  one lock per dataset, so a slow load (pricing) doesn't block
+            unrelated lookups and concurrent first calls load only once.
+
+Usage:
+    import reference_data
+
+    engine = reference_data.pricing_engine()
+    lookup = reference_data.room_lookup()     # room_scope_lookup.json room_types
+    reference_data.preload()                  # load the estimate's datasets up front
+"""
+
+import json
+import threading
+from pathlib import Path
+
+DATA_DIR = Path(__file__).parent / 'data'
+
+_lock = threading.Lock()
+_entries = {}      # key -> (file signature, value)
+_key_locks = {}    # key -> Lock
+
+
+def _signature(paths: tuple) -> tuple:
+    sig = []
+    for path in paths:
+        try:
+            st = path.stat()
+            sig.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            sig.append(None)  # missing file: the loader raises as it always did
+    return tuple(sig)
+
+
+def get(key: str, loader, paths=()):
+    """
+    The shared value for key, calling loader() on first use or when any of
+    paths changed on disk since it was loaded.
+    """
+    paths = tuple(Path(p) for p in paths)
+    sig = _signature(paths)
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None and entry[0] == sig:
+            return entry[1]
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+
+    with key_lock:
+        with _lock:
+            entry = _entries.get(key)
+        if entry is not None and entry[0] == sig:
+            return entry[1]  # another thread loaded it while we waited
+        value = loader()
+        with _lock:
+            _entries[key] = (sig, value)
+        if entry is not None:
+            print(f"  Reference data reloaded: {key} ({', '.join(p.name for p in paths)} changed)")
+        return value
+
+
+def clear():
+    """Drop everything; the next get() of each dataset reloads it."""
+    with _lock:
+        _entries.clear()
+
+
+def loaded() -> list[str]:
+    with _lock:
+        return sorted(_entries)
+
+
+def preload():
+    """Load every dataset an estimate uses, e.g. while an upstream call is
+    still running, so the first estimate doesn't wait for them."""
+    for dataset in (photo_analyzer, estimate_adjuster, pricing_engine, scope_checker,
+                    job_similarity, supplement_predictor, crew_optimizer):
+        dataset()
+
+
+# ── Datasets ─────────────────────────────────────────────────
+
+def _load_room_lookup() -> dict:
+    with open(DATA_DIR / 'room_scope_lookup.json') as f:
+        return json.load(f)['room_types']
+
+
+def room_lookup() -> dict:
+    """room_scope_lookup.json room_types: category -> typical tags/boxes/common_tags."""
+    return get("room_lookup", _load_room_lookup, [DATA_DIR / 'room_scope_lookup.json'])
+
+
+def photo_analyzer():
+    from photo_analyzer import PhotoAnalyzer
+    return get("photo_analyzer", PhotoAnalyzer, [DATA_DIR / 'room_scope_lookup.json'])
+
+
+def pricing_engine():
+    from pricing_engine import PricingEngine
+    return get("pricing_engine", PricingEngine, [DATA_DIR / 'pricing_reference.csv'])
+
+
+def estimate_adjuster():
+    from estimate_adjuster import EstimateAdjuster
+    return get("estimate_adjuster", EstimateAdjuster, [DATA_DIR / 'correction_factors.json'])
+
+
+def scope_checker():
+    from scope_checker import ScopeChecker
+    return get("scope_checker", ScopeChecker, [DATA_DIR / 'standard_line_items.json'])
+
+
+def job_similarity():
+    from job_similarity import JobSimilarityEngine
+    return get("job_similarity", JobSimilarityEngine, [DATA_DIR / 'walkthrough_visual_training.json'])
+
+
+def supplement_predictor():
+    from supplement_predictor import SupplementPredictor
+    return get("supplement_predictor", SupplementPredictor,
+               [DATA_DIR / 'estimate_vs_final_comparisons.csv'])
+
+
+def crew_optimizer():
+    from crew_optimizer import CrewOptimizer
+    return get("crew_optimizer", CrewOptimizer, [DATA_DIR / 'walkthrough_visual_training.json'])
+
+
+def labor_rates():
+    """Default-crew LaborRateCalculator (configured in code, never reloaded)."""
+    from labor_rates import DEFAULT_CALCULATOR
+    return DEFAULT_CALCULATOR
@@ -0,0 +1,138 @@
+"""
+Load Test: Run run_encircle_pipeline end-to-end against fake providers.
+
+Every external call (Encircle, Gemini, Claude, Whisper) goes to the
+deterministic stand-ins in fake_providers.py, so this costs nothing and
+runs fully offline. Use it to benchmark throughput and concurrency changes.
+
+Usage:
+    python run_load_test.py --claims 8 --concurrency 4
+    python run_load_test.py --claims 20 --concurrency 10 --latency 2 --jitter 1 --rate-limit-rate 0.05
+    python run_load_test.py --claims 4 --gemini-latency 30 --verbose
+    python run_load_test.py --claims 8 --tail-rate 0.05 --tail-latency 60   # hedging
+"""
+
+import argparse
+import contextlib
+import io
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import fake_providers
+from prompt_cache import print_cache_stats
+from call_guard import print_call_stats
+from providers import print_provider_stats
+
+
+def _run_claim(index: int, output_base: Path, args) -> dict:
+    from encircle_pipeline import run_encircle_pipeline
+
+    t0 = time.time()
+    try:
+        result = run_encircle_pipeline(
+            claim_name=f"Load Test {index:03d}",
+            output_base=output_base,
+            skip_whisper=args.skip_whisper,
+            gemini_only=args.gemini_only,
+        )
+    except Exception as e:
+        return {'index': index, 'seconds': time.time() - t0, 'ok': False,
+                'total_rcv': 0.0, 'error': f"{type(e).__name__}: {e}"}
+    return {
+        'index': index,
+        'seconds': time.time() - t0,
+        'ok': result.ok and result.total_rcv > 0,
+        'total_rcv': result.total_rcv,
+        'error': result.error,
+    }
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline load test for the Encircle pipeline')
+    parser.add_argument('--claims', type=int, default=8, help='Number of claims to run')
+    parser.add_argument('--concurrency', type=int, default=4, help='Claims run in parallel')
+    parser.add_argument('--latency', type=float, default=0.5, help='Mean fake call latency (s)')
+    parser.add_argument('--jitter', type=float, default=0.1, help='Uniform +/- jitter (s)')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='Fraction of calls failing (500)')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Fraction of calls returning 429')
+    parser.add_argument('--tail-rate', type=float, default=0.0, help='Fraction of calls that hang')
+    parser.add_argument('--tail-latency', type=float, default=60.0, help='How long a hanging call takes (s)')
+    parser.add_argument('--seed', type=int, default=42)
+    for provider in ('gemini', 'claude', 'openai', 'encircle'):
+        parser.add_argument(f'--{provider}-latency', type=float, default=None,
+                            help=f'Override mean latency for {provider}')
+    parser.add_argument('--skip-whisper', action='store_true', help='Skip Whisper transcription')
+    parser.add_argument('--gemini-only', action='store_true', help='Gemini only (no Whisper/Claude)')
+    parser.add_argument('--verbose', action='store_true', help='Show pipeline output')
+    args = parser.parse_args()
+
+    provider_latency = {
+        p: getattr(args, f'{p}_latency')
+        for p in ('gemini', 'claude', 'openai', 'encircle')
+        if getattr(args, f'{p}_latency') is not None
+    }
+    fake_providers.enable(
+        latency=args.latency,
+        jitter=args.jitter,
+        failure_rate=args.failure_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        tail_rate=args.tail_rate,
+        tail_latency=args.tail_latency,
+        seed=args.seed,
+        provider_latency=provider_latency,
+    )
+
+    print(f"Load test: {args.claims} claims, concurrency {args.concurrency}, "
+          f"latency {args.latency}s +/- {args.jitter}s, "
+          f"fail {args.failure_rate:.0%}, 429 {args.rate_limit_rate:.0%}")
+
+    with tempfile.TemporaryDirectory(prefix='estimator_load_') as tmp:
+        output_base = Path(tmp)
+        sink = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        wall_start = time.time()
+        with sink:
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                runs = list(pool.map(lambda i: _run_claim(i, output_base, args),
+                                     range(args.claims)))
+        wall = time.time() - wall_start
+
+    durations = [r['seconds'] for r in runs]
+    ok = [r for r in runs if r['ok']]
+    failed = [r for r in runs if not r['ok']]
+
+    print(f"\n{'='*57}")
+    print(f"LOAD TEST RESULTS")
+    print(f"{'='*57}")
+    print(f"  Wall time:     {wall:.1f}s")
+    print(f"  Throughput:    {len(runs) / wall * 60:.1f} claims/min")
+    print(f"  Succeeded:     {len(ok)}/{len(runs)}")
+    print(f"  Claim latency: p50 {_percentile(durations, 50):.1f}s, "
+          f"p95 {_percentile(durations, 95):.1f}s, max {max(durations, default=0):.1f}s")
+    if ok:
+        print(f"  RCV (mean):    ${statistics.mean(r['total_rcv'] for r in ok):,.2f}")
+    print(f"  Provider calls: {fake_providers.call_counts()}")
+    print_cache_stats()
+    print_call_stats()
+    print_provider_stats()
+    for r in failed:
+        print(f"  FAILED claim {r['index']:03d}: {r['error'] or 'no estimate'}")
+
+    sys.exit(0 if not failed else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -10,7 +10,6 @@ drawers, cabinets, closets. So:
 """
 
 import json
-import os
 import sys
 from pathlib import Path
 
@@ -26,7 +25,7 @@ from estimate import (
 )
 from build_visual_training import classify_room
 from generate_estimate import analyze_from_rooms_json, generate_5phase_estimate
-import anthropic
+from providers import ProviderNotConfigured, get_client
 
 PHOTOS_DIR = Path(__file__).parent / 'output' / 'Love_Toni' / 'photos'
 OUTPUT_DIR = Path(__file__).parent / 'output'
@@ -100,12 +99,11 @@ def infer_closets(rooms):
 
 
 def main():
-    api_key = os.environ.get("ANTHROPIC_API_KEY")
-    if not api_key:
-        print("ANTHROPIC_API_KEY not set")
+    try:
+        client = get_client("claude")
+    except ProviderNotConfigured as e:
+        print(e)
         sys.exit(1)
-
-    client = anthropic.Anthropic(api_key=api_key)
     photos_by_room = load_photos_from_folder(PHOTOS_DIR)
     print(f"Found {sum(len(v) for v in photos_by_room.values())} photos across {len(photos_by_room)} rooms\n")
 
@@ -9,6 +9,12 @@ Three modes:
   Skip-Whisper: Gemini + Claude (faster, no transcript)
   Gemini-Only:  Gemini → direct fallback (cheapest, no Claude)
 
+In Full/Skip-Whisper the merge goes to Claude. With --local-merge, transcripts
+with no overrides (or only simple ones like "skip the garage") are merged by
+local rules instead, and Claude is called only when the rules can't resolve
+the transcript. The local path stays opt-in until a live backtest shows it
+matches the Claude merge.
+
 Graceful degradation:
   - Whisper fail → continue without transcript
   - Claude fail  → Gemini fallback (direct conversion)
@@ -24,17 +30,25 @@ import argparse
 import json
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from dataclasses import dataclass, field
 
 # Add estimator directory to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from audio_extractor import extract_audio, chunk_audio, cleanup_temp_audio
-from whisper_transcriber import transcribe_audio, format_transcript_with_timestamps
+from audio_extractor import (
+    extract_audio, chunk_audio, cleanup_temp_audio, trim_silence, stream_audio_chunks,
+    STREAM_CHUNK_SECONDS,
+)
+from whisper_transcriber import transcribe_audio, format_transcript_with_timestamps, apply_offset_map
 from gemini_video_analyzer import analyze_video
-from video_summarizer import summarize, gemini_fallback
+from video_summarizer import summarize, gemini_fallback, local_merge
 from generate_estimate import analyze_from_rooms_json, generate_5phase_estimate
+from model_router import ModelRouter, AUTO_MODEL
+import call_ledger
+import reference_data
+from profiling import stage
 
 
 @dataclass
@@ -60,6 +74,14 @@ class PipelineResult:
     final_boxes: int = 0
     final_rooms: int = 0
 
+    # Speculative estimate (Gemini fallback, built while the Claude merge runs)
+    provisional_rcv: float = 0.0
+    provisional_seconds: float = 0.0   # pipeline start -> provisional number
+    estimate_diff: list = field(default_factory=list)  # provisional vs final, one line each
+
+    # Model routing (gemini_model="auto"): ModelRouter.summary()
+    model_routing: dict = field(default_factory=dict)
+
     # Timing
     audio_extract_seconds: float = 0.0
     whisper_seconds: float = 0.0
@@ -78,6 +100,7 @@ class PipelineResult:
         return not self.fatal_error and self.total_rcv > 0
 
 
+@call_ledger.scoped
 def run_pipeline(
     video_path: str | Path,
     customer_name: str = "Video Estimate",
@@ -89,6 +112,14 @@ def run_pipeline(
     save_intermediates: bool = True,
     drive_time_min: float = 25.0,
     storage_duration_months: int = 2,
+    stream_rooms: bool = False,
+    whisper_backend: str = None,
+    vad_trim: bool = False,
+    keep_audio: bool = False,
+    stream_audio: bool = False,
+    local_rules: bool = False,
+    speculative: bool = True,
+    router: ModelRouter = None,
 ) -> PipelineResult:
     """
     Run the full video-to-estimate pipeline.
@@ -98,12 +129,35 @@ def run_pipeline(
         customer_name: Customer name for estimate output
         skip_whisper: Skip audio transcription (Gemini + Claude only)
         gemini_only: Skip both Whisper and Claude (Gemini direct)
-        gemini_model: Gemini model for visual analysis
+        gemini_model: Gemini model for visual analysis, or "auto" (opt-in) to start
+                      short videos on the fast model and escalate to pro
+                      (model_router; an escalated video is uploaded again)
         claude_model: Claude model for merge step
         output_dir: Where to save estimate files
         save_intermediates: Save rooms JSON for debugging
         drive_time_min: Drive time for cartage calculation
         storage_duration_months: Months of storage per vault
+        stream_rooms: Stream the Gemini response and print rooms as they arrive.
+                      The first room starts loading the estimate's reference
+                      data in the background; the merge and estimate steps
+                      still wait for the complete room list
+        whisper_backend: "api" (OpenAI) or "local" (faster-whisper on CPU)
+        vad_trim: Drop non-speech audio before transcription (timestamps are
+                  mapped back to the original video)
+        keep_audio: Keep the audio chunk files in output_dir (with stream_audio,
+                    write the streamed chunks there)
+        stream_audio: Stream audio from ffmpeg into Whisper in memory, overlapping
+                      decode and transcription, instead of extracting and
+                      chunking files first. Ignored with vad_trim, which needs
+                      the extracted file
+        local_rules: Merge transcripts with no overrides (or only simple ones)
+                     by local rules (video_summarizer.local_merge), calling
+                     Claude only when they can't. Off by default: every merge
+                     goes to Claude
+        speculative: While the Claude merge runs, build a provisional estimate
+                     from the Gemini fallback, then diff it against the final one
+        router: ModelRouter shared across a claim (gemini_model="auto"); one is
+                created (and its log printed) per run if not given
     """
     video_path = Path(video_path)
     if output_dir is None:
@@ -117,6 +171,8 @@ def run_pipeline(
         customer_name=customer_name,
         mode=mode,
     )
+    if not call_ledger.current_claim():
+        call_ledger.set_claim(customer_name)  # standalone run; Encircle sets the claim
 
     pipeline_start = time.time()
 
@@ -128,15 +184,38 @@ def run_pipeline(
 
     # ── STEP 1: AUDIO EXTRACTION + WHISPER ──
     if not skip_whisper and not gemini_only:
+        stage("transcribe")
         print(f"\n[1/4] Audio extraction + transcription...")
         t0 = time.time()
         try:
-            audio_path = extract_audio(video_path, output_dir=output_dir)
-            chunks = chunk_audio(audio_path)
-            result.audio_extract_seconds = time.time() - t0
-
-            t1 = time.time()
-            transcript = transcribe_audio(chunks)
+            offset_map = None
+            chunks = []
+            if stream_audio and not vad_trim:
+                # Decode + chunk + transcribe overlap, so extraction time is
+                # folded into whisper_seconds here
+                local = whisper_backend == "local"
+                stream = stream_audio_chunks(
+                    video_path,
+                    chunk_seconds=None if local else STREAM_CHUNK_SECONDS,
+                    encode="wav" if local else "mp3",
+                    keep_dir=output_dir if keep_audio else None,
+                )
+                t1 = time.time()
+                transcript = transcribe_audio(stream, backend=whisper_backend)
+            else:
+                audio_path = extract_audio(video_path, output_dir=output_dir)
+                if vad_trim:
+                    full_audio = audio_path
+                    audio_path, offset_map = trim_silence(full_audio)
+                    if audio_path != full_audio:
+                        full_audio.unlink(missing_ok=True)
+                # Local Whisper has no upload limit, so no need to split
+                max_mb = float("inf") if whisper_backend == "local" else 24
+                chunks = chunk_audio(audio_path, max_size_mb=max_mb)
+                result.audio_extract_seconds = time.time() - t0
+                t1 = time.time()
+                transcript = transcribe_audio(chunks, backend=whisper_backend)
+            transcript = apply_offset_map(transcript, offset_map)
             result.whisper_seconds = time.time() - t1
 
             if transcript.ok:
@@ -144,6 +223,10 @@ def run_pipeline(
                 result.transcript_segments = len(transcript.segments)
                 print(f"  OK: {len(transcript.segments)} segments, "
                       f"{len(transcript.full_text.split())} words")
+                if transcript.partial:
+                    result.whisper_error = transcript.error
+                    print(f"  WARNING: partial transcript, continuing with the chunks that "
+                          f"succeeded: {transcript.error}")
 
                 # Save transcript if requested
                 if save_intermediates:
@@ -158,8 +241,9 @@ def run_pipeline(
                 print(f"  WARNING: Whisper failed: {transcript.error}")
                 print(f"  Continuing without transcript...")
 
-            # Clean up audio files
-            cleanup_temp_audio(chunks, also_remove_source=True)
+            # Clean up audio files (streamed chunks only hit disk with keep_audio)
+            if chunks and not keep_audio:
+                cleanup_temp_audio(chunks, also_remove_source=True)
 
         except FileNotFoundError as e:
             result.whisper_error = str(e)
@@ -175,10 +259,28 @@ def run_pipeline(
         print(f"\n[1/4] Skipping audio/transcription ({mode} mode)")
 
     # ── STEP 2: GEMINI VISUAL ANALYSIS ──
+    stage("gemini analysis")
     print(f"\n[2/4] Gemini visual analysis...")
     t0 = time.time()
-    visual = analyze_video(video_path, model=gemini_model)
+    own_router = gemini_model == AUTO_MODEL and router is None
+    if own_router:
+        router = ModelRouter()
+    prep_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="room-prep")
+    on_room = _room_prep(prep_pool) if stream_rooms else None
+    if gemini_model == AUTO_MODEL:
+        visual = router.run(
+            "video", video_path.name, router.video_model(video_path),
+            lambda model: analyze_video(video_path, model=model, stream=stream_rooms,
+                                        on_room=on_room),
+            router.check_video, usable=lambda v: v.ok,
+        )
+    else:
+        visual = analyze_video(video_path, model=gemini_model, stream=stream_rooms,
+                               on_room=on_room)
+    prep_pool.shutdown(wait=False)  # a load still running finishes; the estimate joins it
     result.gemini_seconds = time.time() - t0
+    if own_router:
+        result.model_routing = router.summary()
 
     if not visual.ok:
         result.fatal_error = f"Gemini analysis failed (FATAL): {visual.error}"
@@ -201,19 +303,43 @@ def run_pipeline(
         print(f"  Saved: {va_path.name}")
 
     # ── STEP 3: MERGE (CLAUDE) OR FALLBACK ──
+    provisional = provisional_rooms = None
     if gemini_only:
         print(f"\n[3/4] Gemini-only mode — direct fallback (no Claude)")
         t0 = time.time()
         summary = gemini_fallback(visual.rooms)
         result.merge_seconds = time.time() - t0
     else:
-        print(f"\n[3/4] Claude merge (transcript + visual)...")
+        stage("merge")
+        print(f"\n[3/4] Merge (transcript + visual)...")
         t0 = time.time()
-        summary = summarize(
-            result.transcript_text,
-            visual.rooms,
-            model=claude_model,
-        )
+        summary = local_merge(result.transcript_text, visual.rooms) if local_rules else None
+        if summary is None and speculative:
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                merge_future = call_ledger.submit(
+                    pool, summarize, result.transcript_text, visual.rooms, model=claude_model,
+                )
+                print(f"  Claude merge running; building provisional estimate from Gemini...")
+                provisional_rooms = gemini_fallback(visual.rooms).to_rooms_json()
+                try:
+                    provisional = _build_estimate(
+                        provisional_rooms, customer_name, drive_time_min, storage_duration_months,
+                    )
+                    result.provisional_rcv = provisional['total_rcv']
+                    result.provisional_seconds = time.time() - pipeline_start
+                    print(f"  PROVISIONAL: ${provisional['total_rcv']:,.2f} RCV "
+                          f"({provisional['tags']} TAGs, {provisional['boxes']} boxes) "
+                          f"at {result.provisional_seconds:.1f}s -- waiting for Claude merge")
+                except Exception as e:
+                    provisional = None
+                    print(f"  WARNING: provisional estimate failed: {e}")
+                summary = merge_future.result()
+        elif summary is None:
+            summary = summarize(
+                result.transcript_text,
+                visual.rooms,
+                model=claude_model,
+            )
         result.merge_seconds = time.time() - t0
 
         if not summary.ok:
@@ -235,18 +361,13 @@ def run_pipeline(
         print(f"  Saved: {rj_path.name}")
 
     # ── STEP 4: GENERATE ESTIMATE ──
+    stage("video estimate")
     print(f"\n[4/4] Generating 5-phase estimate...")
     t0 = time.time()
 
     try:
-        walkthrough = analyze_from_rooms_json(rooms_json)
-        est = generate_5phase_estimate(
-            walkthrough=walkthrough,
-            drive_time_min=drive_time_min,
-            storage_duration_months=storage_duration_months,
-            customer_name=customer_name,
-            apply_corrections=True,
-            output_dir=str(output_dir),
+        est = _build_estimate(
+            rooms_json, customer_name, drive_time_min, storage_duration_months, output_dir,
         )
         result.estimate_seconds = time.time() - t0
         result.estimate_result = est
@@ -258,6 +379,11 @@ def run_pipeline(
         print(f"  {est['rooms']} rooms, {est['tags']} TAGs, {est['boxes']} boxes")
         if est.get('csv_path'):
             print(f"  CSV: {est['csv_path']}")
+        if provisional is not None:
+            result.estimate_diff = estimate_diff(provisional, est, provisional_rooms, rooms_json)
+            print(f"  Final vs provisional:")
+            for line in result.estimate_diff:
+                print(f"    {line}")
 
     except Exception as e:
         result.fatal_error = f"Estimate generation failed: {e}"
@@ -279,6 +405,11 @@ def run_pipeline(
     print(f"    Gemini:           {result.gemini_seconds:.1f}s")
     print(f"    Merge:            {result.merge_seconds:.1f}s")
     print(f"    Estimate:         {result.estimate_seconds:.1f}s")
+    if own_router:
+        router.print_summary()
+    if result.provisional_rcv:
+        print(f"  Provisional estimate: ${result.provisional_rcv:,.2f} RCV "
+              f"at {result.provisional_seconds:.1f}s")
     if result.ok:
         print(f"\n  RESULT: ${result.total_rcv:,.2f} RCV "
               f"({result.final_rooms} rooms, {result.final_tags} TAGs, {result.final_boxes} boxes)")
@@ -292,6 +423,89 @@ def run_pipeline(
     return result
 
 
+def _room_prep(pool: ThreadPoolExecutor):
+    """on_room callback for stream_rooms: once Gemini has produced a room, load
+    the reference data the estimate needs on pool while the rest stream in."""
+    started = []
+
+    def on_room(room: dict):
+        if not started:
+            print(f"    Loading estimate reference data while Gemini streams...")
+            started.append(pool.submit(_preload_reference_data))
+
+    return on_room
+
+
+def _preload_reference_data():
+    try:
+        reference_data.preload()
+    except Exception as e:
+        # The estimate step loads (and reports) it again
+        print(f"  WARNING: reference data preload failed: {e}")
+
+
+def _build_estimate(rooms_json: list[dict], customer_name: str, drive_time_min: float,
+                    storage_duration_months: int, output_dir: Path = None) -> dict:
+    """rooms JSON -> 5-phase estimate dict (files written only if output_dir is given)."""
+    walkthrough = analyze_from_rooms_json(rooms_json)
+    return generate_5phase_estimate(
+        walkthrough=walkthrough,
+        drive_time_min=drive_time_min,
+        storage_duration_months=storage_duration_months,
+        customer_name=customer_name,
+        apply_corrections=True,
+        output_dir=str(output_dir) if output_dir else None,
+    )
+
+
+def estimate_diff(old_est: dict, new_est: dict, old_rooms: list[dict],
+                  new_rooms: list[dict], max_items: int = 8) -> list[str]:
+    """Human-readable changes from one estimate to another: totals, rooms, line items."""
+    lines = []
+    delta = new_est['total_rcv'] - old_est['total_rcv']
+    lines.append(f"RCV: ${old_est['total_rcv']:,.2f} -> ${new_est['total_rcv']:,.2f} "
+                 f"({'+' if delta >= 0 else '-'}${abs(delta):,.2f})")
+    if (old_est['tags'], old_est['boxes']) != (new_est['tags'], new_est['boxes']):
+        lines.append(f"TAGs {old_est['tags']} -> {new_est['tags']}, "
+                     f"boxes {old_est['boxes']} -> {new_est['boxes']}")
+
+    old_by_name = {r['room_name']: r for r in old_rooms}
+    new_by_name = {r['room_name']: r for r in new_rooms}
+    for name in old_by_name.keys() - new_by_name.keys():
+        lines.append(f"- room removed: {name}")
+    for name in new_by_name.keys() - old_by_name.keys():
+        lines.append(f"+ room added: {name}")
+    for name, new in new_by_name.items():
+        old = old_by_name.get(name)
+        if old is None:
+            continue
+        changes = [
+            f"{key.replace('override_', '')} {old.get(key)} -> {new.get(key)}"
+            for key in ('room_category', 'density', 'override_tags', 'override_boxes')
+            if old.get(key) != new.get(key)
+        ]
+        if changes:
+            lines.append(f"~ {name}: {', '.join(changes)}")
+
+    # Line item RCV by (phase, description); the same item can appear in several phases
+    item_rcv = {}
+    for sign, est in ((-1, old_est), (1, new_est)):
+        for item in est.get('line_items', []):
+            key = (item.get('phase', ''), item['desc'])
+            item_rcv[key] = item_rcv.get(key, 0.0) + sign * item['rcv']
+    item_deltas = sorted(((d, key) for key, d in item_rcv.items() if abs(d) >= 0.01),
+                         key=lambda entry: -abs(entry[0]))
+    for d, (phase, desc) in item_deltas[:max_items]:
+        label = f"[{phase}] {desc}" if phase else desc
+        lines.append(f"  {'+' if d >= 0 else '-'}${abs(d):,.2f}  {label}")
+    if len(item_deltas) > max_items:
+        lines.append(f"  ... {len(item_deltas) - max_items} more line items changed")
+
+    if len(lines) == 1 and abs(delta) < 0.01:
+        lines[0] += " -- no change"
+    return lines
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Video-to-Estimate Pipeline for 1-800-Packouts",
@@ -308,12 +522,28 @@ Examples:
     parser.add_argument("--customer", default="Video Estimate", help="Customer name")
     parser.add_argument("--skip-whisper", action="store_true", help="Skip Whisper transcription")
     parser.add_argument("--gemini-only", action="store_true", help="Gemini only, no Claude merge")
-    parser.add_argument("--gemini-model", default="gemini-2.0-flash", help="Gemini model")
+    parser.add_argument("--gemini-model", default="gemini-2.0-flash",
+                        help='Gemini model, or "auto" (fast model for short videos, pro on escalation)')
     parser.add_argument("--claude-model", default="claude-sonnet-4-5-20250929", help="Claude model")
     parser.add_argument("--output-dir", default=None, help="Output directory")
     parser.add_argument("--drive-time", type=float, default=25.0, help="Drive time (min)")
     parser.add_argument("--storage-months", type=int, default=2, help="Storage months per vault")
     parser.add_argument("--no-intermediates", action="store_true", help="Don't save intermediate files")
+    parser.add_argument("--stream", action="store_true", help="Stream Gemini rooms as they are generated and start "
+                        "loading estimate data on the first one (later steps still wait for "
+                        "the full analysis)")
+    parser.add_argument("--vad-trim", action="store_true",
+                        help="Trim silence/noise from audio before Whisper (webrtcvad)")
+    parser.add_argument("--keep-audio", action="store_true",
+                        help="Keep audio chunk files in the output directory")
+    parser.add_argument("--stream-audio", action="store_true",
+                        help="Stream audio from ffmpeg into Whisper in memory (no temp files)")
+    parser.add_argument("--local-merge", action="store_true",
+                        help="Merge simple transcripts by local rules, Claude only when needed")
+    parser.add_argument("--no-speculative", action="store_true",
+                        help="Don't build a provisional Gemini-only estimate while Claude merges")
+    parser.add_argument("--whisper-backend", choices=["api", "local"], default=None,
+                        help="Whisper backend: OpenAI API or local faster-whisper (CPU)")
 
     args = parser.parse_args()
 
@@ -328,6 +558,13 @@ Examples:
         save_intermediates=not args.no_intermediates,
         drive_time_min=args.drive_time,
         storage_duration_months=args.storage_months,
+        stream_rooms=args.stream,
+        whisper_backend=args.whisper_backend,
+        vad_trim=args.vad_trim,
+        keep_audio=args.keep_audio,
+        stream_audio=args.stream_audio,
+        local_rules=args.local_merge,
+        speculative=not args.no_speculative,
     )
 
     if result.ok:
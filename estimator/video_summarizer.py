@@ -7,16 +7,22 @@ Visual analysis is the PRIMARY source (TAG/box counts from Gemini).
 Transcript is used for scope notes and overrides (e.g., "only pack under sink").
 
 Includes Gemini-only fallback that converts visual analysis directly
-to rooms JSON without Claude (uses classify_room for category mapping).
+to rooms JSON without Claude (uses classify_room for category mapping),
+and a rule-based local merge that applies simple transcript overrides
+("skip the garage", "only pack under the sink") without calling Claude.
+video_pipeline uses the local merge only with --local-merge (local_rules=True).
 
 Usage:
-    from video_summarizer import summarize, gemini_fallback
+    from video_summarizer import summarize, gemini_fallback, local_merge
 
-    result = summarize(transcript_text, visual_analysis_rooms)
+    result = local_merge(transcript_text, visual_analysis_rooms)  # None -> needs Claude
+    if result is None:
+        result = summarize(transcript_text, visual_analysis_rooms)
     rooms_json = result.to_rooms_json()
 """
 
 import os
+import re
 import json
 from pathlib import Path
 from dataclasses import dataclass, field
@@ -32,6 +38,11 @@ VALID_CATEGORIES = [
     "garage", "laundry", "hallway", "exterior", "basement", "other"
 ]
 
+# Compact transcript + visual data before the Claude merge (MERGE_COMPACT=1).
+# Off by default: the keyword filter can drop room-less scope sentences ("Just
+# the dishes and the china.") and it hasn't been compared on live backtest merges.
+MERGE_COMPACT = os.environ.get("MERGE_COMPACT", "0") == "1"
+
 
 @dataclass
 class SummaryRoom:
@@ -54,6 +65,7 @@ class SummaryResult:
     total_boxes: int = 0
     notes: str = ""
     model_used: str = ""
+    input_tokens_saved: int = 0  # estimated, from merge input compaction
     error: str = ""
 
     @property
@@ -127,10 +139,100 @@ override_tags and override_boxes should reflect the final counts after consideri
 Include ALL rooms from the visual analysis unless the transcript explicitly says to skip them."""
 
 
+# ── Merge input compaction ──────────────────────────────────
+# The merge only uses the transcript for scope changes, so sentences that
+# neither name a room nor talk about scope are dropped, and the visual
+# rooms go over without tag_items (estimated_tags already carries the count).
+
+ROOM_TERMS = {
+    "kitchen", "pantry", "living", "family", "den", "dining", "bedroom", "primary",
+    "master", "guest", "nursery", "bathroom", "bath", "powder", "closet", "office",
+    "study", "garage", "laundry", "hallway", "hall", "entry", "foyer", "exterior",
+    "patio", "basement", "attic", "loft", "stairs", "room", "rooms", "sitting",
+}
+
+SCOPE_TERMS = {
+    "pack", "packing", "packed", "packout", "move", "moving", "moved", "leave",
+    "leaving", "left", "stay", "staying", "skip", "skipping", "only", "not", "don't",
+    "won't", "no", "nothing", "everything", "all", "add", "extra", "remove", "box",
+    "boxes", "tag", "tags", "storage", "store", "storing", "vendor", "crate", "pod",
+    "vault", "damage", "damaged", "water", "mold", "smoke", "fire", "soot", "wet",
+    "flood", "flooring", "replace", "replacing", "demo", "dispose", "disposal",
+    "budget", "account", "empty", "full", "place", "homeowner", "homeowners",
+    "come", "coming", "go", "goes", "going", "keep", "handle", "handled", "handler",
+    "include", "included", "exclude", "excluded", "scope", "contractor", "rental",
+}
+
+_FILLER_RE = re.compile(
+    r"\b(?:um+|uh+|erm|hmm+|you know|i mean|kind of|sort of|basically|actually)\b,?\s*",
+    re.IGNORECASE,
+)
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_WORD_RE = re.compile(r"[a-z']+")
+
+
+def compact_transcript(transcript_text: str, room_names: list[str] = ()) -> str:
+    """
+    Keep only transcript sentences that mention a room or scope, minus filler.
+
+    Repeated sentences are dropped. Kept sentences stay in walkthrough order,
+    one per line, so "Walking into the kitchen ... Only under the sink" still
+    reads as belonging to the kitchen.
+    """
+    if not transcript_text:
+        return ""
+
+    # Words from the visual room names ("Hallway (Entry & Corridors)") count as room mentions
+    room_words = set(ROOM_TERMS)
+    for name in room_names:
+        room_words.update(_WORD_RE.findall(name.lower()))
+    room_words -= {"and", "the", "of", "area", "areas"}
+
+    kept = []
+    seen = set()
+    for sentence in _SENTENCE_RE.split(transcript_text):
+        sentence = _FILLER_RE.sub("", sentence).strip()
+        words = _WORD_RE.findall(sentence.lower())
+        if len(words) < 2:
+            continue
+        key = " ".join(words)
+        if key in seen:
+            continue
+        seen.add(key)
+        if room_words.isdisjoint(words) and SCOPE_TERMS.isdisjoint(words):
+            continue
+        kept.append(sentence)
+
+    return "\n".join(kept)
+
+
+def compact_visual_rooms(visual_analysis_rooms: list[dict]) -> str:
+    """Visual rooms as a JSON array, one room per line, without tag_items or empty fields."""
+    lines = []
+    for room in visual_analysis_rooms:
+        entry = {
+            key: room[key]
+            for key in ("room_name", "room_category", "density", "estimated_tags", "estimated_boxes")
+            if key in room
+        }
+        if room.get("scope_notes"):
+            entry["scope_notes"] = room["scope_notes"]
+        damage = list(dict.fromkeys(room.get("damage_indicators") or []))
+        if damage:
+            entry["damage_indicators"] = damage
+        lines.append(json.dumps(entry, separators=(",", ":")))
+    return "[\n" + ",\n".join(lines) + "\n]"
+
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // 4  # ~4 chars/token for English + JSON
+
+
 def summarize(
     transcript_text: str,
     visual_analysis_rooms: list[dict],
     model: str = "claude-sonnet-4-5-20250929",
+    compact: bool = MERGE_COMPACT,
 ) -> SummaryResult:
     """
     Use Claude to merge transcript + visual analysis into final rooms JSON.
@@ -139,41 +241,57 @@ def summarize(
         transcript_text: Full text from Whisper transcription
         visual_analysis_rooms: List of room dicts from Gemini analysis
         model: Claude model to use
+        compact: Strip filler/off-scope transcript and tag_items before sending
 
     Returns:
         SummaryResult with merged room data
     """
-    import anthropic
-
-    api_key = os.environ.get("ANTHROPIC_API_KEY")
-    if not api_key:
-        return SummaryResult(error="ANTHROPIC_API_KEY not set in environment or .env")
+    from call_guard import ProviderUnavailable
+    from providers import ProviderNotConfigured, api_errors, call, get_client, response_text
 
-    client = anthropic.Anthropic(api_key=api_key)
+    try:
+        client = get_client("claude")
+    except ProviderNotConfigured as e:
+        return SummaryResult(error=str(e))
 
     # Build prompt
-    visual_json = json.dumps(visual_analysis_rooms, indent=2)
-    transcript = transcript_text if transcript_text else "(No transcript available)"
+    raw_visual = json.dumps(visual_analysis_rooms, indent=2)
+    raw_transcript = transcript_text or ""
+    if compact:
+        room_names = [r.get("room_name", "") for r in visual_analysis_rooms]
+        visual_json = compact_visual_rooms(visual_analysis_rooms)
+        transcript = compact_transcript(raw_transcript, room_names)
+    else:
+        visual_json, transcript = raw_visual, raw_transcript
+    tokens_before = _estimate_tokens(raw_visual + raw_transcript)
+    tokens_after = _estimate_tokens(visual_json + transcript)
+    tokens_saved = max(0, tokens_before - tokens_after)
+    if compact and tokens_before:
+        print(f"  Compacted merge input: ~{tokens_before:,} -> ~{tokens_after:,} tokens "
+              f"({tokens_saved / tokens_before:.0%} saved)")
 
     prompt = CLAUDE_MERGE_PROMPT.format(
         categories=", ".join(VALID_CATEGORIES),
         visual_data=visual_json,
-        transcript=transcript,
+        transcript=transcript or "(No transcript available)",
     )
 
     print(f"  Merging with Claude ({model})...")
 
     try:
-        response = client.messages.create(
+        response = call(
+            "claude", "merge", client.messages.create,
             model=model,
             max_tokens=4096,
             temperature=0.1,
             messages=[{"role": "user", "content": prompt}],
         )
-    except anthropic.APIError as e:
+    except api_errors("claude") as e:
         return SummaryResult(error=f"Claude API error: {e}")
+    except ProviderUnavailable as e:
+        return SummaryResult(error=f"Claude unavailable: {e}")
 
-    raw_text = response.content[0].text
+    raw_text = response_text(response)
     rooms = _parse_summary_response(raw_text)
 
     if not rooms:
@@ -186,6 +304,8 @@ def summarize(
     summary_rooms = []
     total_tags = 0
     total_boxes = 0
+    # tag_items are not sent to Claude when compacting; carry them over by name
+    visual_items = {r.get("room_name"): r.get("tag_items", []) for r in visual_analysis_rooms}
 
     for room in rooms:
         tags = room.get("override_tags")
@@ -201,7 +321,7 @@ def summarize(
             override_boxes=boxes,
             scope_notes=room.get("scope_notes", ""),
             damage_indicators=room.get("damage_indicators", []),
-            tag_items=room.get("tag_items", []),
+            tag_items=room.get("tag_items") or visual_items.get(room["room_name"], []),
         ))
 
     print(f"  Claude merge complete: {len(summary_rooms)} rooms, "
@@ -212,6 +332,7 @@ def summarize(
         total_tags=total_tags,
         total_boxes=total_boxes,
         model_used=model,
+        input_tokens_saved=tokens_saved,
     )
 
 
@@ -222,6 +343,14 @@ def gemini_fallback(visual_analysis_rooms: list[dict]) -> SummaryResult:
 
     Uses classify_room() for consistent category mapping.
     """
+    result = _direct_summary(visual_analysis_rooms, "gemini-fallback")
+    print(f"  Gemini fallback: {len(result.rooms)} rooms, "
+          f"{result.total_tags} TAGs, {result.total_boxes} boxes")
+    return result
+
+
+def _direct_summary(visual_analysis_rooms: list[dict], model_used: str) -> SummaryResult:
+    """Visual rooms -> SummaryResult as-is (no merge), re-classifying invalid categories."""
     import sys
     sys.path.insert(0, str(Path(__file__).parent))
     from build_visual_training import classify_room
@@ -252,39 +381,199 @@ def gemini_fallback(visual_analysis_rooms: list[dict]) -> SummaryResult:
             tag_items=room.get("tag_items", []),
         ))
 
-    print(f"  Gemini fallback: {len(summary_rooms)} rooms, "
-          f"{total_tags} TAGs, {total_boxes} boxes")
-
     return SummaryResult(
         rooms=summary_rooms,
         total_tags=total_tags,
         total_boxes=total_boxes,
-        model_used="gemini-fallback",
+        model_used=model_used,
     )
 
 
+# ── Local rule-based merge ──────────────────────────────────
+# Handles the transcript overrides the Claude prompt lists (skip a room,
+# pack only part of it, add boxes) when they name a room unambiguously.
+# Any other scope/override language escalates to Claude.
+
+# Sentences with any of these may change counts and must be resolved by a rule
+_OVERRIDE_RE = re.compile(
+    r"\b(?:only|skip\w*|don't|do not|won't|will not|not (?:be )?(?:pack|mov|touch|go|do)\w*|"
+    r"leav\w*|left|stay\w*|add\w*|extra|remov\w*|exclud\w*|vendor|storage|stor(?:e|ing)|"
+    r"dispos\w*|demo|reduce|less|fewer)\b"
+)
+_SKIP_RE = re.compile(
+    r"\b(?:skip(?:ping)?|(?:won't|will not|not) be (?:packing|touching|doing|working in|looking in)|"
+    r"(?:don't|do not|won't|will not|not) (?:pack(?:ing)?|touch(?:ing)?|do(?:ing)?)\b|no pack ?out)"
+)
+# A skip governs only its own clause; another clause with one of these verbs
+# ("don't do the kitchen tomorrow, do it today") needs Claude
+_CLAUSE_RE = re.compile(r"\s*(?:[,;:]|\bbut\b|\bthen\b|\binstead\b)\s*")
+_ACTION_RE = re.compile(r"\b(?:pack\w*|do|doing|mov\w*|touch\w*|add\w*|take|handle|box\w*)\b")
+# "we're not skipping the garage", "don't skip it" -- the skip itself is negated
+_NEGATED_SKIP_RE = re.compile(r"(?:\b(?:not|never|no)|n't)\W+(?:\w+\W+){0,2}?skip")
+# "don't pack the kitchen until Monday" defers rather than removes
+_TEMPORAL_RE = re.compile(
+    r"\b(?:until|till|yet|later|tomorrow|today|tonight|next|after|before|first|for now|"
+    r"monday|tuesday|wednesday|thursday|friday|saturday|sunday|morning|afternoon|week)\b"
+)
+_FULL_RE = re.compile(r"\b(?:full|entire|whole) (?:room |house |home )?pack ?out\b|\bpack (?:everything|it all)\b")
+_ADD_RE = re.compile(
+    r"\badd(?: an?)? (?P<n>\d+|one|two|three|four|five|six|seven|eight|nine|ten)? ?"
+    r"(?:more |extra |additional )?(?P<unit>box(?:es)?|tags?)\b"
+)
+_NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+                 "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10}
+
+# "only pack <area>" -> (tags, boxes, density), per the box estimation guidelines
+_ONLY_PACK = r"\bonly (?:(?:going to|gonna|need to|want to) )?(?:pack(?:ing)? (?:out )?)?(?:the )?"
+PARTIAL_SCOPE_AREAS = [
+    (re.compile(_ONLY_PACK + r"under (?:the )?(?:kitchen |bathroom )?sinks?\b"), (0, 1, "light")),
+    (re.compile(_ONLY_PACK + r"medicine cabinets?\b"), (0, 1, "light")),
+]
+
+
+def _room_base_name(name: str) -> str:
+    """'Hallway (Entry & Corridors)' -> 'hallway'"""
+    return re.sub(r"\s*\(.*?\)", "", name).strip().lower()
+
+
+def _rooms_named(sentence: str, rooms: list[dict]) -> list[int]:
+    """Indices of rooms whose full base name appears in the sentence."""
+    hits = []
+    for i, room in enumerate(rooms):
+        base = _room_base_name(room.get("room_name", ""))
+        if base and re.search(rf"\b{re.escape(base)}\b", sentence):
+            hits.append(i)
+    # "primary bedroom" also contains "bedroom"; keep the most specific names only
+    return [i for i in hits
+            if not any(j != i and _room_base_name(rooms[i]["room_name"])
+                       in _room_base_name(rooms[j]["room_name"]) for j in hits)]
+
+
+def _room_terms_in(sentence: str) -> set:
+    return ROOM_TERMS.intersection(_WORD_RE.findall(sentence)) - {"room", "rooms"}
+
+
+def _skip_target(sentence: str, named: list[int], rooms: list[dict]) -> int | None:
+    """
+    Room index a skip sentence removes, -1 if it names no visual room, or
+    None if the sentence does more than skip one room: it also adds or
+    limits scope, names several rooms, has another clause with an action
+    ("..., but pack the kitchen"), or names its room outside the skip clause.
+    Negated skips ("not skipping the garage") and time qualifiers ("until
+    Monday") are None too.
+    """
+    if _NEGATED_SKIP_RE.search(sentence) or _TEMPORAL_RE.search(sentence):
+        return None
+    if len(named) > 1 or _ADD_RE.search(sentence) or any(p.search(sentence) for p, _ in PARTIAL_SCOPE_AREAS):
+        return None
+    clauses = [c for c in _CLAUSE_RE.split(sentence) if c]
+    skip_clause = next((c for c in clauses if _SKIP_RE.search(c)), sentence)
+    if any(_ACTION_RE.search(c) for c in clauses if c is not skip_clause):
+        return None
+    if not named:
+        return -1
+    if not _rooms_named(skip_clause, [rooms[named[0]]]):
+        return None  # the room is in another clause than the skip
+    return named[0]
+
+
+def local_merge(transcript_text: str, visual_analysis_rooms: list[dict]) -> SummaryResult | None:
+    """
+    Merge transcript + visual analysis with deterministic rules, no API call.
+
+    Visual counts are kept as-is (as in the Claude merge) and these transcript
+    overrides are applied to the room they name:
+      - "skip the garage" / "we're not packing the office"  -> room removed
+        (a skip that also adds, names several rooms or has another
+        clause with an action goes to Claude)
+      - "only pack under the sink"                           -> 0 TAGs, 1 box
+      - "add 5 more boxes for the kitchen"                   -> boxes + 5
+      - "full packout"                                       -> no change
+    A room-less override applies to the last room named in the walkthrough.
+
+    Returns None when the transcript has override language these rules can't
+    resolve (unknown pattern, no/ambiguous room); the caller should escalate
+    to summarize().
+    """
+    rooms = [dict(r) for r in visual_analysis_rooms]
+    removed = set()
+    notes = {}  # room index -> transcript sentences applied
+    current = None
+
+    for sentence in _SENTENCE_RE.split(transcript_text or ""):
+        sentence = _FILLER_RE.sub("", sentence).strip()
+        low = sentence.lower()
+        named = _rooms_named(low, rooms)
+        if len(named) == 1:
+            current = named[0]
+        if not _OVERRIDE_RE.search(low):
+            continue
+
+        if _FULL_RE.search(low):
+            continue
+
+        if _SKIP_RE.search(low):
+            skip_room = _skip_target(low, named, rooms)
+            if skip_room is None:
+                print(f"  Local merge: needs Claude for: {sentence!r}")
+                return None
+            if skip_room >= 0:
+                removed.add(skip_room)
+                continue
+            terms = _room_terms_in(low)
+            if not terms:
+                # "we're not packing this one" -- no room to act on
+                print(f"  Local merge: can't resolve room for: {sentence!r}")
+                return None
+            if any(terms & set(_room_base_name(r.get("room_name", "")).split()) for r in rooms):
+                # "water closet" vs "Primary Closet" -- partial name match
+                print(f"  Local merge: ambiguous room in: {sentence!r}")
+                return None
+            continue  # a room the visual analysis doesn't have (visual is authoritative)
+
+        target = named[0] if len(named) == 1 else (current if not named else None)
+        partial = next((counts for pattern, counts in PARTIAL_SCOPE_AREAS if pattern.search(low)), None)
+        add = _ADD_RE.search(low)
+        if (partial or add) and target is None:
+            print(f"  Local merge: can't resolve room for: {sentence!r}")
+            return None
+        if partial:
+            tags, boxes, density = partial
+            rooms[target].update(estimated_tags=tags, estimated_boxes=boxes, density=density)
+        elif add:
+            n = add.group("n") or "1"
+            n = int(n) if n.isdigit() else _NUMBER_WORDS[n]
+            key = "estimated_tags" if add.group("unit").startswith("tag") else "estimated_boxes"
+            rooms[target][key] = rooms[target].get(key, 0) + n
+        else:
+            print(f"  Local merge: needs Claude for: {sentence!r}")
+            return None
+        notes.setdefault(target, []).append(sentence)
+
+    for i, applied in notes.items():
+        existing = rooms[i].get("scope_notes", "")
+        tech = "; ".join(f"Tech: {s}" for s in applied)
+        rooms[i]["scope_notes"] = f"{existing}; {tech}" if existing else tech
+
+    kept = [r for i, r in enumerate(rooms) if i not in removed]
+    result = _direct_summary(kept, "local-rules")
+    if not result.rooms:
+        return None
+    skipped = [rooms[i]["room_name"] for i in sorted(removed)]
+    print(f"  Local merge: {len(result.rooms)} rooms, {result.total_tags} TAGs, "
+          f"{result.total_boxes} boxes ({len(notes)} overridden"
+          f"{', skipped ' + ', '.join(skipped) if skipped else ''})")
+    return result
+
+
 def _parse_summary_response(text: str) -> list[dict]:
     """Parse Claude's JSON response."""
-    text = text.strip()
-
-    # Strip markdown code fences if present
-    if text.startswith("```"):
-        lines = text.split("\n")
-        lines = [l for l in lines if not l.strip().startswith("```")]
-        text = "\n".join(lines).strip()
+    from providers import parse_json
 
     try:
-        rooms = json.loads(text)
+        rooms = parse_json(text, salvage="[")
     except json.JSONDecodeError:
-        start = text.find("[")
-        end = text.rfind("]")
-        if start >= 0 and end > start:
-            try:
-                rooms = json.loads(text[start:end + 1])
-            except json.JSONDecodeError:
-                return []
-        else:
-            return []
+        return []
 
     if not isinstance(rooms, list):
         return []
@@ -332,6 +621,41 @@ if __name__ == "__main__":
     fb_result = gemini_fallback(sample_visual)
     print(json.dumps(fb_result.to_rooms_json(), indent=2))
 
+    # Local merge regression cases (no API needed): transcript -> expected
+    # (room name, TAGs, boxes) list, or None when it must escalate to Claude
+    print("\n=== LOCAL MERGE TEST ===")
+    visual = [
+        {"room_name": "Kitchen", "room_category": "kitchen", "estimated_tags": 2, "estimated_boxes": 10},
+        {"room_name": "Garage", "room_category": "garage", "estimated_tags": 5, "estimated_boxes": 20},
+        {"room_name": "Office", "room_category": "office", "estimated_tags": 3, "estimated_boxes": 8},
+    ]
+    all_rooms = [("Kitchen", 2, 10), ("Garage", 5, 20), ("Office", 3, 8)]
+    cases = [
+        ("Skip the garage.", [("Kitchen", 2, 10), ("Office", 3, 8)]),
+        ("We're not packing the office.", [("Kitchen", 2, 10), ("Garage", 5, 20)]),
+        ("This is the kitchen. Add 3 more boxes.", [("Kitchen", 2, 13), ("Garage", 5, 20), ("Office", 3, 8)]),
+        ("The kitchen needs a full packout.", all_rooms),
+        ("Skip the garage, but pack the kitchen.", None),
+        ("We won't pack the garage but add 3 boxes for the kitchen.", None),
+        ("Don't do the kitchen tomorrow, do it today.", None),
+        ("Skip the garage and the office.", None),
+        ("We are not skipping the garage.", None),
+        ("No, we're definitely not skipping the garage.", None),
+        ("Don't skip the office.", None),
+        ("Don't pack the kitchen until Monday.", None),
+        ("We're not doing the garage yet.", None),
+        ("Skip the office for now, we'll do it later.", None),
+    ]
+    failures = 0
+    for transcript, expected in cases:
+        merged = local_merge(transcript, visual)
+        got = None if merged is None else [(r.room_name, r.override_tags, r.override_boxes)
+                                           for r in merged.rooms]
+        status = "ok" if got == expected else "FAIL"
+        failures += status == "FAIL"
+        print(f"  [{status}] {transcript!r} -> {got}")
+    print(f"  {len(cases) - failures}/{len(cases)} local merge cases passed")
+
     # Test Claude merge (needs API key)
     print("\n=== CLAUDE MERGE TEST ===")
     result = summarize(sample_transcript, sample_visual)
@@ -2,6 +2,13 @@
 Whisper Transcriber Module
 Sends audio chunks to OpenAI Whisper API for transcription with segment timestamps.
 
+Two backends:
+  api:   OpenAI Whisper API (default; needs OPENAI_API_KEY, 25MB upload limit)
+  local: faster-whisper on CPU with int8 (same setup as fire-scanner/scanner.py);
+         no network round-trip or upload limit. Model loads once per process.
+Select with backend= or WHISPER_BACKEND. If the API key is missing and
+faster-whisper is installed, the local backend is used automatically.
+
 Domain-specific prompt helps with:
 - Packout/restoration terminology (TAG, pack-back, Xactimate)
 - Room and damage type vocabulary
@@ -15,9 +22,19 @@ Usage:
     chunks = chunk_audio(audio)
     result = transcribe_audio(chunks)
     print(result.full_text)
+
+    # Offline on CPU (pip install faster-whisper)
+    result = transcribe_audio(chunks, backend="local")
+
+    # No temp files: chunks stream from an ffmpeg pipe and are sent as
+    # soon as each one is cut
+    result = transcribe_audio(stream_audio_chunks("walkthrough.mp4"))
 """
 
+import io
 import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 from dataclasses import dataclass, field
 from dotenv import load_dotenv
@@ -43,10 +60,18 @@ class TranscriptionResult:
     language: str = ""
     duration_seconds: float = 0.0
     error: str = ""
+    failed_chunks: list[int] = field(default_factory=list)  # chunk indices with no text
+    truncated: bool = False  # the audio stream failed part way; later audio is missing
 
     @property
     def ok(self) -> bool:
-        return not self.error and bool(self.full_text)
+        """Usable text. A partial transcript (some chunks failed, error says
+        which) is still ok; it is missing only those chunks' speech."""
+        return bool(self.full_text) and (not self.error or self.partial)
+
+    @property
+    def partial(self) -> bool:
+        return bool(self.failed_chunks) or self.truncated
 
 
 # Domain-specific prompt for better accuracy on packout terminology
@@ -59,50 +84,278 @@ DOMAIN_PROMPT = (
 )
 
 
+# Local faster-whisper backend
+WHISPER_BACKEND = os.environ.get("WHISPER_BACKEND", "api")
+LOCAL_MODEL_NAME = os.environ.get("WHISPER_LOCAL_MODEL", "small")
+LOCAL_CPU_THREADS = int(os.environ.get("WHISPER_CPU_THREADS", os.cpu_count() or 4))
+
+_local_model = None
+_local_model_lock = threading.Lock()
+
+
+def _local_backend_available() -> bool:
+    try:
+        import faster_whisper  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _load_local_model():
+    """Load the faster-whisper model once per process (CPU, int8)."""
+    global _local_model
+    with _local_model_lock:
+        if _local_model is None:
+            from faster_whisper import WhisperModel
+            print(f"  Loading local Whisper model '{LOCAL_MODEL_NAME}' "
+                  f"(cpu/int8, {LOCAL_CPU_THREADS} threads)...")
+            _local_model = WhisperModel(
+                LOCAL_MODEL_NAME,
+                device="cpu",
+                compute_type="int8",
+                cpu_threads=LOCAL_CPU_THREADS,
+            )
+        return _local_model
+
+
+def _read_chunks(audio_chunks, errors: list):
+    """Iterate audio_chunks; an error raised while reading them (ffmpeg dying
+    part way through stream_audio_chunks) ends the iteration and is appended
+    to errors, so the chunks read before it are still transcribed."""
+    try:
+        yield from audio_chunks
+    except Exception as e:
+        errors.append(e)
+
+
+def _stream_error(errors: list, chunks_read: int) -> str:
+    e = errors[0]
+    return f"Audio stream failed after {chunks_read} chunk(s): {type(e).__name__}: {e}"
+
+
+def _chunk_audio_input(chunk):
+    """What to hand the backend for a chunk: in-memory bytes or the file on disk."""
+    if chunk.data is not None:
+        return chunk.data
+    return chunk.path
+
+
+def _transcribe_local(audio_chunks, prompt: str) -> TranscriptionResult:
+    """Transcribe chunks with faster-whisper; same result shape as the API path."""
+    try:
+        model = _load_local_model()
+    except ImportError:
+        return TranscriptionResult(
+            error="faster-whisper not installed (pip install faster-whisper)")
+    except Exception as e:
+        return TranscriptionResult(
+            error=f"Local Whisper model failed to load: {type(e).__name__}: {e}")
+
+    all_segments = []
+    all_text_parts = []
+    total_duration = 0.0
+    language = ""
+
+    # Streamed chunks already arrive in order; don't drain the generator to sort
+    if isinstance(audio_chunks, (list, tuple)):
+        audio_chunks = sorted(audio_chunks, key=lambda c: c.start_seconds)
+    source_errors = []
+    failed = {}  # chunk.index -> error
+    chunks_read = 0
+    for chunk in _read_chunks(audio_chunks, source_errors):
+        chunks_read += 1
+        print(f"  Transcribing chunk {chunk.index} locally ({chunk.duration_seconds:.0f}s)...")
+        audio = _chunk_audio_input(chunk)
+        chunk.data = None
+        try:
+            segments, info = model.transcribe(
+                io.BytesIO(audio) if isinstance(audio, bytes) else str(audio),
+                beam_size=5,
+                initial_prompt=prompt,
+                vad_filter=False,
+            )
+            segments = list(segments)  # generator — decoding happens here
+        except Exception as e:
+            # Keep going: the other chunks still make a usable partial transcript
+            print(f"  Local Whisper failed on chunk {chunk.index}: {type(e).__name__}: {e}")
+            failed[chunk.index] = e
+            continue
+
+        if not language:
+            language = getattr(info, "language", "") or ""
+
+        offset = chunk.start_seconds
+        chunk_text = []
+        for seg in segments:
+            text = seg.text.strip()
+            all_segments.append(TranscriptSegment(
+                start=seg.start + offset,
+                end=seg.end + offset,
+                text=text,
+                chunk_index=chunk.index,
+            ))
+            chunk_text.append(text)
+        if chunk_text:
+            all_text_parts.append(" ".join(chunk_text))
+
+        total_duration = max(total_duration, offset + chunk.duration_seconds)
+
+    full_text = " ".join(all_text_parts)
+    result = TranscriptionResult(
+        segments=all_segments,
+        full_text=full_text,
+        language=language,
+        duration_seconds=total_duration,
+    )
+    errors = []
+    if failed:
+        idx, err = min(failed.items())
+        result.failed_chunks = sorted(failed)
+        errors.append(f"Local Whisper error on {len(failed)}/{chunks_read} chunk(s) "
+                      f"(first: chunk {idx}): {type(err).__name__}: {err}")
+    if source_errors:
+        result.truncated = True
+        errors.append(_stream_error(source_errors, chunks_read))
+    if errors:
+        result.error = "; ".join(errors)
+        return result
+
+    print(f"  Transcription complete (local): {len(full_text.split())} words, "
+          f"{len(all_segments)} segments, {total_duration:.0f}s audio")
+    return result
+
+
+# Parallel chunk transcription
+MAX_CONCURRENT_CHUNKS = int(os.environ.get("WHISPER_MAX_CONCURRENCY", 4))
+CHUNK_MAX_RETRIES = 2
+
+
+def _transcribe_chunk(client, chunk, model: str, prompt: str,
+                      max_retries: int = CHUNK_MAX_RETRIES):
+    """Send one chunk to Whisper, retrying only this chunk on API errors.
+
+    Goes through providers.call (OpenAI concurrency limit, backoff retries,
+    call_guard deadline/hedge/breaker); guard errors are not retried.
+    """
+    from providers import call
+
+    def send(audio):
+        if isinstance(audio, bytes):
+            # (filename, bytes) -- the extension tells Whisper the format
+            return client.audio.transcriptions.create(
+                model=model,
+                file=(chunk.path.name, audio),
+                response_format="verbose_json",
+                timestamp_granularities=["segment"],
+                prompt=prompt,
+            )
+        with open(audio, "rb") as audio_file:
+            return client.audio.transcriptions.create(
+                model=model,
+                file=audio_file,
+                response_format="verbose_json",
+                timestamp_granularities=["segment"],
+                prompt=prompt,
+            )
+
+    audio = _chunk_audio_input(chunk)
+    chunk.data = None  # only this request (and its retries) holds the audio now
+    size = len(audio) if isinstance(audio, bytes) else Path(audio).stat().st_size
+    return call("openai", "transcribe", send, audio, retries=max_retries,
+                ledger={'model': model, 'bytes_sent': size,
+                        'audio_seconds': chunk.duration_seconds})
+
+
 def transcribe_audio(
-    audio_chunks: list,
+    audio_chunks,
     prompt: str = "",
     model: str = "whisper-1",
+    max_concurrency: int = None,
+    backend: str = None,
 ) -> TranscriptionResult:
     """
-    Transcribe audio chunks using OpenAI Whisper API.
+    Transcribe audio chunks using OpenAI Whisper API (or local faster-whisper).
+
+    Chunks are sent concurrently (up to max_concurrency at once) and
+    reassembled in start_seconds order. A failed chunk is retried on its
+    own; chunks that already finished are kept. audio_chunks may be a
+    generator (e.g. stream_audio_chunks); chunks are pulled from it only
+    while a slot is free, so at most max_concurrency chunks' audio is held
+    in memory, and each chunk's audio is released once it is sent. If the
+    generator raises part way (ffmpeg failing), the chunks already read are
+    still transcribed and returned as a partial result with error set.
 
     Args:
-        audio_chunks: List of AudioChunk objects from audio_extractor
+        audio_chunks: AudioChunk objects from audio_extractor (list or iterator)
         prompt: Additional context prompt (appended to domain prompt)
         model: Whisper model to use (only "whisper-1" available)
+        max_concurrency: Max chunks in flight (default WHISPER_MAX_CONCURRENCY or 4)
+        backend: "api" or "local" (default WHISPER_BACKEND, else "api")
 
     Returns:
         TranscriptionResult with segments, full text, and metadata
     """
-    import openai
+    from fake_providers import is_enabled as fakes_enabled
+    from call_guard import ProviderUnavailable
+    from providers import ProviderNotConfigured, api_errors, get_client
+    import call_ledger
 
-    api_key = os.environ.get("OPENAI_API_KEY")
-    if not api_key:
-        return TranscriptionResult(error="OPENAI_API_KEY not set in environment or .env")
-
-    client = openai.OpenAI(api_key=api_key)
+    backend = backend or WHISPER_BACKEND
     full_prompt = DOMAIN_PROMPT + (" " + prompt if prompt else "")
 
+    if backend == "local" and not fakes_enabled():
+        return _transcribe_local(audio_chunks, full_prompt)
+    try:
+        client = get_client("openai")
+    except ProviderNotConfigured as e:
+        if _local_backend_available():
+            print("  OPENAI_API_KEY not set -- using local faster-whisper backend")
+            return _transcribe_local(audio_chunks, full_prompt)
+        return TranscriptionResult(error=str(e))
+    api_error = api_errors("openai")
+
+    workers = max_concurrency or MAX_CONCURRENT_CHUNKS
+    if isinstance(audio_chunks, (list, tuple)):
+        workers = min(workers, len(audio_chunks) or 1)
+    workers = max(1, workers)
+
+    submitted = []
+    source_errors = []
+    responses = {}  # chunk.index -> response
+    failed = {}     # chunk.index -> error
+    pending = {}    # future -> chunk
+
+    def collect(done):
+        for future in done:
+            chunk = pending.pop(future)
+            try:
+                responses[chunk.index] = future.result()
+            except (*api_error, ProviderUnavailable) as e:
+                failed[chunk.index] = e
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for chunk in _read_chunks(audio_chunks, source_errors):
+            submitted.append(chunk)
+            print(f"  Transcribing chunk {chunk.index} ({chunk.duration_seconds:.0f}s)...")
+            pending[call_ledger.submit(pool, _transcribe_chunk, client, chunk, model,
+                                       full_prompt)] = chunk
+            if len(pending) >= workers:
+                # Don't read the next chunk from the stream until one finishes
+                collect(wait(pending, return_when=FIRST_COMPLETED).done)
+        collect(wait(pending).done)
+
+    ordered_chunks = sorted(submitted, key=lambda c: c.start_seconds)
+
     all_segments = []
     all_text_parts = []
     total_duration = 0.0
     language = ""
 
-    for chunk in audio_chunks:
-        print(f"  Transcribing chunk {chunk.index} ({chunk.duration_seconds:.0f}s)...")
-
-        try:
-            with open(chunk.path, "rb") as audio_file:
-                response = client.audio.transcriptions.create(
-                    model=model,
-                    file=audio_file,
-                    response_format="verbose_json",
-                    timestamp_granularities=["segment"],
-                    prompt=full_prompt,
-                )
-        except openai.APIError as e:
-            return TranscriptionResult(error=f"Whisper API error: {e}")
+    # Reassemble in start_seconds order, regardless of completion order
+    for chunk in ordered_chunks:
+        response = responses.get(chunk.index)
+        if response is None:
+            continue
 
         # Extract language from first chunk
         if not language and hasattr(response, 'language'):
@@ -139,13 +392,38 @@ def transcribe_audio(
         duration_seconds=total_duration,
     )
 
+    # The completed chunks stay on the result: ok (partial) if any text came back
+    errors = []
+    if failed:
+        idx, err = min(failed.items())
+        result.failed_chunks = sorted(failed)
+        errors.append(f"Whisper API error on {len(failed)}/{len(ordered_chunks)} "
+                      f"chunk(s) (first: chunk {idx}): {err}")
+    if source_errors:
+        result.truncated = True
+        errors.append(_stream_error(source_errors, len(ordered_chunks)))
+    if errors:
+        result.error = "; ".join(errors)
+        return result
+
     word_count = len(full_text.split())
     print(f"  Transcription complete: {word_count} words, {len(all_segments)} segments, "
-          f"{total_duration:.0f}s audio")
+          f"{total_duration:.0f}s audio ({workers} concurrent)")
 
     return result
 
 
+def apply_offset_map(result: TranscriptionResult, offset_map) -> TranscriptionResult:
+    """Shift segment timestamps from VAD-trimmed audio back onto the original video."""
+    if offset_map is None:
+        return result
+    for seg in result.segments:
+        seg.start = offset_map.to_original(seg.start)
+        seg.end = offset_map.to_original(seg.end, is_end=True)
+    result.duration_seconds = offset_map.original_duration
+    return result
+
+
 def format_transcript_with_timestamps(result: TranscriptionResult) -> str:
     """Format transcript with timestamps for debugging/review."""
     lines = []
@@ -161,24 +439,24 @@ def format_transcript_with_timestamps(result: TranscriptionResult) -> str:
 if __name__ == "__main__":
     import sys
     sys.path.insert(0, str(Path(__file__).parent))
-    from audio_extractor import extract_audio, chunk_audio
+    from audio_extractor import stream_audio_chunks
 
     if len(sys.argv) < 2:
-        print("Usage: python whisper_transcriber.py <video_or_audio_path>")
+        print("Usage: python whisper_transcriber.py <video_or_audio_path> [--local]")
         sys.exit(1)
 
     input_path = Path(sys.argv[1])
 
-    # If video, extract audio first
+    # If video, stream its audio straight from ffmpeg (no temp files)
+    local = "--local" in sys.argv[2:]
     if input_path.suffix.lower() in ('.mp4', '.mov', '.avi', '.mkv', '.webm'):
-        audio_path = extract_audio(input_path)
-        chunks = chunk_audio(audio_path)
+        chunks = stream_audio_chunks(input_path, encode="wav" if local else "mp3")
     else:
         from audio_extractor import AudioChunk, get_duration
         dur = get_duration(input_path)
         chunks = [AudioChunk(path=input_path, start_seconds=0, duration_seconds=dur, index=0)]
 
-    result = transcribe_audio(chunks)
+    result = transcribe_audio(chunks, backend="local" if local else None)
 
     if result.ok:
         print("\n--- TRANSCRIPT ---")